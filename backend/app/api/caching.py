@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable, Optional, Tuple
+import orjson
+from fastapi import Request, Response
+from app.api.conditional import Validators, compute_validators, is_not_modified, not_modified_response, set_validators
+from app.api.responses import DocumentSerializer
+from app.core.cache import shared_cache
+
+# Entries hold finished response bodies, so a hit costs no query and no
+# serialization. Every write that can change a cached response invalidates
+# the tags below; TTLs bound staleness from anything that does not.
+
+def patient_tag(patient_id) -> str:
+    """Tag for everything derived from one patient's data."""
+    return f"patient:{patient_id}"
+
+def nutritionist_tag(nutritionist_id) -> str:
+    """Tag for everything derived from one nutritionist's data."""
+    return f"nutritionist:{nutritionist_id}"
+
+async def invalidate(*tags: str):
+    """Drop cached responses after a write touching these tags."""
+    await shared_cache.invalidate(*tags)
+
+def pack(body: bytes, validators: Optional[Validators]) -> bytes:
+    """Store validators on the first line so 304s need nothing else."""
+    etag, last_modified = validators or (None, None)
+    header = [etag, last_modified.isoformat() if last_modified else None]
+    return orjson.dumps(header) + b"\n" + body
+
+def unpack(entry: bytes) -> Tuple[bytes, Optional[Validators]]:
+    """Split a packed entry back into body and validators."""
+    header, _, body = entry.partition(b"\n")
+    etag, last_modified = orjson.loads(header)
+    if etag is None:
+        return body, None
+    return body, (etag, datetime.fromisoformat(last_modified) if last_modified else None)
+
+async def cached_document_response(
+    request: Request,
+    key: str,
+    load: Callable[[], Awaitable[dict]],
+    serializer: DocumentSerializer,
+    tags: Iterable[str],
+    ttl: Optional[float] = None
+) -> Response:
+    """Serve one document's response through the shared cache.
+
+    ``load`` fetches the document (raising e.g. a 404 when it is missing)
+    and runs only on a miss. Conditional requests are answered from the
+    cached validators, so an unchanged resource costs no query at all.
+    """
+    async def compute():
+        document = await load()
+        body = serializer.response(document).body
+        return pack(body, compute_validators([document])), tags
+
+    body, validators = unpack(await shared_cache.get_or_set(key, compute, ttl))
+    if validators is not None and is_not_modified(request, validators):
+        return not_modified_response(validators)
+    return set_validators(Response(content=body, media_type="application/json"), validators)
@@ -0,0 +1,27 @@
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+from fastapi import Request, Response
+from app.api.responses import dumps
+from app.core.instrumentation import route_template
+from app.core.singleflight import SingleFlight
+
+# Identical expensive reads that arrive together (several tabs, a frontend
+# re-render) share one computation. The shared result is the encoded body,
+# so the waiters skip serialization as well.
+request_flight = SingleFlight("requests")
+
+def request_key(request: Request, principal_id) -> Tuple[Hashable, ...]:
+    """Route template, principal and sorted query parameters of a request."""
+    return (
+        route_template(request.scope),
+        str(principal_id),
+        tuple(sorted(request.query_params.multi_items()))
+    )
+
+async def coalesced_response(request: Request, principal_id, compute: Callable[[], Awaitable[Any]]) -> Response:
+    """Serve ``compute()`` as JSON, sharing it with identical concurrent requests."""
+    async def encode() -> bytes:
+        return dumps(await compute())
+
+    key = request_key(request, principal_id)
+    body = await request_flight.do(key, encode, label=key[0])
+    return Response(content=body, media_type="application/json")
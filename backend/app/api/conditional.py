@@ -0,0 +1,133 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional, Sequence, Tuple
+from fastapi import Request, Response, status
+
+# Validators are derived from ``_id`` plus ``updated_at`` rather than from
+# the response body, so an unchanged resource can be recognised from a
+# projection-only query before the full document is fetched or serialized.
+# They are weak ETags: equal tags promise the same data, not the same bytes.
+
+VALIDATOR_PROJECTION = {"_id": 1, "updated_at": 1}
+
+# Per-user data: browsers may keep it, but must revalidate before reuse
+CACHE_CONTROL = "private, no-cache"
+
+Validators = Tuple[str, Optional[datetime]]
+
+def compute_validators(documents: Sequence[dict], many: bool = False, salt: str = "") -> Optional[Validators]:
+    """ETag and Last-Modified for one document, or for a list of them.
+
+    Returns ``None`` when a document has no ``updated_at``, since changes to
+    it could not be detected. Lists get no Last-Modified: removing a document
+    does not move the newest ``updated_at``, so only the ETag is reliable.
+    ``salt`` separates representations of the same documents, e.g. pages.
+    """
+    digest = hashlib.blake2b(salt.encode(), digest_size=12)
+    newest = None
+    for document in documents:
+        updated_at = document.get("updated_at")
+        if not isinstance(updated_at, datetime):
+            return None
+        digest.update(f"|{document['_id']}:{updated_at.isoformat()}".encode())
+        if newest is None or updated_at > newest:
+            newest = updated_at
+    return f'W/"{digest.hexdigest()}"', None if many else newest
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    if header.strip() == "*":
+        return True
+    opaque = _opaque(etag)
+    return any(_opaque(tag) == opaque for tag in header.split(","))
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    # HTTP dates have whole seconds; stored timestamps have milliseconds
+    return last_modified.replace(microsecond=0) <= since
+
+def is_conditional(request: Request) -> bool:
+    """Whether the request carries a validator worth probing for."""
+    headers = request.headers
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when it is absent (RFC 9110)."""
+    etag, last_modified = validators
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        return _not_modified_since(if_modified_since, last_modified)
+    return False
+
+def set_validators(response: Response, validators: Optional[Validators]) -> Response:
+    """Add ETag, Last-Modified and Cache-Control headers to a response."""
+    if validators is None:
+        return response
+    etag, last_modified = validators
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = _http_date(last_modified)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+def not_modified_response(validators: Validators) -> Response:
+    """An empty 304 repeating the validators, as clients expect."""
+    return set_validators(Response(status_code=status.HTTP_304_NOT_MODIFIED), validators)
+
+def page_salt(skip: int, limit: int) -> str:
+    """Salt for a page's ETag, so different windows never share one."""
+    return f"{skip}:{limit}"
+
+async def probe_one(request: Request, collection, query: dict, sort: Optional[List] = None) -> Optional[Response]:
+    """Answer a conditional request for a single document with a 304 if unchanged.
+
+    Only ``_id`` and ``updated_at`` are fetched. Returns ``None`` when the
+    request is not conditional or the document changed (or is missing), in
+    which case the handler fetches and serializes as usual.
+    """
+    if not is_conditional(request):
+        return None
+    current = await collection.find_one(query, VALIDATOR_PROJECTION, sort=sort)
+    if current is None:
+        return None
+    validators = compute_validators([current])
+    if validators is not None and is_not_modified(request, validators):
+        return not_modified_response(validators)
+    return None
+
+async def probe_many(
+    request: Request,
+    collection,
+    query: dict,
+    sort: List,
+    skip: int,
+    limit: int
+) -> Optional[Response]:
+    """Like ``probe_one`` for a skip/limit page of documents.
+
+    The salt matches the one handlers pass to ``compute_validators`` for the
+    full page, so both produce the same ETag for the same documents.
+    """
+    if not is_conditional(request):
+        return None
+    cursor = collection.find(query, VALIDATOR_PROJECTION, sort=sort).skip(skip).limit(limit)
+    validators = compute_validators(await cursor.to_list(length=limit), many=True, salt=page_salt(skip, limit))
+    if validators is not None and is_not_modified(request, validators):
+        return not_modified_response(validators)
+    return None
@@ -1,12 +1,59 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.cache import shared_cache
+from app.core.config import settings
 from app.core.security import verify_token
 from app.core.database import get_collection
+from app.core.loaders import Loaders
 from app.models.user import TokenData, UserRole
+import bson
 from bson import ObjectId
 
 security = HTTPBearer()
 
+# Authenticated user documents live in the shared cache, BSON-encoded and
+# tagged per user, so most requests resolve their principal without a users
+# round-trip and a suspension or role change invalidates it on every worker.
+
+def principal_key(user_id) -> str:
+    """Cache key (and invalidation tag) for one user's principal."""
+    return f"principal:{user_id}"
+
+async def load_principal(user_id: str):
+    """Get a user document by id, served from the shared cache when possible."""
+    key = principal_key(user_id)
+    cached = await shared_cache.get(key)
+    if cached is not None:
+        return bson.decode(cached)
+    
+    users_collection = get_collection("users")
+    user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"password_hash": 0})
+    if user:
+        await shared_cache.set(key, bson.encode(user), settings.PRINCIPAL_CACHE_TTL_SECONDS, tags=(key,))
+    return user
+
+async def principal_from_token(token: str):
+    """Get the user a bearer token belongs to, or None for an invalid token."""
+    payload = verify_token(token)
+    if not payload:
+        return None
+    return await load_principal(payload["sub"])
+
+def is_admin(user) -> bool:
+    """Whether a user document belongs to an active admin."""
+    return bool(user) and user["status"] == "active" and user["role"] == UserRole.ADMIN
+
+async def invalidate_principal(user_id) -> None:
+    """Drop a cached principal on every worker after the user document changes."""
+    await shared_cache.invalidate(principal_key(user_id))
+
+def get_loaders(request: Request) -> Loaders:
+    """Get the batch loaders attached to the current request."""
+    loaders = getattr(request.state, "loaders", None)
+    if loaders is None:
+        loaders = request.state.loaders = Loaders()
+    return loaders
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user from token."""
     token = credentials.credentials
@@ -18,8 +65,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    users_collection = get_collection("users")
-    user = await users_collection.find_one({"_id": ObjectId(payload["sub"])})
+    user = await load_principal(payload["sub"])
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,77 @@
+import base64
+import binascii
+from typing import List, Optional, Sequence, Tuple
+from bson import json_util
+from fastapi import HTTPException, Response, status
+from pymongo import ASCENDING
+
+# List endpoints keep returning plain arrays for the frontend, so the cursor
+# for the following page travels in a response header instead of the body.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+SortSpec = Sequence[Tuple[str, int]]
+
+def encode_cursor(doc: dict, sort: SortSpec) -> str:
+    """Encode the sort key values of the last document on a page."""
+    values = [doc.get(field) for field, _ in sort]
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+def decode_cursor(cursor: str, sort: SortSpec) -> list:
+    """Decode a cursor produced by ``encode_cursor`` for the same sort."""
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return values
+
+def keyset_filter(query: dict, sort: SortSpec, cursor: str) -> dict:
+    """Restrict a query to documents that sort after the cursor position.
+
+    For a sort on (a, b, _id) this builds
+    ``a > x OR (a == x AND b > y) OR (a == x AND b == y AND _id > z)``,
+    flipping to ``<`` for descending keys, which a compound index on the same
+    keys can answer without walking earlier pages.
+    """
+    values = decode_cursor(cursor, sort)
+    clauses = []
+    for position, (field, direction) in enumerate(sort):
+        clause = {sort[index][0]: values[index] for index in range(position)}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[position]}
+        clauses.append(clause)
+
+    if query:
+        return {"$and": [query, {"$or": clauses}]}
+    return {"$or": clauses}
+
+async def fetch_page(
+    collection,
+    query: dict,
+    sort: SortSpec,
+    response: Response,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    projection: Optional[dict] = None
+) -> List[dict]:
+    """Fetch one page of a sorted query.
+
+    With a cursor the page is found by keyset and ``skip`` is ignored;
+    without one the old skip/limit behaviour is kept. ``sort`` must end with
+    ``_id`` so every position is unique. When more documents follow, the
+    cursor for the next page is set in the ``X-Next-Cursor`` header.
+    """
+    if cursor:
+        find_cursor = collection.find(keyset_filter(query, sort, cursor), projection, sort=list(sort))
+    else:
+        find_cursor = collection.find(query, projection, sort=list(sort)).skip(skip)
+
+    docs = await find_cursor.limit(limit + 1).to_list(length=limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(docs[-1], sort)
+    return docs
@@ -0,0 +1,212 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import secrets
+import time
+from collections import deque
+from typing import Optional, Tuple
+from urllib.parse import parse_qs
+import orjson
+from starlette.datastructures import MutableHeaders
+from app.api.deps import is_admin, principal_from_token
+from app.core.cache import shared_cache
+from app.core.config import settings
+
+try:
+    import pyinstrument
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pyinstrument is optional; cProfile is always available
+    pyinstrument = None
+
+# An admin adds "X-Profile: html" (or "speedscope") to a request, or
+# "?_profile=html" to its URL, and the request runs under a profiler. The
+# response carries an X-Profile-Id header; the artifact is kept in the
+# shared cache, so GET /api/v1/admin/profiles/{id} works from any worker.
+# The id is reserved with a pending marker before the headers go out, and
+# the profile is rendered after the response has been sent, so fetching it
+# straight away can answer 202 with Retry-After until it is stored.
+# Requests from anyone else ignore the flag.
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "_profile"
+FORMATS = ("html", "speedscope")
+PENDING_PROFILE = b"pending"
+
+def profile_key(profile_id: str) -> str:
+    """Shared cache key of a stored profile."""
+    return f"profile:{profile_id}"
+
+def pack_profile(media_type: str, meta: dict, body: bytes) -> bytes:
+    """Store media type and request details on the first line."""
+    return orjson.dumps([media_type, meta]) + b"\n" + body
+
+def unpack_profile(entry: bytes) -> Tuple[str, dict, bytes]:
+    """Split a stored profile into media type, details and body."""
+    header, _, body = entry.partition(b"\n")
+    media_type, meta = orjson.loads(header)
+    return media_type, meta, body
+
+class ProfileLimiter:
+    """At most ``per_minute`` profiles per worker, and one at a time.
+
+    Profiling slows the request down several times over and cProfile slows
+    every request on the worker, so the cap keeps the flag from being used
+    as a way to load the server.
+    """
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._started = deque()
+        self.active = False
+        self.profiled = 0
+        self.rejected = 0
+
+    def acquire(self) -> Optional[str]:
+        """Take a slot, or return why none is free."""
+        now = time.monotonic()
+        while self._started and now - self._started[0] >= 60:
+            self._started.popleft()
+        if self.active:
+            self.rejected += 1
+            return "busy"
+        if len(self._started) >= self.per_minute:
+            self.rejected += 1
+            return "rate-limited"
+        self._started.append(now)
+        self.active = True
+        self.profiled += 1
+        return None
+
+    def release(self):
+        self.active = False
+
+    def stats(self) -> dict:
+        return {
+            "profiler": "pyinstrument" if pyinstrument is not None else "cprofile",
+            "per_minute": self.per_minute,
+            "profiled": self.profiled,
+            "rejected": self.rejected,
+        }
+
+profile_limiter = ProfileLimiter(settings.PROFILER_MAX_PER_MINUTE)
+
+class RequestProfiler:
+    """Sampling profile with pyinstrument when installed, else cProfile.
+
+    pyinstrument follows the request's own task across awaits. cProfile
+    sees the whole thread, so work of other requests running meanwhile
+    shows up too; it renders as a text report sorted by cumulative time.
+    """
+
+    def __init__(self, output_format: str):
+        self.output_format = output_format
+        if pyinstrument is not None:
+            self._profiler = pyinstrument.Profiler(interval=settings.PROFILER_INTERVAL_MS / 1000, async_mode="enabled")
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if pyinstrument is not None:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self):
+        if pyinstrument is not None:
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def render(self) -> Tuple[str, bytes]:
+        """Media type and body of the artifact."""
+        if pyinstrument is None:
+            report = io.StringIO()
+            pstats.Stats(self._profiler, stream=report).sort_stats("cumulative").print_stats(80)
+            return "text/plain", report.getvalue().encode()
+        if self.output_format == "speedscope":
+            return "application/json", self._profiler.output(SpeedscopeRenderer()).encode()
+        return "text/html", self._profiler.output_html().encode()
+
+def _requested_format(scope) -> Optional[str]:
+    """Output format asked for by the header or query flag, if any."""
+    value = None
+    for name, header_value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            value = header_value.decode("latin-1")
+            break
+    query_string = scope.get("query_string", b"")
+    if value is None and PROFILE_QUERY.encode() in query_string:
+        values = parse_qs(query_string.decode("latin-1")).get(PROFILE_QUERY)
+        value = values[0] if values else None
+    if value is None:
+        return None
+    value = value.strip().lower()
+    return value if value in FORMATS else "html"
+
+async def _is_admin_request(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return False
+            return is_admin(await principal_from_token(token.strip()))
+    return False
+
+class ProfilerMiddleware:
+    """Run flagged admin requests under a profiler and store the result."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        output_format = _requested_format(scope)
+        if output_format is None or not await _is_admin_request(scope):
+            await self.app(scope, receive, send)
+            return
+
+        refused = profile_limiter.acquire()
+        profile_id = None if refused else secrets.token_urlsafe(12)
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if refused:
+                    headers["X-Profile"] = refused
+                else:
+                    headers["X-Profile-Id"] = profile_id
+            await send(message)
+
+        if refused:
+            await self.app(scope, receive, send_with_profile)
+            return
+
+        key = profile_key(profile_id)
+        await shared_cache.set(key, PENDING_PROFILE, ttl=settings.PROFILER_TTL_SECONDS)
+        profiler = RequestProfiler(output_format)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.stop()
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            profile_limiter.release()
+            try:
+                # Rendering walks the whole call tree; keep it off the event loop
+                media_type, body = await asyncio.get_running_loop().run_in_executor(None, profiler.render)
+            except Exception:
+                await shared_cache.delete(key)
+                raise
+            route = scope.get("route")
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "duration_ms": duration_ms,
+                "created_at": time.time(),
+            }
+            await shared_cache.set(key, pack_profile(media_type, meta, body), ttl=settings.PROFILER_TTL_SECONDS)
@@ -0,0 +1,142 @@
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Type, Union, get_args, get_origin
+import orjson
+from bson import ObjectId
+from fastapi import Response
+from pydantic import BaseModel
+
+# Handlers that return one of these responses skip FastAPI's response_model
+# validation and stdlib json encoding. The route keeps its response_model,
+# so the OpenAPI schema is unchanged.
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """Encode content with orjson; datetimes, dates and enums are native, ObjectIds become strings."""
+    return orjson.dumps(content, default=_default)
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> Response:
+    """Build a JSON response, keeping headers a handler set on its ``response`` parameter."""
+    json = Response(content=dumps(content), status_code=status_code, media_type="application/json")
+    if response is not None:
+        for key, value in response.headers.items():
+            if key not in ("content-length", "content-type"):
+                json.headers.append(key, value)
+    return json
+
+def _to_str(value):
+    # date covers datetime too; str fields like created_at hold ISO strings
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+def _to_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def _to_float(value):
+    return float(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+def _each(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def convert_list(value):
+        return value if value is None else [convert(item) for item in value]
+    return convert_list
+
+def _nested(model: Type[BaseModel]) -> Callable[[Any], Any]:
+    to_dict = DocumentSerializer(model).to_dict
+    def convert_model(value):
+        return value if value is None else to_dict(value)
+    return convert_model
+
+def _converter(annotation) -> Optional[Callable[[Any], Any]]:
+    """Pick the conversion a stored value needs to match a field's type.
+
+    Converters all pass ``None`` through unchanged.
+    """
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None
+        annotation = args[0]
+    if get_origin(annotation) in (list, List):
+        args = get_args(annotation)
+        convert = _converter(args[0]) if args else None
+        return _each(convert) if convert is not None else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _nested(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return None
+    if annotation is str:
+        return _to_str
+    if annotation is date:
+        return _to_date
+    if annotation is float:
+        return _to_float
+    return None
+
+def _reader(
+    model: Type[BaseModel],
+    name: str,
+    source: str,
+    convert: Optional[Callable[[Any], Any]],
+    required: bool,
+    default: Any
+) -> Callable[[dict], Any]:
+    """Build the function reading one field from a stored document."""
+    if required:
+        def get(document):
+            try:
+                return document[source]
+            except KeyError:
+                raise ValueError(f"{model.__name__}.{name} is required but the document has no {source!r}") from None
+    else:
+        def get(document):
+            return document.get(source, default)
+
+    if convert is None:
+        return get
+
+    def read(document):
+        return convert(get(document))
+    return read
+
+class DocumentSerializer:
+    """Turn Mongo documents into a response model's JSON without validating them.
+
+    The field list and per-field conversions are worked out once from the
+    model: ``id`` is read from ``_id``, ``str`` fields accept ObjectIds and
+    datetimes, ``date`` fields accept the datetimes Mongo stores, nested
+    models (and lists of them) are serialized the same way, and only the
+    model's fields are emitted (so e.g. ``password_hash`` never leaks).
+    Missing optional fields fall back to the model default; a missing
+    required field raises ``ValueError``, which surfaces as a 500 just as a
+    failed response_model validation would.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields: List[Tuple[str, Callable[[dict], Any]]] = []
+        for name, info in model.model_fields.items():
+            source = "_id" if name == "id" else name
+            required = info.is_required()
+            default = None if required else info.get_default(call_default_factory=True)
+            self.fields.append((name, _reader(model, name, source, _converter(info.annotation), required, default)))
+
+    def to_dict(self, document: dict) -> dict:
+        """Build the response dict for one document."""
+        return {name: read(document) for name, read in self.fields}
+
+    def response(self, document: dict, response: Optional[Response] = None) -> Response:
+        """Serialize one document into a JSON response."""
+        return json_response(self.to_dict(document), response)
+
+    def list_response(self, documents: Iterable[dict], response: Optional[Response] = None) -> Response:
+        """Serialize documents into a JSON array response."""
+        return json_response([self.to_dict(document) for document in documents], response)
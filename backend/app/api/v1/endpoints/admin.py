@@ -1,21 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.api.deps import get_current_admin
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from app.api.caching import invalidate, nutritionist_tag
+from app.api.coalescing import request_flight
+from app.api.deps import get_current_admin, get_loaders, invalidate_principal
+from app.api.pagination import fetch_page
+from app.api.profiling import PENDING_PROFILE, profile_key, profile_limiter, unpack_profile
+from app.api.responses import DocumentSerializer
+from app.api.writes import update_or_404
+from app.core.cache import shared_cache
+from app.core.compression import compression_stats
 from app.core.database import get_collection
+from app.core.loaders import Loaders
 from app.models.user import UserResponse, UserUpdate
 from app.models.profile import NutritionistProfileUpdate
+from app.services.platform_metrics import platform_metrics
 from bson import ObjectId
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import datetime
+from typing import List, Dict, Optional
 
 router = APIRouter()
 
+user_serializer = DocumentSerializer(UserResponse)
+
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
+    response: Response,
     current_user = Depends(get_current_admin),
     role: str = None,
     status: str = None,
     limit: int = 50,
-    skip: int = 0
+    skip: int = 0,
+    cursor: Optional[str] = None
 ):
     """Get all users with optional filtering."""
     users_collection = get_collection("users")
@@ -27,21 +41,12 @@ async def get_all_users(
     if status:
         query["status"] = status
     
-    cursor = users_collection.find(query, sort=[("created_at", -1)]).skip(skip).limit(limit)
-    
-    users = []
-    async for user in cursor:
-        users.append({
-            "id": str(user["_id"]),
-            "email": user["email"],
-            "phone": user["phone"],
-            "role": user["role"],
-            "status": user["status"],
-            "created_at": user["created_at"],
-            "updated_at": user["updated_at"]
-        })
+    page = await fetch_page(
+        users_collection, query, [("created_at", -1), ("_id", -1)],
+        response, limit, skip=skip, cursor=cursor
+    )
     
-    return users
+    return user_serializer.list_response(page, response)
 
 @router.put("/users/{user_id}", response_model=UserResponse)
 async def update_user(
@@ -52,35 +57,21 @@ async def update_user(
     """Update user information."""
     users_collection = get_collection("users")
     
-    # Check if user exists
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     # Update user
     update_data = user_data.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    await users_collection.update_one(
+    updated_user = await update_or_404(
+        users_collection,
         {"_id": ObjectId(user_id)},
-        {"$set": update_data}
+        update_data,
+        "User not found",
+        duplicate_detail="Email already registered",
+        projection={"password_hash": 0}
     )
+    await invalidate_principal(user_id)
     
-    # Get updated user
-    updated_user = await users_collection.find_one({"_id": ObjectId(user_id)})
-    
-    return {
-        "id": str(updated_user["_id"]),
-        "email": updated_user["email"],
-        "phone": updated_user["phone"],
-        "role": updated_user["role"],
-        "status": updated_user["status"],
-        "created_at": updated_user["created_at"],
-        "updated_at": updated_user["updated_at"]
-    }
+    return user_serializer.response(updated_user)
 
 @router.post("/nutritionists/{nutritionist_id}/verify")
 async def verify_nutritionist(
@@ -103,77 +94,79 @@ async def verify_nutritionist(
         {"user_id": ObjectId(nutritionist_id)},
         {"$set": {"verified": True, "updated_at": datetime.utcnow()}}
     )
+    await invalidate(nutritionist_tag(nutritionist_id))
     
     return {"message": "Nutritionist verified successfully"}
 
 @router.get("/metrics", response_model=Dict)
 async def get_platform_metrics(current_user = Depends(get_current_admin)):
     """Get platform metrics and analytics."""
-    users_collection = get_collection("users")
-    subscriptions_collection = get_collection("subscriptions")
-    meal_plans_collection = get_collection("meal_plans")
-    progress_collection = get_collection("progress_reports")
-    
-    # Get user counts by role
-    patient_count = await users_collection.count_documents({"role": "patient"})
-    nutritionist_count = await users_collection.count_documents({"role": "nutritionist"})
-    admin_count = await users_collection.count_documents({"role": "admin"})
-    
-    # Get subscription metrics
-    active_subscriptions = await subscriptions_collection.count_documents({"status": "active"})
-    total_revenue = 0  # This would be calculated from actual payment data
-    
-    # Get meal plan metrics
-    total_meal_plans = await meal_plans_collection.count_documents({})
-    published_meal_plans = await meal_plans_collection.count_documents({"status": "published"})
-    
-    # Get progress metrics
-    total_progress_reports = await progress_collection.count_documents({})
-    
-    # Get recent activity
-    recent_users = await users_collection.count_documents({
-        "created_at": {"$gte": datetime.utcnow() - timedelta(days=30)}
-    })
-    
-    return {
-        "users": {
-            "total_patients": patient_count,
-            "total_nutritionists": nutritionist_count,
-            "total_admins": admin_count,
-            "recent_signups_30d": recent_users
-        },
-        "subscriptions": {
-            "active_subscriptions": active_subscriptions,
-            "total_revenue": total_revenue
-        },
-        "meal_plans": {
-            "total_meal_plans": total_meal_plans,
-            "published_meal_plans": published_meal_plans
-        },
-        "progress": {
-            "total_progress_reports": total_progress_reports
-        }
+    # Served from the background snapshot; only the very first call computes
+    return await platform_metrics.get()
+
+@router.get("/metrics/compression", response_model=Dict)
+async def get_compression_metrics(current_user = Depends(get_current_admin)):
+    """Get bytes saved and CPU spent by response compression in this worker."""
+    return compression_stats.stats()
+
+@router.get("/metrics/cache", response_model=Dict)
+async def get_cache_metrics(current_user = Depends(get_current_admin)):
+    """Get shared cache hit ratio and stampede counters for this worker."""
+    return shared_cache.stats()
+
+@router.get("/metrics/singleflight", response_model=Dict)
+async def get_singleflight_metrics(current_user = Depends(get_current_admin)):
+    """Get how many concurrent duplicate requests shared one computation in this worker."""
+    return request_flight.stats()
+
+@router.get("/metrics/profiler", response_model=Dict)
+async def get_profiler_metrics(current_user = Depends(get_current_admin)):
+    """Get how many requests this worker profiled or refused to profile."""
+    return profile_limiter.stats()
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, current_user = Depends(get_current_admin)):
+    """Get a stored request profile (HTML, speedscope JSON or a cProfile report)."""
+    entry = await shared_cache.get(profile_key(profile_id))
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found or expired"
+        )
+    if entry == PENDING_PROFILE:
+        # The profiled request has answered but its profile is still being rendered
+        return Response(status_code=status.HTTP_202_ACCEPTED, headers={"Retry-After": "1"})
+    
+    media_type, meta, body = unpack_profile(entry)
+    headers = {
+        "X-Profile-Route": f"{meta['method']} {meta['route'] or meta['path']}",
+        "X-Profile-Duration-Ms": str(meta["duration_ms"]),
     }
+    if media_type == "application/json":
+        headers["Content-Disposition"] = f'attachment; filename="profile-{profile_id}.speedscope.json"'
+    return Response(content=body, media_type=media_type, headers=headers)
 
 @router.get("/nutritionists/pending", response_model=List[Dict])
 async def get_pending_nutritionists(
     current_user = Depends(get_current_admin),
     limit: int = 20,
-    skip: int = 0
+    skip: int = 0,
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get nutritionists pending verification."""
     nutritionist_profiles_collection = get_collection("nutritionist_profiles")
-    users_collection = get_collection("users")
     
     cursor = nutritionist_profiles_collection.find(
         {"verified": False},
         sort=[("created_at", -1)]
     ).skip(skip).limit(limit)
+    profiles = await cursor.to_list(length=limit)
+    
+    # User info for the whole page in one query
+    users = await loaders.users.load_many(profile["user_id"] for profile in profiles)
     
     pending_nutritionists = []
-    async for profile in cursor:
-        # Get user info
-        user = await users_collection.find_one({"_id": profile["user_id"]})
+    for profile, user in zip(profiles, users):
         if user:
             pending_nutritionists.append({
                 "user_id": str(profile["user_id"]),
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from app.api.caching import invalidate, nutritionist_tag, patient_tag
 from app.api.deps import get_current_admin, get_current_nutritionist
+from app.api.pagination import fetch_page
+from app.api.responses import DocumentSerializer
+from app.api.writes import update_or_404
 from app.core.database import get_collection
 from app.models.assignment import AssignmentCreate, AssignmentUpdate, AssignmentResponse
 from app.models.user import UserRole
 from bson import ObjectId
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
+assignment_serializer = DocumentSerializer(AssignmentResponse)
+
 @router.post("/", response_model=AssignmentResponse)
 async def create_assignment(
     assignment_data: AssignmentCreate,
@@ -66,27 +72,20 @@ async def create_assignment(
     
     result = await assignments_collection.insert_one(assignment_doc)
     assignment_doc["_id"] = result.inserted_id
+    await invalidate(patient_tag(assignment_doc["patient_id"]), nutritionist_tag(assignment_doc["nutritionist_id"]))
     
-    return {
-        "id": str(assignment_doc["_id"]),
-        "patient_id": str(assignment_doc["patient_id"]),
-        "nutritionist_id": str(assignment_doc["nutritionist_id"]),
-        "start_date": assignment_doc["start_date"],
-        "end_date": assignment_doc["end_date"],
-        "active": assignment_doc["active"],
-        "notes": assignment_doc["notes"],
-        "created_at": assignment_doc["created_at"],
-        "updated_at": assignment_doc["updated_at"]
-    }
+    return assignment_serializer.response(assignment_doc)
 
 @router.get("/", response_model=List[AssignmentResponse])
 async def get_assignments(
+    response: Response,
     current_user = Depends(get_current_admin),
     patient_id: str = None,
     nutritionist_id: str = None,
     active: bool = None,
     limit: int = 20,
-    skip: int = 0
+    skip: int = 0,
+    cursor: Optional[str] = None
 ):
     """Get assignments (Admin only)."""
     assignments_collection = get_collection("assignments")
@@ -100,23 +99,12 @@ async def get_assignments(
     if active is not None:
         query["active"] = active
     
-    cursor = assignments_collection.find(query, sort=[("created_at", -1)]).skip(skip).limit(limit)
-    
-    assignments = []
-    async for assignment in cursor:
-        assignments.append({
-            "id": str(assignment["_id"]),
-            "patient_id": str(assignment["patient_id"]),
-            "nutritionist_id": str(assignment["nutritionist_id"]),
-            "start_date": assignment["start_date"],
-            "end_date": assignment["end_date"],
-            "active": assignment["active"],
-            "notes": assignment["notes"],
-            "created_at": assignment["created_at"],
-            "updated_at": assignment["updated_at"]
-        })
+    page = await fetch_page(
+        assignments_collection, query, [("created_at", -1), ("_id", -1)],
+        response, limit, skip=skip, cursor=cursor
+    )
     
-    return assignments
+    return assignment_serializer.list_response(page, response)
 
 @router.put("/{assignment_id}", response_model=AssignmentResponse)
 async def update_assignment(
@@ -127,37 +115,19 @@ async def update_assignment(
     """Update an assignment (Admin only)."""
     assignments_collection = get_collection("assignments")
     
-    # Find assignment
-    assignment = await assignments_collection.find_one({"_id": ObjectId(assignment_id)})
-    if not assignment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Assignment not found"
-        )
-    
     # Update assignment
     update_data = assignment_data.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    await assignments_collection.update_one(
+    updated_assignment = await update_or_404(
+        assignments_collection,
         {"_id": ObjectId(assignment_id)},
-        {"$set": update_data}
+        update_data,
+        "Assignment not found"
     )
+    await invalidate(patient_tag(updated_assignment["patient_id"]), nutritionist_tag(updated_assignment["nutritionist_id"]))
     
-    # Get updated assignment
-    updated_assignment = await assignments_collection.find_one({"_id": ObjectId(assignment_id)})
-    
-    return {
-        "id": str(updated_assignment["_id"]),
-        "patient_id": str(updated_assignment["patient_id"]),
-        "nutritionist_id": str(updated_assignment["nutritionist_id"]),
-        "start_date": updated_assignment["start_date"],
-        "end_date": updated_assignment["end_date"],
-        "active": updated_assignment["active"],
-        "notes": updated_assignment["notes"],
-        "created_at": updated_assignment["created_at"],
-        "updated_at": updated_assignment["updated_at"]
-    }
+    return assignment_serializer.response(updated_assignment)
 
 @router.delete("/{assignment_id}")
 async def delete_assignment(
@@ -167,12 +137,16 @@ async def delete_assignment(
     """Delete an assignment (Admin only)."""
     assignments_collection = get_collection("assignments")
     
-    result = await assignments_collection.delete_one({"_id": ObjectId(assignment_id)})
+    deleted = await assignments_collection.find_one_and_delete(
+        {"_id": ObjectId(assignment_id)},
+        projection={"patient_id": 1, "nutritionist_id": 1}
+    )
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Assignment not found"
         )
+    await invalidate(patient_tag(deleted["patient_id"]), nutritionist_tag(deleted["nutritionist_id"]))
     
     return {"message": "Assignment deleted successfully"} 
\ No newline at end of file
@@ -2,47 +2,60 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from app.core.database import get_collection
-from app.core.security import verify_password, get_password_hash, create_access_token, create_refresh_token, verify_token
+from app.core.config import settings
+from app.core.hashing import password_hasher, PasswordHasherSaturated
+from app.core.security import create_access_token, create_refresh_token, verify_token
 from app.models.user import UserCreate, UserLogin, Token, UserResponse, UserRole, RefreshTokenRequest
 from app.api.deps import get_current_user
+from app.api.responses import DocumentSerializer
+from app.api.writes import insert_unique, reject_duplicate
 from bson import ObjectId
 from datetime import datetime
 
 router = APIRouter()
 
+user_serializer = DocumentSerializer(UserResponse)
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy. Please retry shortly.",
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
 @router.post("/signup", response_model=Token)
 async def signup(user_data: UserCreate):
     """Register a new user."""
     users_collection = get_collection("users")
     
-    # Check if user already exists
-    existing_user = await users_collection.find_one({"email": user_data.email})
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
+    # Reject a registered address before spending a bcrypt hash on it
+    await reject_duplicate(users_collection, {"email": user_data.email}, "Email already registered")
+    
+    try:
+        password_hash = await password_hasher.hash(user_data.password)
+    except PasswordHasherSaturated:
+        raise _hasher_busy()
     
     # Create user document
     user_doc = {
         "email": user_data.email,
         "phone": user_data.phone,
         "role": user_data.role,
-        "password_hash": get_password_hash(user_data.password),
+        "password_hash": password_hash,
         "status": "active",
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
     
-    result = await users_collection.insert_one(user_doc)
-    user_doc["_id"] = result.inserted_id
+    # The unique email index still catches a concurrent signup for the same address
+    user_id = await insert_unique(users_collection, user_doc, "Email already registered", prechecked=True)
     
     # Create tokens
     access_token = create_access_token(
-        data={"sub": str(result.inserted_id), "email": user_data.email, "role": user_data.role}
+        data={"sub": str(user_id), "email": user_data.email, "role": user_data.role}
     )
     refresh_token = create_refresh_token(
-        data={"sub": str(result.inserted_id), "email": user_data.email, "role": user_data.role}
+        data={"sub": str(user_id), "email": user_data.email, "role": user_data.role}
     )
     
     return {
@@ -66,7 +79,12 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         )
     
     # Verify password
-    if not verify_password(form_data.password, user["password_hash"]):
+    try:
+        password_ok = await password_hasher.verify(form_data.password, user["password_hash"])
+    except PasswordHasherSaturated:
+        raise _hasher_busy()
+    
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -121,12 +139,4 @@ async def refresh_token(request: RefreshTokenRequest):
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user = Depends(get_current_user)):
     """Get current user information."""
-    return {
-        "id": str(current_user["_id"]),
-        "email": current_user["email"],
-        "phone": current_user["phone"],
-        "role": current_user["role"],
-        "status": current_user["status"],
-        "created_at": current_user["created_at"],
-        "updated_at": current_user["updated_at"]
-    } 
\ No newline at end of file
+    return user_serializer.response(current_user) 
\ No newline at end of file
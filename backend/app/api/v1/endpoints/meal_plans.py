@@ -1,13 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from app.api.caching import invalidate, nutritionist_tag, patient_tag
+from app.api.conditional import compute_validators, probe_one, set_validators
 from app.api.deps import get_current_nutritionist
+from app.api.pagination import fetch_page
+from app.api.responses import DocumentSerializer
+from app.api.writes import insert_unique, update_or_404
 from app.core.database import get_collection
 from app.models.meal_plan import MealPlanCreate, MealPlanUpdate, MealPlanResponse, MealPlanSummary
+from app.services.meal_plan_totals import compute_nutrition_totals
 from bson import ObjectId
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
+meal_plan_serializer = DocumentSerializer(MealPlanResponse)
+
+# Listings only need the stored totals, never the days array
+SUMMARY_PROJECTION = {
+    "patient_id": 1,
+    "nutritionist_id": 1,
+    "week_start": 1,
+    "status": 1,
+    "totals": 1
+}
+
 @router.post("/", response_model=MealPlanResponse)
 async def create_meal_plan(
     meal_plan_data: MealPlanCreate,
@@ -30,18 +47,6 @@ async def create_meal_plan(
             detail="Patient not assigned to this nutritionist"
         )
     
-    # Check if meal plan already exists for this week
-    existing_plan = await meal_plans_collection.find_one({
-        "patient_id": ObjectId(meal_plan_data.patient_id),
-        "week_start": datetime.combine(meal_plan_data.week_start, datetime.min.time())  # Convert date to datetime for query
-    })
-    
-    if existing_plan:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Meal plan already exists for this week"
-        )
-    
     # Create meal plan
     meal_plan_doc = {
         "patient_id": ObjectId(meal_plan_data.patient_id),
@@ -53,21 +58,13 @@ async def create_meal_plan(
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
+    meal_plan_doc.update(compute_nutrition_totals(meal_plan_doc["days"]))
     
-    result = await meal_plans_collection.insert_one(meal_plan_doc)
-    meal_plan_doc["_id"] = result.inserted_id
-    
-    return {
-        "id": str(meal_plan_doc["_id"]),
-        "patient_id": str(meal_plan_doc["patient_id"]),
-        "nutritionist_id": str(meal_plan_doc["nutritionist_id"]),
-        "week_start": meal_plan_doc["week_start"].date() if isinstance(meal_plan_doc["week_start"], datetime) else meal_plan_doc["week_start"],
-        "notes": meal_plan_doc["notes"],
-        "status": meal_plan_doc["status"],
-        "days": meal_plan_doc["days"],
-        "created_at": meal_plan_doc["created_at"].isoformat(),
-        "updated_at": meal_plan_doc["updated_at"].isoformat()
-    }
+    # One plan per patient and week is enforced by a unique index
+    await insert_unique(meal_plans_collection, meal_plan_doc, "Meal plan already exists for this week")
+    await invalidate(patient_tag(meal_plan_doc["patient_id"]), nutritionist_tag(current_user["_id"]))
+    
+    return meal_plan_serializer.response(meal_plan_doc)
 
 @router.put("/{meal_plan_id}", response_model=MealPlanResponse)
 async def update_meal_plan(
@@ -78,53 +75,33 @@ async def update_meal_plan(
     """Update a meal plan."""
     meal_plans_collection = get_collection("meal_plans")
     
-    # Get meal plan
-    meal_plan = await meal_plans_collection.find_one({
-        "_id": ObjectId(meal_plan_id),
-        "nutritionist_id": current_user["_id"]
-    })
-    
-    if not meal_plan:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Meal plan not found"
-        )
-    
     # Update meal plan
     update_data = meal_plan_data.dict(exclude_unset=True)
     
-    # Convert days to dictionaries if present
-    if "days" in update_data and update_data["days"]:
-        update_data["days"] = [day.dict() for day in update_data["days"]]
+    # Days are already plain dictionaries here; keep the stored totals in step
+    if update_data.get("days") is not None:
+        update_data.update(compute_nutrition_totals(update_data["days"]))
     
     update_data["updated_at"] = datetime.utcnow()
     
-    await meal_plans_collection.update_one(
-        {"_id": ObjectId(meal_plan_id)},
-        {"$set": update_data}
+    updated_plan = await update_or_404(
+        meal_plans_collection,
+        {"_id": ObjectId(meal_plan_id), "nutritionist_id": current_user["_id"]},
+        update_data,
+        "Meal plan not found"
     )
+    await invalidate(patient_tag(updated_plan["patient_id"]), nutritionist_tag(current_user["_id"]))
     
-    # Get updated meal plan
-    updated_plan = await meal_plans_collection.find_one({"_id": ObjectId(meal_plan_id)})
-    
-    return {
-        "id": str(updated_plan["_id"]),
-        "patient_id": str(updated_plan["patient_id"]),
-        "nutritionist_id": str(updated_plan["nutritionist_id"]),
-        "week_start": updated_plan["week_start"].date() if isinstance(updated_plan["week_start"], datetime) else updated_plan["week_start"],
-        "notes": updated_plan.get("notes"),
-        "status": updated_plan["status"],
-        "days": updated_plan["days"],
-        "created_at": updated_plan["created_at"].isoformat(),
-        "updated_at": updated_plan["updated_at"].isoformat()
-    }
+    return meal_plan_serializer.response(updated_plan)
 
 @router.get("/", response_model=List[MealPlanSummary])
 async def get_meal_plans(
+    response: Response,
     current_user = Depends(get_current_nutritionist),
     patient_id: str = None,
     limit: int = 20,
-    skip: int = 0
+    skip: int = 0,
+    cursor: Optional[str] = None
 ):
     """Get meal plans created by the nutritionist."""
     meal_plans_collection = get_collection("meal_plans")
@@ -134,33 +111,33 @@ async def get_meal_plans(
     if patient_id:
         query["patient_id"] = ObjectId(patient_id)
     
-    cursor = meal_plans_collection.find(query, sort=[("week_start", -1)]).skip(skip).limit(limit)
+    page = await fetch_page(
+        meal_plans_collection, query, [("week_start", -1), ("_id", -1)],
+        response, limit, skip=skip, cursor=cursor, projection=SUMMARY_PROJECTION
+    )
+    
+    # Plans written before totals were stored (and not yet backfilled)
+    missing_ids = [plan["_id"] for plan in page if "totals" not in plan]
+    if missing_ids:
+        plans = meal_plans_collection.find({"_id": {"$in": missing_ids}}, {"days": 1})
+        computed = {plan["_id"]: compute_nutrition_totals(plan["days"])["totals"] async for plan in plans}
+        for plan in page:
+            if plan["_id"] in computed:
+                plan["totals"] = computed[plan["_id"]]
     
     meal_plans = []
-    async for plan in cursor:
-        # Calculate totals
-        total_calories = 0
-        total_protein = 0
-        total_carbs = 0
-        total_fat = 0
-        
-        for day in plan["days"]:
-            for meal in day["meals"]:
-                total_calories += meal["calories"]
-                total_protein += meal["protein_g"]
-                total_carbs += meal["carbs_g"]
-                total_fat += meal["fat_g"]
-        
+    for plan in page:
+        totals = plan["totals"]
         meal_plans.append({
             "id": str(plan["_id"]),
             "patient_id": str(plan["patient_id"]),
             "nutritionist_id": str(plan["nutritionist_id"]),
             "week_start": plan["week_start"].date() if isinstance(plan["week_start"], datetime) else plan["week_start"],
             "status": plan["status"],
-            "total_calories": total_calories,
-            "total_protein": total_protein,
-            "total_carbs": total_carbs,
-            "total_fat": total_fat
+            "total_calories": totals["calories"],
+            "total_protein": totals["protein"],
+            "total_carbs": totals["carbs"],
+            "total_fat": totals["fat"]
         })
     
     return meal_plans
@@ -168,15 +145,21 @@ async def get_meal_plans(
 @router.get("/{meal_plan_id}", response_model=MealPlanResponse)
 async def get_meal_plan(
     meal_plan_id: str,
+    request: Request,
     current_user = Depends(get_current_nutritionist)
 ):
     """Get a specific meal plan."""
     meal_plans_collection = get_collection("meal_plans")
-    
-    meal_plan = await meal_plans_collection.find_one({
+    query = {
         "_id": ObjectId(meal_plan_id),
         "nutritionist_id": current_user["_id"]
-    })
+    }
+    
+    not_modified = await probe_one(request, meal_plans_collection, query)
+    if not_modified is not None:
+        return not_modified
+    
+    meal_plan = await meal_plans_collection.find_one(query)
     
     if not meal_plan:
         raise HTTPException(
@@ -184,14 +167,4 @@ async def get_meal_plan(
             detail="Meal plan not found"
         )
     
-    return {
-        "id": str(meal_plan["_id"]),
-        "patient_id": str(meal_plan["patient_id"]),
-        "nutritionist_id": str(meal_plan["nutritionist_id"]),
-        "week_start": meal_plan["week_start"].date() if isinstance(meal_plan["week_start"], datetime) else meal_plan["week_start"],
-        "notes": meal_plan.get("notes"),
-        "status": meal_plan["status"],
-        "days": meal_plan["days"],
-        "created_at": meal_plan["created_at"].isoformat(),
-        "updated_at": meal_plan["updated_at"].isoformat()
-    } 
\ No newline at end of file
+    return set_validators(meal_plan_serializer.response(meal_plan), compute_validators([meal_plan])) 
\ No newline at end of file
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.api.deps import get_current_nutritionist
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from app.api.caching import cached_document_response, invalidate, nutritionist_tag, patient_tag
+from app.api.coalescing import coalesced_response
+from app.api.deps import get_current_nutritionist, get_loaders
+from app.api.pagination import fetch_page
+from app.api.responses import DocumentSerializer, dumps
+from app.api.writes import update_or_404
+from app.core.cache import shared_cache
+from app.core.config import settings
 from app.core.database import get_collection
+from app.core.loaders import Loaders
 from app.models.profile import NutritionistProfileResponse, NutritionistProfileUpdate
 from app.models.progress import ProgressReportResponse
 from app.models.meal_plan import MealPlanResponse
+from app.services.progress_rollups import get_rollups, rollup_averages
+from app.services.time_buckets import bucketed_series, resolve_range
 from bson import ObjectId
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 # Response models for new APIs
@@ -43,28 +54,81 @@ class NutritionistStats(BaseModel):
 
 router = APIRouter()
 
+profile_serializer = DocumentSerializer(NutritionistProfileResponse)
+progress_serializer = DocumentSerializer(ProgressReportResponse)
+meal_plan_serializer = DocumentSerializer(MealPlanResponse)
+
+def _adherence_status(avg_adherence: float) -> str:
+    if avg_adherence >= 80:
+        return "improving"
+    if avg_adherence >= 60:
+        return "stable"
+    return "declining"
+
+async def _build_patient_summaries(assignments: List[dict], loaders: Loaders) -> List[PatientSummary]:
+    """Summarise every assigned patient with a fixed number of queries.
+    
+    Profiles and users go through the request's batch loaders and rollups
+    are fetched with ``$in``, so the query count doesn't grow with the
+    number of patients or reports.
+    """
+    patient_ids = [assignment["patient_id"] for assignment in assignments]
+    if not patient_ids:
+        return []
+    
+    users, profiles, rollups = await asyncio.gather(
+        loaders.users.load_many(patient_ids),
+        loaders.patient_profiles.load_many(patient_ids),
+        get_rollups(patient_ids)
+    )
+    
+    patient_summaries = []
+    for patient_id, patient_user, patient_profile in zip(patient_ids, users, profiles):
+        if not patient_user:
+            continue
+        
+        patient_name = "Profile Not Created"
+        if patient_profile:
+            patient_name = f"{patient_profile['first_name']} {patient_profile['last_name']}"
+        
+        rollup = rollups.get(patient_id)
+        # Average weight loss is the simplified average weight, as before
+        avg_weight_loss, avg_adherence = rollup_averages(rollup)
+        total_reports = rollup["report_count"] if rollup else 0
+        last_report_date = datetime.now().isoformat()
+        if rollup and rollup.get("latest_report_at"):
+            last_report_date = rollup["latest_report_at"].isoformat()
+        
+        patient_summaries.append(PatientSummary(
+            patient_id=str(patient_id),
+            patient_name=patient_name,
+            total_reports=total_reports,
+            avg_weight_loss=round(avg_weight_loss, 1),
+            avg_adherence=round(avg_adherence, 0),
+            last_report_date=last_report_date,
+            status=_adherence_status(avg_adherence)
+        ))
+    
+    return patient_summaries
+
 @router.get("/profile", response_model=NutritionistProfileResponse)
-async def get_nutritionist_profile(current_user = Depends(get_current_nutritionist)):
+async def get_nutritionist_profile(request: Request, current_user = Depends(get_current_nutritionist)):
     """Get nutritionist profile."""
     nutritionist_profiles_collection = get_collection("nutritionist_profiles")
     
-    profile = await nutritionist_profiles_collection.find_one({"user_id": current_user["_id"]})
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
-        )
-    
-    return {
-        "id": str(profile["_id"]),
-        "user_id": str(profile["user_id"]),
-        "registration_no": profile["registration_no"],
-        "qualifications": profile["qualifications"],
-        "years_experience": profile["years_experience"],
-        "bio": profile["bio"],
-        "rate_week_inr": profile["rate_week_inr"],
-        "verified": profile["verified"]
-    }
+    async def load():
+        profile = await nutritionist_profiles_collection.find_one({"user_id": current_user["_id"]})
+        if not profile:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Profile not found"
+            )
+        return profile
+    
+    return await cached_document_response(
+        request, f"nutritionist_profile:{current_user['_id']}", load,
+        profile_serializer, [nutritionist_tag(current_user["_id"])]
+    )
 
 @router.put("/profile", response_model=NutritionistProfileResponse)
 async def update_nutritionist_profile(
@@ -74,63 +138,49 @@ async def update_nutritionist_profile(
     """Update nutritionist profile."""
     nutritionist_profiles_collection = get_collection("nutritionist_profiles")
     
-    # Check if profile exists
-    profile = await nutritionist_profiles_collection.find_one({"user_id": current_user["_id"]})
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found. Create a profile first."
-        )
-    
     # Update profile
     update_data = profile_data.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    await nutritionist_profiles_collection.update_one(
+    updated_profile = await update_or_404(
+        nutritionist_profiles_collection,
         {"user_id": current_user["_id"]},
-        {"$set": update_data}
+        update_data,
+        "Profile not found. Create a profile first."
     )
+    await invalidate(nutritionist_tag(current_user["_id"]))
     
-    # Get updated profile
-    updated_profile = await nutritionist_profiles_collection.find_one({"user_id": current_user["_id"]})
-    
-    return {
-        "id": str(updated_profile["_id"]),
-        "user_id": str(updated_profile["user_id"]),
-        "registration_no": updated_profile["registration_no"],
-        "qualifications": updated_profile["qualifications"],
-        "years_experience": updated_profile["years_experience"],
-        "bio": updated_profile["bio"],
-        "rate_week_inr": updated_profile["rate_week_inr"],
-        "verified": updated_profile["verified"]
-    }
+    return profile_serializer.response(updated_profile)
 
 @router.get("/patients", response_model=List[dict])
 async def get_nutritionist_patients(
+    response: Response,
     current_user = Depends(get_current_nutritionist),
     limit: int = 20,
-    skip: int = 0
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get list of patients assigned to the nutritionist."""
     assignments_collection = get_collection("assignments")
-    patient_profiles_collection = get_collection("patient_profiles")
-    users_collection = get_collection("users")
     
     # Get assignments for this nutritionist
-    cursor = assignments_collection.find(
-        {"nutritionist_id": current_user["_id"], "active": True}
-    ).skip(skip).limit(limit)
+    page = await fetch_page(
+        assignments_collection,
+        {"nutritionist_id": current_user["_id"], "active": True},
+        [("_id", 1)],
+        response, limit, skip=skip, cursor=cursor
+    )
+    
+    # Users and profiles for the whole page in one query each
+    patient_ids = [assignment["patient_id"] for assignment in page]
+    users, profiles = await asyncio.gather(
+        loaders.users.load_many(patient_ids),
+        loaders.patient_profiles.load_many(patient_ids)
+    )
     
     patients = []
-    async for assignment in cursor:
-        # Get patient profile
-        patient_profile = await patient_profiles_collection.find_one(
-            {"user_id": assignment["patient_id"]}
-        )
-        
-        # Get user info
-        patient_user = await users_collection.find_one({"_id": assignment["patient_id"]})
-        
+    for assignment, patient_user, patient_profile in zip(page, users, profiles):
         if patient_user:
             # Use profile data if available, otherwise use basic user info
             patient_name = "Profile Not Created"
@@ -182,33 +232,15 @@ async def get_patient_progress(
         sort=[("week_start", -1)]
     ).skip(skip).limit(limit)
     
-    reports = []
-    async for report in cursor:
-        reports.append({
-            "id": str(report["_id"]),
-            "patient_id": str(report["patient_id"]),
-            "week_start": report["week_start"].date() if isinstance(report["week_start"], datetime) else report["week_start"],
-            "weight_kg": report["weight_kg"],
-            "waist_cm": report["waist_cm"],
-            "photos": report["photos"],
-            "adherence_pct": report["adherence_pct"],
-            "energy_levels": report["energy_levels"],
-            "notes": report["notes"]
-        })
-    
-    return reports
+    return progress_serializer.list_response(await cursor.to_list(length=limit))
 
-@router.get("/dashboard/stats", response_model=NutritionistStats)
-async def get_nutritionist_dashboard_stats(current_user = Depends(get_current_nutritionist)):
-    """Get comprehensive dashboard statistics for nutritionist."""
+async def _compute_dashboard_stats(nutritionist_id, loaders: Loaders):
+    """Build the dashboard and return it with the assigned patient ids."""
     assignments_collection = get_collection("assignments")
-    patient_profiles_collection = get_collection("patient_profiles")
-    users_collection = get_collection("users")
     meal_plans_collection = get_collection("meal_plans")
-    progress_collection = get_collection("progress_reports")
     
     # Get all assignments for this nutritionist
-    assignments_cursor = assignments_collection.find({"nutritionist_id": current_user["_id"], "active": True})
+    assignments_cursor = assignments_collection.find({"nutritionist_id": nutritionist_id, "active": True})
     assignments = await assignments_cursor.to_list(length=None)
     
     total_patients = len(assignments)
@@ -221,62 +253,17 @@ async def get_nutritionist_dashboard_stats(current_user = Depends(get_current_nu
         if assignment.get("start_date", datetime.now()) >= current_month_start
     ])
     
-    # Get meal plans count
-    meal_plans_cursor = meal_plans_collection.find({"nutritionist_id": current_user["_id"]})
-    total_meal_plans = await meal_plans_cursor.count_documents({})
+    # Meal plan count and patient summaries don't depend on each other
+    total_meal_plans, patient_summaries = await asyncio.gather(
+        meal_plans_collection.count_documents({"nutritionist_id": nutritionist_id}),
+        _build_patient_summaries(assignments, loaders)
+    )
     
     # Calculate average rating and completion rate (mock data for now)
     average_rating = 4.8
     completion_rate = 92.0
     pending_tasks = 3
     
-    # Create patient summaries
-    patient_summaries = []
-    for assignment in assignments:
-        patient_id = assignment["patient_id"]
-        
-        # Get patient profile
-        patient_profile = await patient_profiles_collection.find_one({"user_id": patient_id})
-        patient_user = await users_collection.find_one({"_id": patient_id})
-        
-        if patient_user:
-            patient_name = "Profile Not Created"
-            if patient_profile:
-                patient_name = f"{patient_profile['first_name']} {patient_profile['last_name']}"
-            
-            # Get progress reports for this patient
-            progress_cursor = progress_collection.find({"patient_id": patient_id})
-            progress_reports = await progress_cursor.to_list(length=None)
-            
-            total_reports = len(progress_reports)
-            avg_weight_loss = 0.0
-            avg_adherence = 0.0
-            last_report_date = datetime.now().isoformat()
-            
-            if progress_reports:
-                # Calculate average weight loss (simplified)
-                avg_weight_loss = sum(report.get("weight_kg", 0) for report in progress_reports) / len(progress_reports)
-                avg_adherence = sum(report.get("adherence_pct", 0) for report in progress_reports) / len(progress_reports)
-                last_report_date = max(report.get("created_at", datetime.now()) for report in progress_reports).isoformat()
-            
-            # Determine status based on adherence
-            if avg_adherence >= 80:
-                status = "improving"
-            elif avg_adherence >= 60:
-                status = "stable"
-            else:
-                status = "declining"
-            
-            patient_summaries.append(PatientSummary(
-                patient_id=str(patient_id),
-                patient_name=patient_name,
-                total_reports=total_reports,
-                avg_weight_loss=round(avg_weight_loss, 1),
-                avg_adherence=round(avg_adherence, 0),
-                last_report_date=last_report_date,
-                status=status
-            ))
-    
     # Create recent activities (mock data for now)
     recent_activities = [
         RecentActivity(
@@ -323,11 +310,29 @@ async def get_nutritionist_dashboard_stats(current_user = Depends(get_current_nu
         pending_tasks=pending_tasks
     )
     
-    return NutritionistStats(
+    stats = NutritionistStats(
         dashboard_stats=dashboard_stats,
         patient_summaries=patient_summaries,
         recent_activities=recent_activities
     )
+    return stats, [assignment["patient_id"] for assignment in assignments]
+
+@router.get("/dashboard/stats", response_model=NutritionistStats)
+async def get_nutritionist_dashboard_stats(
+    current_user = Depends(get_current_nutritionist),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Get comprehensive dashboard statistics for nutritionist."""
+    nutritionist_id = current_user["_id"]
+    
+    async def compute():
+        stats, patient_ids = await _compute_dashboard_stats(nutritionist_id, loaders)
+        # Patient tags let a patient's own writes refresh this dashboard
+        tags = [nutritionist_tag(nutritionist_id)] + [patient_tag(patient_id) for patient_id in patient_ids]
+        return dumps(stats), tags
+    
+    body = await shared_cache.get_or_set(f"dashboard:{nutritionist_id}", compute, settings.DASHBOARD_CACHE_TTL_SECONDS)
+    return Response(content=body, media_type="application/json")
 
 @router.get("/meal-plans", response_model=List[MealPlanResponse])
 async def get_nutritionist_meal_plans(
@@ -346,140 +351,64 @@ async def get_nutritionist_meal_plans(
     
     cursor = meal_plans_collection.find(query).sort([("created_at", -1)]).skip(skip).limit(limit)
     
-    meal_plans = []
-    async for meal_plan in cursor:
-        meal_plans.append({
-            "id": str(meal_plan["_id"]),
-            "patient_id": str(meal_plan["patient_id"]),
-            "nutritionist_id": str(meal_plan["nutritionist_id"]),
-            "week_start": meal_plan["week_start"].date() if isinstance(meal_plan["week_start"], datetime) else meal_plan["week_start"],
-            "notes": meal_plan.get("notes", ""),
-            "status": meal_plan.get("status", "draft"),
-            "days": meal_plan.get("days", []),
-            "created_at": meal_plan.get("created_at", datetime.now()),
-            "updated_at": meal_plan.get("updated_at", datetime.now())
-        })
-    
-    return meal_plans
+    return meal_plan_serializer.list_response(await cursor.to_list(length=limit))
 
 @router.get("/progress/summary", response_model=List[PatientSummary])
-async def get_patient_progress_summary(current_user = Depends(get_current_nutritionist)):
+async def get_patient_progress_summary(
+    request: Request,
+    current_user = Depends(get_current_nutritionist),
+    loaders: Loaders = Depends(get_loaders)
+):
     """Get progress summary for all patients."""
     assignments_collection = get_collection("assignments")
-    patient_profiles_collection = get_collection("patient_profiles")
-    users_collection = get_collection("users")
-    progress_collection = get_collection("progress_reports")
     
-    # Get all assignments for this nutritionist
-    assignments_cursor = assignments_collection.find({"nutritionist_id": current_user["_id"], "active": True})
-    assignments = await assignments_cursor.to_list(length=None)
+    async def compute():
+        # Get all assignments for this nutritionist
+        assignments_cursor = assignments_collection.find({"nutritionist_id": current_user["_id"], "active": True})
+        assignments = await assignments_cursor.to_list(length=None)
+        return await _build_patient_summaries(assignments, loaders)
     
-    patient_summaries = []
-    for assignment in assignments:
-        patient_id = assignment["patient_id"]
-        
-        # Get patient profile
-        patient_profile = await patient_profiles_collection.find_one({"user_id": patient_id})
-        patient_user = await users_collection.find_one({"_id": patient_id})
-        
-        if patient_user:
-            patient_name = "Profile Not Created"
-            if patient_profile:
-                patient_name = f"{patient_profile['first_name']} {patient_profile['last_name']}"
-            
-            # Get progress reports for this patient
-            progress_cursor = progress_collection.find({"patient_id": patient_id})
-            progress_reports = await progress_cursor.to_list(length=None)
-            
-            total_reports = len(progress_reports)
-            avg_weight_loss = 0.0
-            avg_adherence = 0.0
-            last_report_date = datetime.now().isoformat()
-            
-            if progress_reports:
-                # Calculate average weight loss (simplified)
-                avg_weight_loss = sum(report.get("weight_kg", 0) for report in progress_reports) / len(progress_reports)
-                avg_adherence = sum(report.get("adherence_pct", 0) for report in progress_reports) / len(progress_reports)
-                last_report_date = max(report.get("created_at", datetime.now()) for report in progress_reports).isoformat()
-            
-            # Determine status based on adherence
-            if avg_adherence >= 80:
-                status = "improving"
-            elif avg_adherence >= 60:
-                status = "stable"
-            else:
-                status = "declining"
-            
-            patient_summaries.append(PatientSummary(
-                patient_id=str(patient_id),
-                patient_name=patient_name,
-                total_reports=total_reports,
-                avg_weight_loss=round(avg_weight_loss, 1),
-                avg_adherence=round(avg_adherence, 0),
-                last_report_date=last_report_date,
-                status=status
-            ))
-    
-    return patient_summaries
+    return await coalesced_response(request, current_user["_id"], compute)
 
 @router.get("/analytics/overview", response_model=Dict[str, Any])
-async def get_nutritionist_analytics(current_user = Depends(get_current_nutritionist)):
+async def get_nutritionist_analytics(
+    current_user = Depends(get_current_nutritionist),
+    unit: str = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None
+):
     """Get comprehensive analytics for nutritionist."""
     assignments_collection = get_collection("assignments")
     meal_plans_collection = get_collection("meal_plans")
-    progress_collection = get_collection("progress_reports")
+    
+    range_start, range_end = resolve_range(unit, start, end, default_buckets=6)
     
     # Get basic stats
     total_patients = await assignments_collection.count_documents({"nutritionist_id": current_user["_id"], "active": True})
     total_meal_plans = await meal_plans_collection.count_documents({"nutritionist_id": current_user["_id"]})
     
-    # Get progress reports for all patients
-    assignments_cursor = assignments_collection.find({"nutritionist_id": current_user["_id"], "active": True})
+    # Report totals come from the per-patient rollups
+    assignments_cursor = assignments_collection.find(
+        {"nutritionist_id": current_user["_id"], "active": True},
+        {"patient_id": 1}
+    )
     assignments = await assignments_cursor.to_list(length=None)
+    patient_ids = [assignment["patient_id"] for assignment in assignments]
+    rollups = await get_rollups(patient_ids)
     
-    total_reports = 0
-    total_adherence = 0
-    total_weight_loss = 0
-    
-    for assignment in assignments:
-        patient_id = assignment["patient_id"]
-        progress_cursor = progress_collection.find({"patient_id": patient_id})
-        progress_reports = await progress_cursor.to_list(length=None)
-        
-        total_reports += len(progress_reports)
-        for report in progress_reports:
-            total_adherence += report.get("adherence_pct", 0)
-            total_weight_loss += report.get("weight_kg", 0)
+    total_reports = sum(rollup["report_count"] for rollup in rollups.values())
+    total_adherence = sum(rollup["adherence_sum"] for rollup in rollups.values())
+    total_weight_loss = sum(rollup["weight_sum"] for rollup in rollups.values())
     
     avg_adherence = total_adherence / total_reports if total_reports > 0 else 0
     avg_weight_loss = total_weight_loss / total_reports if total_reports > 0 else 0
     
-    # Calculate monthly trends
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    
-    monthly_stats = []
-    for i in range(6):  # Last 6 months
-        month = current_month - i
-        year = current_year
-        if month <= 0:
-            month += 12
-            year -= 1
-        
-        month_start = datetime(year, month, 1)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        # Count meal plans created in this month
-        meal_plans_count = await meal_plans_collection.count_documents({
-            "nutritionist_id": current_user["_id"],
-            "created_at": {"$gte": month_start, "$lte": month_end}
-        })
-        
-        monthly_stats.append({
-            "month": month_start.strftime("%B %Y"),
-            "meal_plans": meal_plans_count,
-            "patients": total_patients  # Simplified for now
-        })
+    # Activity per day/week/month, one aggregation per series
+    buckets = await bucketed_series({
+        "meal_plans": ("meal_plans", {"nutritionist_id": current_user["_id"]}, "created_at"),
+        "new_assignments": ("assignments", {"nutritionist_id": current_user["_id"]}, "created_at"),
+        "progress_reports": ("progress_reports", {"patient_id": {"$in": patient_ids}}, "created_at")
+    }, range_start, range_end, unit)
     
     return {
         "overview": {
@@ -491,7 +420,12 @@ async def get_nutritionist_analytics(current_user = Depends(get_current_nutritio
             "completion_rate": 92.0,  # Mock data
             "rating": 4.8  # Mock data
         },
-        "monthly_trends": monthly_stats,
+        "trends": {
+            "unit": unit,
+            "start": range_start,
+            "end": range_end,
+            "buckets": buckets
+        },
         "performance_metrics": {
             "patient_satisfaction": 4.8,
             "goal_achievement_rate": 85.0,
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from app.api.caching import cached_document_response, invalidate, patient_tag
+from app.api.conditional import compute_validators, page_salt, probe_many, set_validators
 from app.api.deps import get_current_patient
+from app.api.responses import DocumentSerializer
+from app.api.writes import insert_unique, update_or_404
 from app.core.database import get_collection
 from app.models.profile import PatientProfileCreate, PatientProfileUpdate, PatientProfileResponse, DietaryPreference
 from app.models.meal_plan import MealPlanResponse
 from app.models.progress import ProgressReportCreate, ProgressReportResponse
+from app.services.progress_rollups import record_report
 from bson import ObjectId
 from datetime import datetime, date
 from typing import List
 
 router = APIRouter()
 
+profile_serializer = DocumentSerializer(PatientProfileResponse)
+meal_plan_serializer = DocumentSerializer(MealPlanResponse)
+progress_serializer = DocumentSerializer(ProgressReportResponse)
+
 @router.post("/profile", response_model=PatientProfileResponse)
 async def create_patient_profile(
     profile_data: PatientProfileCreate,
@@ -18,14 +27,6 @@ async def create_patient_profile(
     """Create a new patient profile."""
     patient_profiles_collection = get_collection("patient_profiles")
     
-    # Check if profile already exists
-    existing_profile = await patient_profiles_collection.find_one({"user_id": current_user["_id"]})
-    if existing_profile:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Profile already exists. Use PUT /profile to update."
-        )
-    
     # Validate dietary preferences
     if profile_data.dietary_prefs:
         valid_prefs = [pref.value for pref in DietaryPreference]
@@ -52,22 +53,14 @@ async def create_patient_profile(
         "updated_at": datetime.utcnow()
     }
     
-    result = await patient_profiles_collection.insert_one(profile_doc)
-    profile_doc["_id"] = result.inserted_id
+    # One profile per user is enforced by the unique user_id index
+    await insert_unique(
+        patient_profiles_collection, profile_doc,
+        "Profile already exists. Use PUT /profile to update."
+    )
+    await invalidate(patient_tag(current_user["_id"]))
     
-    return {
-        "id": str(profile_doc["_id"]),
-        "user_id": str(profile_doc["user_id"]),
-        "first_name": profile_doc["first_name"],
-        "last_name": profile_doc["last_name"],
-        "dob": profile_doc["dob"].date() if isinstance(profile_doc["dob"], datetime) else profile_doc["dob"],
-        "height_cm": profile_doc["height_cm"],
-        "start_weight_kg": profile_doc["start_weight_kg"],
-        "gender": profile_doc["gender"],
-        "allergies": profile_doc["allergies"],
-        "dietary_prefs": profile_doc["dietary_prefs"],
-        "medical_notes": profile_doc.get("medical_notes")
-    }
+    return profile_serializer.response(profile_doc)
 
 @router.put("/profile", response_model=PatientProfileResponse)
 async def update_patient_profile(
@@ -77,14 +70,6 @@ async def update_patient_profile(
     """Update patient profile."""
     patient_profiles_collection = get_collection("patient_profiles")
     
-    # Check if profile exists
-    existing_profile = await patient_profiles_collection.find_one({"user_id": current_user["_id"]})
-    if not existing_profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found. Create a profile first using POST /profile"
-        )
-    
     # Update existing profile
     update_data = profile_data.dict(exclude_unset=True)
     
@@ -110,84 +95,59 @@ async def update_patient_profile(
         
     update_data["updated_at"] = datetime.utcnow()
     
-    await patient_profiles_collection.update_one(
+    updated_profile = await update_or_404(
+        patient_profiles_collection,
         {"user_id": current_user["_id"]},
-        {"$set": update_data}
+        update_data,
+        "Profile not found. Create a profile first using POST /profile"
     )
-    
-    # Get updated profile
-    updated_profile = await patient_profiles_collection.find_one({"user_id": current_user["_id"]})
-    return {
-        "id": str(updated_profile["_id"]),
-        "user_id": str(updated_profile["user_id"]),
-        "first_name": updated_profile["first_name"],
-        "last_name": updated_profile["last_name"],
-        "dob": updated_profile["dob"].date() if isinstance(updated_profile["dob"], datetime) else updated_profile["dob"],
-        "height_cm": updated_profile["height_cm"],
-        "start_weight_kg": updated_profile["start_weight_kg"],
-        "gender": updated_profile["gender"],
-        "allergies": updated_profile["allergies"],
-        "dietary_prefs": updated_profile["dietary_prefs"],
-        "medical_notes": updated_profile.get("medical_notes")
-    }
+    await invalidate(patient_tag(current_user["_id"]))
+    return profile_serializer.response(updated_profile)
 
 @router.get("/profile", response_model=PatientProfileResponse)
-async def get_patient_profile(current_user = Depends(get_current_patient)):
+async def get_patient_profile(request: Request, current_user = Depends(get_current_patient)):
     """Get patient profile."""
     patient_profiles_collection = get_collection("patient_profiles")
     
-    profile = await patient_profiles_collection.find_one({"user_id": current_user["_id"]})
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
-        )
-    
-    return {
-        "id": str(profile["_id"]),
-        "user_id": str(profile["user_id"]),
-        "first_name": profile["first_name"],
-        "last_name": profile["last_name"],
-        "dob": profile["dob"].date() if isinstance(profile["dob"], datetime) else profile["dob"],
-        "height_cm": profile["height_cm"],
-        "start_weight_kg": profile["start_weight_kg"],
-        "gender": profile["gender"],
-        "allergies": profile["allergies"],
-        "dietary_prefs": profile["dietary_prefs"],
-        "medical_notes": profile.get("medical_notes")
-    }
+    async def load():
+        profile = await patient_profiles_collection.find_one({"user_id": current_user["_id"]})
+        if not profile:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Profile not found"
+            )
+        return profile
+    
+    return await cached_document_response(
+        request, f"patient_profile:{current_user['_id']}", load,
+        profile_serializer, [patient_tag(current_user["_id"])]
+    )
 
 @router.get("/current-plan", response_model=MealPlanResponse)
-async def get_current_meal_plan(current_user = Depends(get_current_patient)):
+async def get_current_meal_plan(request: Request, current_user = Depends(get_current_patient)):
     """Get current meal plan for the patient."""
     meal_plans_collection = get_collection("meal_plans")
     
-    # Find the most recent published meal plan
-    current_plan = await meal_plans_collection.find_one(
-        {
-            "patient_id": current_user["_id"],
-            "status": "published"
-        },
-        sort=[("week_start", -1)]
-    )
-    
-    if not current_plan:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No current meal plan found"
+    async def load():
+        # Find the most recent published meal plan
+        current_plan = await meal_plans_collection.find_one(
+            {
+                "patient_id": current_user["_id"],
+                "status": "published"
+            },
+            sort=[("week_start", -1)]
         )
-    
-    return {
-        "id": str(current_plan["_id"]),
-        "patient_id": str(current_plan["patient_id"]),
-        "nutritionist_id": str(current_plan["nutritionist_id"]),
-        "week_start": current_plan["week_start"].date() if isinstance(current_plan["week_start"], datetime) else current_plan["week_start"],
-        "notes": current_plan.get("notes"),
-        "status": current_plan["status"],
-        "days": current_plan["days"],
-        "created_at": current_plan["created_at"].isoformat(),
-        "updated_at": current_plan["updated_at"].isoformat()
-    }
+        if not current_plan:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No current meal plan found"
+            )
+        return current_plan
+    
+    return await cached_document_response(
+        request, f"current_plan:{current_user['_id']}", load,
+        meal_plan_serializer, [patient_tag(current_user["_id"])]
+    )
 
 @router.post("/progress", response_model=ProgressReportResponse)
 async def create_progress_report(
@@ -197,18 +157,6 @@ async def create_progress_report(
     """Create a new progress report."""
     progress_collection = get_collection("progress_reports")
     
-    # Check if report already exists for this week
-    existing_report = await progress_collection.find_one({
-        "patient_id": current_user["_id"],
-        "week_start": datetime.combine(progress_data.week_start, datetime.min.time())  # Convert date to datetime for query
-    })
-    
-    if existing_report:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Progress report already exists for this week"
-        )
-    
     # Create progress report
     progress_doc = {
         "patient_id": current_user["_id"],
@@ -223,47 +171,31 @@ async def create_progress_report(
         "updated_at": datetime.utcnow()
     }
     
-    result = await progress_collection.insert_one(progress_doc)
-    progress_doc["_id"] = result.inserted_id
+    # One report per patient and week is enforced by a unique index
+    await insert_unique(progress_collection, progress_doc, "Progress report already exists for this week")
+    await record_report(progress_doc)
+    await invalidate(patient_tag(current_user["_id"]))
     
-    return {
-        "id": str(progress_doc["_id"]),
-        "patient_id": str(progress_doc["patient_id"]),
-        "week_start": progress_doc["week_start"].date() if isinstance(progress_doc["week_start"], datetime) else progress_doc["week_start"],
-        "weight_kg": progress_doc["weight_kg"],
-        "waist_cm": progress_doc["waist_cm"],
-        "photos": progress_doc["photos"],
-        "adherence_pct": progress_doc["adherence_pct"],
-        "energy_levels": progress_doc["energy_levels"],
-        "notes": progress_doc["notes"]
-    }
+    return progress_serializer.response(progress_doc)
 
 @router.get("/progress", response_model=List[ProgressReportResponse])
 async def get_progress_reports(
+    request: Request,
     current_user = Depends(get_current_patient),
     limit: int = 10,
     skip: int = 0
 ):
     """Get patient's progress reports."""
     progress_collection = get_collection("progress_reports")
+    query = {"patient_id": current_user["_id"]}
+    sort = [("week_start", -1)]
     
-    cursor = progress_collection.find(
-        {"patient_id": current_user["_id"]},
-        sort=[("week_start", -1)]
-    ).skip(skip).limit(limit)
+    not_modified = await probe_many(request, progress_collection, query, sort, skip, limit)
+    if not_modified is not None:
+        return not_modified
     
-    reports = []
-    async for report in cursor:
-        reports.append({
-            "id": str(report["_id"]),
-            "patient_id": str(report["patient_id"]),
-            "week_start": report["week_start"].date() if isinstance(report["week_start"], datetime) else report["week_start"],
-            "weight_kg": report["weight_kg"],
-            "waist_cm": report["waist_cm"],
-            "photos": report["photos"],
-            "adherence_pct": report["adherence_pct"],
-            "energy_levels": report["energy_levels"],
-            "notes": report["notes"]
-        })
+    cursor = progress_collection.find(query, sort=sort).skip(skip).limit(limit)
+    reports = await cursor.to_list(length=limit)
     
-    return reports 
\ No newline at end of file
+    validators = compute_validators(reports, many=True, salt=page_salt(skip, limit))
+    return set_validators(progress_serializer.list_response(reports), validators) 
\ No newline at end of file
@@ -1,20 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.api.deps import get_current_active_user, get_current_nutritionist
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from app.api.coalescing import coalesced_response
+from app.api.deps import get_current_active_user, get_current_nutritionist, get_loaders
+from app.api.pagination import fetch_page
+from app.api.responses import DocumentSerializer
 from app.core.database import get_collection
+from app.core.loaders import Loaders
 from app.models.progress import ProgressReportResponse, ProgressSummary
+from app.services.cohort_trends import compute_cohort_trends, load_cohort, summarize_trends
+from app.services.progress_rollups import get_rollups, rollup_averages
 from bson import ObjectId
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 router = APIRouter()
 
+progress_serializer = DocumentSerializer(ProgressReportResponse)
+
 @router.get("/", response_model=List[ProgressReportResponse])
 async def get_progress_reports(
+    response: Response,
     current_user = Depends(get_current_active_user),
     patient_id: str = None,
     limit: int = 10,
-    skip: int = 0
+    skip: int = 0,
+    cursor: Optional[str] = None
 ):
     """Get progress reports."""
     progress_collection = get_collection("progress_reports")
@@ -42,26 +53,12 @@ async def get_progress_reports(
             detail="Access denied"
         )
     
-    cursor = progress_collection.find(
-        query,
-        sort=[("week_start", -1)]
-    ).skip(skip).limit(limit)
-    
-    reports = []
-    async for report in cursor:
-        reports.append({
-            "id": str(report["_id"]),
-            "patient_id": str(report["patient_id"]),
-            "week_start": report["week_start"],
-            "weight_kg": report["weight_kg"],
-            "waist_cm": report["waist_cm"],
-            "photos": report["photos"],
-            "adherence_pct": report["adherence_pct"],
-            "energy_levels": report["energy_levels"],
-            "notes": report["notes"]
-        })
+    page = await fetch_page(
+        progress_collection, query, [("week_start", -1), ("_id", -1)],
+        response, limit, skip=skip, cursor=cursor
+    )
     
-    return reports
+    return progress_serializer.list_response(page, response)
 
 @router.get("/summary/{patient_id}", response_model=ProgressSummary)
 async def get_progress_summary(
@@ -104,18 +101,11 @@ async def get_progress_summary(
             detail="Patient profile not found"
         )
     
-    # Get progress reports
-    progress_collection = get_collection("progress_reports")
-    cursor = progress_collection.find(
-        {"patient_id": ObjectId(patient_id)},
-        sort=[("week_start", -1)]
-    )
+    # Report count and latest weight come from the patient's rollup
+    rollups = await get_rollups([ObjectId(patient_id)])
+    rollup = rollups.get(ObjectId(patient_id))
     
-    reports = []
-    async for report in cursor:
-        reports.append(report)
-    
-    if not reports:
+    if not rollup:
         return {
             "patient_id": patient_id,
             "start_weight": patient_profile["start_weight_kg"],
@@ -128,11 +118,11 @@ async def get_progress_summary(
     
     # Calculate summary
     start_weight = patient_profile["start_weight_kg"]
-    current_weight = reports[0]["weight_kg"]
+    current_weight = rollup["latest_weight_kg"]
     total_weight_lost = start_weight - current_weight
-    total_weeks = len(reports)
+    total_weeks = rollup["report_count"]
     average_weekly_loss = total_weight_lost / total_weeks if total_weeks > 0 else 0
-    last_report_date = reports[0]["week_start"]
+    last_report_date = rollup["latest_week_start"]
     
     return {
         "patient_id": patient_id,
@@ -166,104 +156,89 @@ class PatientProgressOverview(BaseModel):
 async def get_nutritionist_progress_overview(
     current_user = Depends(get_current_nutritionist),
     limit: int = 20,
-    skip: int = 0
+    skip: int = 0,
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get progress overview for all patients assigned to nutritionist."""
     assignments_collection = get_collection("assignments")
-    patient_profiles_collection = get_collection("patient_profiles")
-    users_collection = get_collection("users")
-    progress_collection = get_collection("progress_reports")
     
     # Get all assignments for this nutritionist
     assignments_cursor = assignments_collection.find({"nutritionist_id": current_user["_id"], "active": True})
     assignments = await assignments_cursor.to_list(length=None)
+    patient_ids = [assignment["patient_id"] for assignment in assignments]
+    
+    # Users, profiles and rollups for the whole roster in one query each
+    users, profiles, rollups = await asyncio.gather(
+        loaders.users.load_many(patient_ids),
+        loaders.patient_profiles.load_many(patient_ids),
+        get_rollups(patient_ids)
+    )
     
     patient_overviews = []
-    for assignment in assignments:
-        patient_id = assignment["patient_id"]
+    for patient_id, patient_user, patient_profile in zip(patient_ids, users, profiles):
+        if not patient_user:
+            continue
         
-        # Get patient profile and user info
-        patient_profile = await patient_profiles_collection.find_one({"user_id": patient_id})
-        patient_user = await users_collection.find_one({"_id": patient_id})
+        patient_name = "Profile Not Created"
+        if patient_profile:
+            patient_name = f"{patient_profile['first_name']} {patient_profile['last_name']}"
         
-        if patient_user:
-            patient_name = "Profile Not Created"
-            if patient_profile:
-                patient_name = f"{patient_profile['first_name']} {patient_profile['last_name']}"
-            
-            # Get progress reports for this patient
-            progress_cursor = progress_collection.find({"patient_id": patient_id})
-            progress_reports = await progress_cursor.to_list(length=None)
-            
-            total_reports = len(progress_reports)
-            avg_weight_loss = 0.0
-            avg_adherence = 0.0
-            last_report_date = datetime.now().isoformat()
-            
-            if progress_reports:
-                # Calculate averages
-                avg_weight_loss = sum(report.get("weight_kg", 0) for report in progress_reports) / len(progress_reports)
-                avg_adherence = sum(report.get("adherence_pct", 0) for report in progress_reports) / len(progress_reports)
-                last_report_date = max(report.get("created_at", datetime.now()) for report in progress_reports).isoformat()
-            
-            # Determine status based on adherence
-            if avg_adherence >= 80:
-                status = "improving"
-            elif avg_adherence >= 60:
-                status = "stable"
-            else:
-                status = "declining"
-            
-            # Calculate analytics
-            improvement_rate = 0.0
-            recent_trend = "stable"
-            
-            if len(progress_reports) >= 2:
-                # Calculate improvement rate based on recent reports
-                recent_reports = sorted(progress_reports, key=lambda x: x.get("created_at", datetime.now()))[-2:]
-                if len(recent_reports) == 2:
-                    weight_diff = recent_reports[1].get("weight_kg", 0) - recent_reports[0].get("weight_kg", 0)
-                    improvement_rate = (weight_diff / recent_reports[0].get("weight_kg", 1)) * 100 if recent_reports[0].get("weight_kg", 0) > 0 else 0
-                    
-                    if improvement_rate > 2:
-                        recent_trend = "improving"
-                    elif improvement_rate < -2:
-                        recent_trend = "declining"
-                    else:
-                        recent_trend = "stable"
-            
-            analytics = ProgressAnalytics(
-                total_reports=total_reports,
-                avg_weight_loss=round(avg_weight_loss, 1),
-                avg_adherence=round(avg_adherence, 0),
-                improvement_rate=round(improvement_rate, 1),
-                recent_trend=recent_trend
-            )
+        rollup = rollups.get(patient_id)
+        avg_weight_loss, avg_adherence = rollup_averages(rollup)
+        total_reports = rollup["report_count"] if rollup else 0
+        last_report_date = datetime.now().isoformat()
+        if rollup and rollup.get("latest_report_at"):
+            last_report_date = rollup["latest_report_at"].isoformat()
+        
+        # Determine status based on adherence
+        if avg_adherence >= 80:
+            status = "improving"
+        elif avg_adherence >= 60:
+            status = "stable"
+        else:
+            status = "declining"
+        
+        # Trend from the two most recent weekly weights
+        improvement_rate = 0.0
+        recent_trend = "stable"
+        
+        if rollup and rollup.get("previous_weight_kg"):
+            weight_diff = rollup["latest_weight_kg"] - rollup["previous_weight_kg"]
+            improvement_rate = (weight_diff / rollup["previous_weight_kg"]) * 100
             
-            patient_overviews.append(PatientProgressOverview(
-                patient_id=str(patient_id),
-                patient_name=patient_name,
-                total_reports=total_reports,
-                avg_weight_loss=round(avg_weight_loss, 1),
-                avg_adherence=round(avg_adherence, 0),
-                last_report_date=last_report_date,
-                status=status,
-                analytics=analytics
-            ))
+            if improvement_rate > 2:
+                recent_trend = "improving"
+            elif improvement_rate < -2:
+                recent_trend = "declining"
+        
+        analytics = ProgressAnalytics(
+            total_reports=total_reports,
+            avg_weight_loss=round(avg_weight_loss, 1),
+            avg_adherence=round(avg_adherence, 0),
+            improvement_rate=round(improvement_rate, 1),
+            recent_trend=recent_trend
+        )
+        
+        patient_overviews.append(PatientProgressOverview(
+            patient_id=str(patient_id),
+            patient_name=patient_name,
+            total_reports=total_reports,
+            avg_weight_loss=round(avg_weight_loss, 1),
+            avg_adherence=round(avg_adherence, 0),
+            last_report_date=last_report_date,
+            status=status,
+            analytics=analytics
+        ))
     
     return patient_overviews
 
-@router.get("/nutritionist/analytics", response_model=Dict[str, Any])
-async def get_nutritionist_progress_analytics(
-    current_user = Depends(get_current_nutritionist),
-    time_period: str = "month"  # week, month, quarter, year
-):
-    """Get comprehensive progress analytics for nutritionist."""
+async def _compute_progress_analytics(nutritionist_id, time_period: str) -> Dict[str, Any]:
+    """Aggregate windowed progress across the nutritionist's patients."""
     assignments_collection = get_collection("assignments")
     progress_collection = get_collection("progress_reports")
     
     # Get all assignments for this nutritionist
-    assignments_cursor = assignments_collection.find({"nutritionist_id": current_user["_id"], "active": True})
+    assignments_cursor = assignments_collection.find({"nutritionist_id": nutritionist_id, "active": True})
     assignments = await assignments_cursor.to_list(length=None)
     
     # Calculate time period
@@ -285,31 +260,35 @@ async def get_nutritionist_progress_analytics(
     total_weight_loss = 0
     patient_progress = []
     
-    for assignment in assignments:
-        patient_id = assignment["patient_id"]
-        
-        # Get progress reports for this patient in the time period
-        progress_cursor = progress_collection.find({
-            "patient_id": patient_id,
+    # All-time rollups can't answer a windowed question, so the window is
+    # grouped per patient in a single aggregation instead of one query each.
+    window_stats = await progress_collection.aggregate([
+        {"$match": {
+            "patient_id": {"$in": [assignment["patient_id"] for assignment in assignments]},
             "created_at": {"$gte": start_date}
-        })
-        progress_reports = await progress_cursor.to_list(length=None)
+        }},
+        {"$group": {
+            "_id": "$patient_id",
+            "reports_count": {"$sum": 1},
+            "avg_adherence": {"$avg": "$adherence_pct"},
+            "avg_weight": {"$avg": "$weight_kg"}
+        }}
+    ]).to_list(length=None)
+    
+    for stats in window_stats:
+        patient_adherence = stats["avg_adherence"] or 0
+        patient_weight_loss = stats["avg_weight"] or 0
         
-        total_reports += len(progress_reports)
+        total_reports += stats["reports_count"]
+        total_adherence += patient_adherence
+        total_weight_loss += patient_weight_loss
         
-        if progress_reports:
-            patient_adherence = sum(report.get("adherence_pct", 0) for report in progress_reports) / len(progress_reports)
-            patient_weight_loss = sum(report.get("weight_kg", 0) for report in progress_reports) / len(progress_reports)
-            
-            total_adherence += patient_adherence
-            total_weight_loss += patient_weight_loss
-            
-            patient_progress.append({
-                "patient_id": str(patient_id),
-                "reports_count": len(progress_reports),
-                "avg_adherence": round(patient_adherence, 1),
-                "avg_weight_loss": round(patient_weight_loss, 1)
-            })
+        patient_progress.append({
+            "patient_id": str(stats["_id"]),
+            "reports_count": stats["reports_count"],
+            "avg_adherence": round(patient_adherence, 1),
+            "avg_weight_loss": round(patient_weight_loss, 1)
+        })
     
     avg_adherence = total_adherence / total_patients if total_patients > 0 else 0
     avg_weight_loss = total_weight_loss / total_patients if total_patients > 0 else 0
@@ -336,4 +315,48 @@ async def get_nutritionist_progress_analytics(
             "engagement_score": round(avg_adherence, 1),
             "success_rate": round((len([p for p in patient_progress if p["avg_adherence"] >= 80]) / total_patients) * 100, 1) if total_patients > 0 else 0
         }
-    } 
\ No newline at end of file
+    }
+
+@router.get("/nutritionist/analytics", response_model=Dict[str, Any])
+async def get_nutritionist_progress_analytics(
+    request: Request,
+    current_user = Depends(get_current_nutritionist),
+    time_period: str = "month"  # week, month, quarter, year
+):
+    """Get comprehensive progress analytics for nutritionist."""
+    # Identical concurrent requests share one run of the aggregation
+    return await coalesced_response(
+        request, current_user["_id"],
+        lambda: _compute_progress_analytics(current_user["_id"], time_period)
+    )
+
+@router.get("/nutritionist/trends", response_model=Dict[str, Any])
+async def get_nutritionist_progress_trends(
+    current_user = Depends(get_current_nutritionist),
+    weeks: int = 12,
+    rolling_window: int = 4,
+    streak_threshold: int = 80
+):
+    """Get weight, waist, adherence and energy trends across all assigned patients."""
+    if not 2 <= weeks <= 104:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="weeks must be between 2 and 104"
+        )
+    if not 1 <= rolling_window <= weeks:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="rolling_window must be between 1 and weeks"
+        )
+    
+    assignments_collection = get_collection("assignments")
+    assignments_cursor = assignments_collection.find(
+        {"nutritionist_id": current_user["_id"], "active": True},
+        {"patient_id": 1}
+    )
+    assignments = await assignments_cursor.to_list(length=None)
+    
+    # Whole cohort as (patients x weeks) arrays, analysed in one pass
+    cohort = await load_cohort([assignment["patient_id"] for assignment in assignments], weeks)
+    trends = compute_cohort_trends(cohort, rolling_window=rolling_window, streak_threshold=streak_threshold)
+    return summarize_trends(cohort, trends)
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from app.api.deps import get_current_active_user
+from app.api.pagination import fetch_page
+from app.api.responses import DocumentSerializer
+from app.api.writes import insert_unique
 from app.core.database import get_collection
 from app.models.subscription import SubscriptionCreate, SubscriptionResponse, PaymentOrder, PaymentResponse
 from bson import ObjectId
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
+subscription_serializer = DocumentSerializer(SubscriptionResponse)
+
 @router.post("/create-order", response_model=PaymentResponse)
 async def create_payment_order(
     payment_data: PaymentOrder,
@@ -36,11 +41,11 @@ async def create_subscription(
     """Create a new subscription."""
     subscriptions_collection = get_collection("subscriptions")
     
-    # Check if user already has an active subscription
-    existing_subscription = await subscriptions_collection.find_one({
-        "user_id": current_user["_id"],
-        "status": "active"
-    })
+    # No new subscription of any status while the user has an active one
+    existing_subscription = await subscriptions_collection.find_one(
+        {"user_id": current_user["_id"], "status": "active"},
+        {"_id": 1}
+    )
     
     if existing_subscription:
         raise HTTPException(
@@ -61,52 +66,32 @@ async def create_subscription(
         "updated_at": datetime.utcnow()
     }
     
-    result = await subscriptions_collection.insert_one(subscription_doc)
-    subscription_doc["_id"] = result.inserted_id
+    # The partial unique index closes the race between two concurrent active inserts
+    await insert_unique(
+        subscriptions_collection, subscription_doc, "User already has an active subscription", prechecked=True
+    )
     
-    return {
-        "id": str(subscription_doc["_id"]),
-        "user_id": str(subscription_doc["user_id"]),
-        "plan": subscription_doc["plan"],
-        "price_inr": subscription_doc["price_inr"],
-        "status": subscription_doc["status"],
-        "current_period_start": subscription_doc["current_period_start"],
-        "current_period_end": subscription_doc["current_period_end"],
-        "gateway_customer_id": subscription_doc["gateway_customer_id"],
-        "created_at": subscription_doc["created_at"].isoformat(),
-        "updated_at": subscription_doc["updated_at"].isoformat()
-    }
+    return subscription_serializer.response(subscription_doc)
 
 @router.get("/", response_model=List[SubscriptionResponse])
 async def get_user_subscriptions(
+    response: Response,
     current_user = Depends(get_current_active_user),
     limit: int = 10,
-    skip: int = 0
+    skip: int = 0,
+    cursor: Optional[str] = None
 ):
     """Get user's subscriptions."""
     subscriptions_collection = get_collection("subscriptions")
     
-    cursor = subscriptions_collection.find(
+    page = await fetch_page(
+        subscriptions_collection,
         {"user_id": current_user["_id"]},
-        sort=[("created_at", -1)]
-    ).skip(skip).limit(limit)
-    
-    subscriptions = []
-    async for subscription in cursor:
-        subscriptions.append({
-            "id": str(subscription["_id"]),
-            "user_id": str(subscription["user_id"]),
-            "plan": subscription["plan"],
-            "price_inr": subscription["price_inr"],
-            "status": subscription["status"],
-            "current_period_start": subscription["current_period_start"],
-            "current_period_end": subscription["current_period_end"],
-            "gateway_customer_id": subscription["gateway_customer_id"],
-            "created_at": subscription["created_at"].isoformat(),
-            "updated_at": subscription["updated_at"].isoformat()
-        })
+        [("created_at", -1), ("_id", -1)],
+        response, limit, skip=skip, cursor=cursor
+    )
     
-    return subscriptions
+    return subscription_serializer.list_response(page, response)
 
 @router.get("/current", response_model=SubscriptionResponse)
 async def get_current_subscription(current_user = Depends(get_current_active_user)):
@@ -124,18 +109,7 @@ async def get_current_subscription(current_user = Depends(get_current_active_use
             detail="No active subscription found"
         )
     
-    return {
-        "id": str(subscription["_id"]),
-        "user_id": str(subscription["user_id"]),
-        "plan": subscription["plan"],
-        "price_inr": subscription["price_inr"],
-        "status": subscription["status"],
-        "current_period_start": subscription["current_period_start"],
-        "current_period_end": subscription["current_period_end"],
-        "gateway_customer_id": subscription["gateway_customer_id"],
-        "created_at": subscription["created_at"].isoformat(),
-        "updated_at": subscription["updated_at"].isoformat()
-    }
+    return subscription_serializer.response(subscription)
 
 @router.post("/webhooks/payment")
 async def payment_webhook():
@@ -1,23 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, invalidate_principal
+from app.api.responses import DocumentSerializer
+from app.api.writes import update_or_404
 from app.core.database import get_collection
 from app.models.user import UserUpdate, UserResponse
 from datetime import datetime
 
 router = APIRouter()
 
+user_serializer = DocumentSerializer(UserResponse)
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user = Depends(get_current_active_user)):
     """Get current user information."""
-    return {
-        "id": str(current_user["_id"]),
-        "email": current_user["email"],
-        "phone": current_user["phone"],
-        "role": current_user["role"],
-        "status": current_user["status"],
-        "created_at": current_user["created_at"],
-        "updated_at": current_user["updated_at"]
-    }
+    return user_serializer.response(current_user)
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
@@ -30,20 +26,14 @@ async def update_current_user(
     update_data = user_data.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    await users_collection.update_one(
+    updated_user = await update_or_404(
+        users_collection,
         {"_id": current_user["_id"]},
-        {"$set": update_data}
+        update_data,
+        "User not found",
+        duplicate_detail="Email already registered",
+        projection={"password_hash": 0}
     )
+    await invalidate_principal(current_user["_id"])
     
-    # Get updated user
-    updated_user = await users_collection.find_one({"_id": current_user["_id"]})
-    
-    return {
-        "id": str(updated_user["_id"]),
-        "email": updated_user["email"],
-        "phone": updated_user["phone"],
-        "role": updated_user["role"],
-        "status": updated_user["status"],
-        "created_at": updated_user["created_at"],
-        "updated_at": updated_user["updated_at"]
-    } 
\ No newline at end of file
+    return user_serializer.response(updated_user) 
\ No newline at end of file
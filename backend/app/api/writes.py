@@ -0,0 +1,74 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.indexes import confirmed_unique, unique_filters
+
+# Write paths rely on the unique indexes in app.core.indexes: the check and
+# the write happen in one round trip and two concurrent requests can no
+# longer both pass the check. Until ensure_indexes has seen a collection's
+# unique indexes in place (they may be missing, failed, or disabled via
+# CREATE_INDEXES_ON_STARTUP) a find_one pre-check still runs first.
+
+def _duplicate(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=detail
+    )
+
+async def reject_duplicate(collection, document: dict, duplicate_detail: str):
+    """Raise a 400 if ``document`` would collide with an existing one under a unique index."""
+    filters = unique_filters(collection.name, document)
+    if not filters:
+        return
+    query = filters[0] if len(filters) == 1 else {"$or": filters}
+    if await collection.find_one(query, {"_id": 1}):
+        raise _duplicate(duplicate_detail)
+
+async def insert_unique(collection, document: dict, duplicate_detail: str, prechecked: bool = False):
+    """Insert a document, turning a unique index violation into a 400.
+
+    Pre-checks for a duplicate unless the collection's unique indexes are
+    confirmed or the caller already ran ``reject_duplicate``. Sets ``_id``
+    on the document and returns it.
+    """
+    if not prechecked and collection.name not in confirmed_unique:
+        await reject_duplicate(collection, document, duplicate_detail)
+    try:
+        result = await collection.insert_one(document)
+    except DuplicateKeyError:
+        raise _duplicate(duplicate_detail)
+    document["_id"] = result.inserted_id
+    return result.inserted_id
+
+async def update_or_404(
+    collection,
+    query: dict,
+    update_data: dict,
+    not_found_detail: str,
+    duplicate_detail: Optional[str] = None,
+    projection: Optional[dict] = None
+) -> dict:
+    """``$set`` fields on the matching document and return it as updated.
+
+    Raises a 404 when nothing matches and, when ``duplicate_detail`` is
+    given, a 400 when the update would violate a unique index.
+    """
+    try:
+        document = await collection.find_one_and_update(
+            query,
+            {"$set": update_data},
+            projection=projection,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        if duplicate_detail is None:
+            raise
+        raise _duplicate(duplicate_detail)
+    
+    if document is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=not_found_detail
+        )
+    return document
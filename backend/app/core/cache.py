@@ -0,0 +1,539 @@
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.singleflight import SingleFlight
+
+class TTLCache:
+    """In-process LRU cache whose entries expire after a time-to-live.
+
+    Meant for a single event loop, so there is no locking. Each worker process
+    holds its own copy, which means entries can be stale for up to ``ttl``
+    seconds after another worker changes the underlying data.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live entry, or ``default`` on a miss."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store an entry, evicting the least recently used ones past ``maxsize``."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        """Drop an entry if present."""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Return size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+class CacheBackend:
+    """Storage behind a ``SharedCache``: bytes values with TTLs and tags."""
+
+    name = "base"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: float,
+        tags: Iterable[str] = (),
+        generation: Optional[int] = None
+    ) -> bool:
+        """Store a value; returns ``False`` if it was skipped as stale.
+
+        With a ``generation`` from ``generation()``, the value is only stored
+        if none of its tags has been invalidated since.
+        """
+        raise NotImplementedError
+
+    async def delete(self, *keys: str):
+        raise NotImplementedError
+
+    async def generation(self) -> int:
+        """Counter bumped by every ``invalidate_tags``; read before computing a value."""
+        raise NotImplementedError
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Drop every entry stored under any of the tags; returns how many.
+
+        The tags' versions are bumped first, so a value computed before the
+        invalidation can no longer be stored under them.
+        """
+        raise NotImplementedError
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        """Try to take the fill lock for a key; returns a token on success."""
+        raise NotImplementedError
+
+    async def release_lock(self, key: str, token: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU backend for development and single-worker runs.
+
+    Fill locks always succeed: with one process, the in-flight coalescing
+    in ``SharedCache`` already keeps a key to one computation.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, bytes, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        # Generation at each tag's last invalidation, oldest first
+        self._tag_versions: Dict[str, int] = {}
+        self._generation = 0
+        self.evictions = 0
+
+    def _remove(self, key: str):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: float,
+        tags: Iterable[str] = (),
+        generation: Optional[int] = None
+    ) -> bool:
+        tags = tuple(tags)
+        if generation is not None and any(self._tag_versions.get(tag, 0) > generation for tag in tags):
+            return False
+        self._remove(key)
+        self._data[key] = (time.monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+        return True
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._remove(key)
+
+    async def generation(self) -> int:
+        return self._generation
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        self._generation += 1
+        keys = set()
+        for tag in tags:
+            self._tag_versions.pop(tag, None)
+            self._tag_versions[tag] = self._generation
+            keys.update(self._tags.get(tag, ()))
+        # Only fills still running can be older than an invalidation
+        while len(self._tag_versions) > self.maxsize:
+            del self._tag_versions[next(iter(self._tag_versions))]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        return "local"
+
+    async def release_lock(self, key: str, token: str):
+        pass
+
+    async def close(self):
+        self._data.clear()
+        self._tags.clear()
+        self._tag_versions.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "tags": len(self._tags),
+            "evictions": self.evictions,
+        }
+
+class RedisBackend(CacheBackend):
+    """Backend shared by every worker through a Redis-protocol server.
+
+    Takes any ``redis.asyncio``-compatible client, so a local redis-server
+    or ``fakeredis.aioredis.FakeRedis()`` work for testing. Each tag is a set
+    of the keys stored under it. Tag sets live for ``tag_ttl`` seconds after
+    their last write, which must be at least the longest entry TTL (entries
+    are capped at ``CACHE_MAX_TTL_SECONDS``). Fill locks are ``SET NX PX``
+    keys, so only one worker computes a missing entry at a time.
+    Invalidations bump a shared generation counter and stamp each tag with
+    it; a fill stores its value in a ``WATCH`` transaction that gives up if
+    a tag was stamped after the fill began.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "", tag_ttl: int = 3600):
+        self.client = client
+        self.prefix = prefix
+        self.tag_ttl = tag_ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def _lock(self, key: str) -> str:
+        return f"{self.prefix}lock:{key}"
+
+    def _tag_version(self, tag: str) -> str:
+        return f"{self.prefix}tagver:{tag}"
+
+    @property
+    def _generation_key(self) -> str:
+        return f"{self.prefix}generation"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self._key(key))
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: float,
+        tags: Iterable[str] = (),
+        generation: Optional[int] = None
+    ) -> bool:
+        from redis.exceptions import WatchError
+        full_key = self._key(key)
+        tags = tuple(tags)
+        checked = generation is not None and tags
+        async with self.client.pipeline(transaction=bool(checked)) as pipe:
+            if checked:
+                version_keys = [self._tag_version(tag) for tag in tags]
+                await pipe.watch(*version_keys)
+                versions = await pipe.mget(*version_keys)
+                if any(version is not None and int(version) > generation for version in versions):
+                    return False
+                pipe.multi()
+            pipe.set(full_key, value, px=int(ttl * 1000))
+            for tag in tags:
+                tag_key = self._tag(tag)
+                pipe.sadd(tag_key, full_key)
+                pipe.expire(tag_key, self.tag_ttl)
+            try:
+                await pipe.execute()
+            except WatchError:
+                # A tag was invalidated between the check and the write
+                return False
+        return True
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(self._key(key) for key in keys))
+
+    async def generation(self) -> int:
+        return int(await self.client.get(self._generation_key) or 0)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tags = tuple(tags)
+        if not tags:
+            return 0
+        tag_keys = [self._tag(tag) for tag in tags]
+        generation = await self.client.incr(self._generation_key)
+        async with self.client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.set(self._tag_version(tag), generation, ex=self.tag_ttl)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = (await pipe.execute())[len(tags):]
+        keys = set().union(*members)
+        await self.client.delete(*keys, *tag_keys)
+        return len(keys)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = secrets.token_hex(8)
+        if await self.client.set(self._lock(key), token, nx=True, px=int(ttl * 1000)):
+            return token
+        return None
+
+    async def release_lock(self, key: str, token: str):
+        # Only drop our own lock; it may have expired and been taken over
+        lock_key = self._lock(key)
+        if await self.client.get(lock_key) == token.encode():
+            await self.client.delete(lock_key)
+
+    async def close(self):
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {"prefix": self.prefix, "tag_ttl": self.tag_ttl}
+
+# What a SharedCache compute function returns: the value and its tags
+Computed = Tuple[bytes, Iterable[str]]
+
+class SharedCache:
+    """Read-through cache of serialized values over a pluggable backend.
+
+    ``get_or_set`` protects against stampedes at two levels: concurrent
+    misses for a key within a worker share one computation (through a
+    ``SingleFlight``), and across
+    workers only the holder of the backend's fill lock computes while the
+    others poll briefly for its result (computing themselves if it does not
+    arrive within ``lock_wait``). Backend errors are counted and treated as
+    misses, so an unreachable Redis slows requests down instead of failing
+    them. A fill that started before an ``invalidate`` of one of its tags
+    returns its value to the callers but does not store it.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        default_ttl: float = 300,
+        max_ttl: float = 3600,
+        lock_timeout: float = 10,
+        lock_wait: float = 2,
+        poll_interval: float = 0.05
+    ):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self.poll_interval = poll_interval
+        self._fills = SingleFlight("cache_fills")
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.lock_waits = 0
+        self.invalidated = 0
+        self.stale_fills = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def _failed(self, exc: Exception):
+        self.errors += 1
+        self.last_error = f"{type(exc).__name__}: {exc}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Get a cached value, or ``None`` on a miss."""
+        try:
+            value = await self.backend.get(key)
+        except Exception as exc:
+            self._failed(exc)
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+        generation: Optional[int] = None
+    ):
+        """Store a value under tags for ``ttl`` seconds (capped at ``max_ttl``).
+
+        With a ``generation``, the value is skipped if any of its tags was
+        invalidated after that generation was read.
+        """
+        ttl = min(self.default_ttl if ttl is None else ttl, self.max_ttl)
+        try:
+            if await self.backend.set(key, value, ttl, tags, generation):
+                self.sets += 1
+            else:
+                self.stale_fills += 1
+        except Exception as exc:
+            self._failed(exc)
+
+    async def delete(self, *keys: str):
+        """Drop entries by key."""
+        try:
+            await self.backend.delete(*keys)
+        except Exception as exc:
+            self._failed(exc)
+
+    async def invalidate(self, *tags: str):
+        """Drop every entry stored under any of the tags."""
+        try:
+            self.invalidated += await self.backend.invalidate_tags(tags)
+        except Exception as exc:
+            self._failed(exc)
+
+    async def get_or_set(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Computed]],
+        ttl: Optional[float] = None
+    ) -> bytes:
+        """Get a value, computing and storing it on a miss.
+
+        ``compute`` returns the value and the tags to store it under. Its
+        exceptions (e.g. a 404) reach every caller waiting on the key and
+        nothing is cached.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+        return await self._fills.do(key, lambda: self._fill(key, compute, ttl))
+
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        try:
+            return await self.backend.acquire_lock(key, self.lock_timeout)
+        except Exception as exc:
+            self._failed(exc)
+            return "unlocked"
+
+    async def _generation(self) -> Optional[int]:
+        try:
+            return await self.backend.generation()
+        except Exception as exc:
+            self._failed(exc)
+            return None
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[Computed]], ttl: Optional[float]) -> bytes:
+        token = await self._acquire_lock(key)
+        if token is None:
+            # Another worker is computing this key; wait a little for it
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                try:
+                    value = await self.backend.get(key)
+                except Exception as exc:
+                    self._failed(exc)
+                    break
+                if value is not None:
+                    self.lock_waits += 1
+                    return value
+
+        try:
+            generation = await self._generation()
+            value, tags = await compute()
+            await self.set(key, value, ttl, tags, generation)
+            return value
+        finally:
+            if token is not None:
+                try:
+                    await self.backend.release_lock(key, token)
+                except Exception as exc:
+                    self._failed(exc)
+
+    async def close(self):
+        """Release the backend's connections."""
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        """Hit/miss and stampede counters for this worker, plus backend stats."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sets": self.sets,
+            "coalesced": self._fills.coalesced,
+            "lock_waits": self.lock_waits,
+            "invalidated": self.invalidated,
+            "stale_fills": self.stale_fills,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "in_flight": len(self._fills),
+            **self.backend.stats(),
+        }
+
+def create_backend() -> CacheBackend:
+    """Build the backend selected by ``CACHE_BACKEND``."""
+    if settings.CACHE_BACKEND == "redis":
+        # Only needed when Redis is actually configured
+        import redis.asyncio as redis
+        client = redis.from_url(settings.REDIS_URL)
+        return RedisBackend(client, prefix=settings.CACHE_KEY_PREFIX, tag_ttl=settings.CACHE_MAX_TTL_SECONDS)
+    return MemoryBackend(maxsize=settings.CACHE_MAX_ENTRIES)
+
+shared_cache = SharedCache(
+    create_backend(),
+    default_ttl=settings.CACHE_DEFAULT_TTL_SECONDS,
+    max_ttl=settings.CACHE_MAX_TTL_SECONDS,
+    lock_timeout=settings.CACHE_LOCK_TIMEOUT_SECONDS,
+    lock_wait=settings.CACHE_LOCK_WAIT_SECONDS
+)
+registry.register_stats(
+    "cache", shared_cache.stats, (("cache", "shared"),),
+    counters=("hits", "misses", "evictions", "sets", "lock_waits", "invalidated", "stale_fills", "errors"),
+    gauges=("size", "maxsize", "in_flight")
+)
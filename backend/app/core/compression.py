@@ -0,0 +1,193 @@
+import gzip
+import hashlib
+import time
+from typing import Dict, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import register_ttl_cache, registry
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Preferred first when the client weighs several encodings equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the supported encoding the client weighs highest, if any."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+def is_compressible(content_type: str) -> bool:
+    """Whether a media type is text-like enough to be worth compressing."""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+class CompressionStats:
+    """Counters for what compression saved and what it cost."""
+
+    def __init__(self):
+        self.responses: Dict[str, int] = {}
+        self.bytes_in: Dict[str, int] = {}
+        self.bytes_out: Dict[str, int] = {}
+        self.cpu_seconds: Dict[str, float] = {}
+        self.skipped_small = 0
+        self.skipped_streaming = 0
+        self.cache_hits = 0
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float):
+        self.responses[encoding] = self.responses.get(encoding, 0) + 1
+        self.bytes_in[encoding] = self.bytes_in.get(encoding, 0) + bytes_in
+        self.bytes_out[encoding] = self.bytes_out.get(encoding, 0) + bytes_out
+        self.cpu_seconds[encoding] = self.cpu_seconds.get(encoding, 0.0) + cpu_seconds
+
+    def stats(self) -> dict:
+        """Per-encoding totals plus skip and precompressed cache counters."""
+        encodings = {}
+        for encoding, count in self.responses.items():
+            bytes_in = self.bytes_in[encoding]
+            bytes_out = self.bytes_out[encoding]
+            encodings[encoding] = {
+                "responses": count,
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+                "bytes_saved": bytes_in - bytes_out,
+                "ratio": round(bytes_out / bytes_in, 4) if bytes_in else 0.0,
+                "cpu_ms": round(self.cpu_seconds[encoding] * 1000, 3),
+            }
+        return {
+            "encodings": encodings,
+            "skipped_small": self.skipped_small,
+            "skipped_streaming": self.skipped_streaming,
+            "cache_hits": self.cache_hits,
+            "cache": precompressed_cache.stats(),
+        }
+
+    def collect(self, families):
+        """Add these counters to a metrics scrape."""
+        for encoding, count in self.responses.items():
+            labels = (("encoding", encoding),)
+            families.add("compression_responses_total", "counter", "Compressed responses", count, labels)
+            families.add("compression_bytes_in_total", "counter", "Bytes before compression", self.bytes_in[encoding], labels)
+            families.add("compression_bytes_out_total", "counter", "Bytes after compression", self.bytes_out[encoding], labels)
+            families.add("compression_cpu_seconds_total", "counter", "CPU time spent compressing", self.cpu_seconds[encoding], labels)
+        for reason, count in (("small", self.skipped_small), ("streaming", self.skipped_streaming)):
+            families.add("compression_skipped_total", "counter", "Compressible responses sent uncompressed", count, (("reason", reason),))
+        families.add("compression_cache_hits_total", "counter", "Responses served from the precompressed cache", self.cache_hits)
+
+compression_stats = registry.register(CompressionStats())
+
+# Compressed bodies of responses carrying an ETag, keyed by (ETag, encoding).
+# Entries also hold a digest of the uncompressed body, so a stale entry (or a
+# tag reused by another representation) is never served.
+precompressed_cache = TTLCache(
+    maxsize=settings.COMPRESSION_CACHE_SIZE,
+    ttl=settings.COMPRESSION_CACHE_TTL_SECONDS
+)
+register_ttl_cache("precompressed", precompressed_cache)
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body at the configured level for the encoding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_LEVEL)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+def _compress_cached(body: bytes, encoding: str, etag: Optional[str]) -> bytes:
+    digest = None
+    if etag is not None:
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        cached = precompressed_cache.get((etag, encoding))
+        if cached is not None and cached[0] == digest:
+            compression_stats.cache_hits += 1
+            return cached[1]
+
+    started = time.thread_time()
+    compressed = compress(body, encoding)
+    compression_stats.record(encoding, len(body), len(compressed), time.thread_time() - started)
+    if digest is not None:
+        precompressed_cache.set((etag, encoding), (digest, compressed))
+    return compressed
+
+class CompressionMiddleware:
+    """Compress text-like responses with brotli or gzip as the client allows.
+
+    Responses smaller than ``COMPRESSION_MINIMUM_SIZE``, already encoded, or
+    streamed in several chunks are sent as they are. Every compressible
+    response gets ``Vary: Accept-Encoding`` so shared caches keep the
+    encodings apart. Weak ETags are left unchanged, since the compressed
+    body is semantically the same representation.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Hold the headers until the body shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            passthrough = True
+            headers = MutableHeaders(scope=start_message)
+            if "content-encoding" in headers or not is_compressible(headers.get("content-type", "")):
+                if start_message["status"] == 304:
+                    # A 304 stands in for the 200 and must repeat its Vary
+                    headers.add_vary_header("Accept-Encoding")
+                await send(start_message)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                compression_stats.skipped_streaming += 1
+            elif len(body) < settings.COMPRESSION_MINIMUM_SIZE:
+                compression_stats.skipped_small += 1
+            elif encoding is not None:
+                body = _compress_cached(body, encoding, headers.get("etag"))
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                message = {**message, "body": body}
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -5,12 +5,74 @@ import os
 class Settings(BaseSettings):
     # Database
     MONGODB_URL: str = "mongodb://localhost:27017/nutritionist_db"
+    CREATE_INDEXES_ON_STARTUP: bool = True
+    QUERY_BUDGET_PER_REQUEST: int = 20
+    
+    # Connection Pool (per worker process; 0 leaves max idle time unlimited)
+    MONGODB_MAX_POOL_SIZE: int = 50
+    MONGODB_MIN_POOL_SIZE: int = 5
+    MONGODB_MAX_IDLE_TIME_MS: int = 60000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    
+    # Production Server (serve.py; 0 workers means one per available core)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int = 0
+    SERVER_KEEPALIVE_SECONDS: int = 5
     
     # JWT Settings
     SECRET_KEY: str = "your-super-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    
+    # Password Hashing Pool
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # thread or process
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+    
+    # Principal Cache (stored in the shared cache)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    
+    # Shared Cache (memory, or redis to share entries between workers)
+    CACHE_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_KEY_PREFIX: str = "nutri:"
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_DEFAULT_TTL_SECONDS: int = 300
+    CACHE_MAX_TTL_SECONDS: int = 3600
+    CACHE_LOCK_TIMEOUT_SECONDS: int = 10
+    CACHE_LOCK_WAIT_SECONDS: int = 2
+    DASHBOARD_CACHE_TTL_SECONDS: int = 60
+    
+    # Background Snapshots
+    PLATFORM_METRICS_REFRESH_SECONDS: int = 60
+    
+    # Response Compression (brotli is offered when the Brotli package is installed)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_LEVEL: int = 4
+    COMPRESSION_CACHE_SIZE: int = 1024
+    COMPRESSION_CACHE_TTL_SECONDS: int = 600
+    
+    # Health Checks (/health/ready caches its MongoDB ping; failed startup steps are retried)
+    HEALTH_PING_TIMEOUT_MS: int = 500
+    HEALTH_CACHE_SECONDS: int = 2
+    STARTUP_RETRY_SECONDS: int = 5
+    ROLLUP_BACKFILL_LEASE_SECONDS: int = 900
+    
+    # Request Profiler (admins send "X-Profile: html|speedscope" or "?_profile=html")
+    PROFILER_ENABLED: bool = True
+    PROFILER_MAX_PER_MINUTE: int = 6
+    PROFILER_INTERVAL_MS: int = 1
+    PROFILER_TTL_SECONDS: int = 3600
+    
+    # Metrics (/metrics; with several workers, a shared directory lets any worker report totals)
+    METRICS_MULTIPROCESS_DIR: str = ""
+    METRICS_FLUSH_SECONDS: int = 5
     
     # AWS S3 Settings
     AWS_ACCESS_KEY_ID: str = ""
@@ -1,5 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.core.indexes import ensure_indexes, print_index_report
+from app.core.instrumentation import command_instrumentation
+from app.core.metrics import pool_metrics
 
 class Database:
     client: AsyncIOMotorClient = None
@@ -7,12 +10,56 @@ class Database:
 
 db = Database()
 
+def pool_options() -> dict:
+    """Connection pool settings for the Motor client."""
+    return {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS or None,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+    }
+
 async def connect_to_mongo():
-    """Create database connection."""
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    """Create database connection.
+    
+    Called from the app's lifespan, so each worker process opens its own
+    client (and pool) after it has been forked. Indexes are built afterwards
+    by a background startup step (see ``create_indexes``).
+    """
+    db.client = AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        event_listeners=[command_instrumentation, pool_metrics],
+        **pool_options()
+    )
     db.db = db.client.nutritionist_db
     print("Connected to MongoDB.")
 
+async def create_indexes():
+    """Build any missing index and print what happened.
+
+    Raises if a non-unique build failed, so the required ``indexes`` startup
+    step is retried. A unique index that fails to build (usually over
+    existing duplicates) will not build on a retry either, so it is only
+    reported: writes to its collection keep the duplicate pre-check in
+    ``app.api.writes`` and the worker still becomes ready.
+    """
+    results = await ensure_indexes(db.db)
+    print_index_report(results)
+    failed = [
+        f"{result['collection']}.{result['index']}"
+        for result in results if result["status"] == "failed" and not result["unique"]
+    ]
+    if failed:
+        raise RuntimeError(f"Index builds failed: {', '.join(failed)}")
+
+async def check_indexes():
+    """Look for the registry's indexes without building them.
+
+    Used when ``CREATE_INDEXES_ON_STARTUP`` is off so that unique indexes
+    built by ``scripts/create_indexes.py`` still count as confirmed.
+    """
+    print_index_report(await ensure_indexes(db.db, create=False))
+
 async def close_mongo_connection():
     """Close database connection."""
     if db.client:
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.security import verify_password, get_password_hash
+
+class PasswordHasherSaturated(Exception):
+    """Raised when the hashing pool already has too many jobs queued."""
+
+class PasswordHasher:
+    """Run bcrypt hashing and verification on a bounded worker pool.
+
+    bcrypt costs 100-300 ms of CPU per call, so running it inline in an
+    ``async def`` handler stalls every other request on the worker. Jobs are
+    handed to a thread or process pool instead, and once ``max_pending`` jobs
+    are in flight new ones are rejected so callers can back off.
+    """
+
+    def __init__(self, executor_type: str = "thread", max_workers: int = 4, max_pending: int = 32):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {executor_type}")
+        self.executor_type = executor_type
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        """Create the worker pool."""
+        if self._executor is not None:
+            return
+        if self.executor_type == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+
+    def shutdown(self):
+        """Shut the worker pool down."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _submit(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherSaturated()
+        if self._executor is None:
+            self.start()
+
+        self._pending += 1
+        self.peak_pending = max(self.peak_pending, self._pending)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            return result
+        finally:
+            self._pending -= 1
+            self.busy_seconds += time.perf_counter() - started
+
+    async def hash(self, password: str) -> str:
+        """Hash a password on the worker pool."""
+        return await self._submit(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash on the worker pool."""
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """Return pool counters."""
+        return {
+            "executor": self.executor_type,
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+password_hasher = PasswordHasher(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+registry.register_stats(
+    "password_hash", password_hasher.stats,
+    counters=("completed", "rejected", "failed", "busy_seconds"), gauges=("pending", "peak_pending", "workers")
+)
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.database import db
+from app.core.indexes import failed_indexes
+from app.core.metrics import pool_metrics
+
+# (name, coroutine function, required)
+StartupStep = Tuple[str, Callable[[], Awaitable], bool]
+
+class StartupTasks:
+    """Startup work (index builds, warmup) run in the background, in order.
+
+    The worker starts serving immediately, but readiness fails until every
+    step has finished. A required step that raises is retried every
+    ``STARTUP_RETRY_SECONDS``, so a worker started while MongoDB was down
+    becomes ready once it is back instead of needing a restart. Best-effort
+    steps (warmup) are tried once; a failure is reported but does not hold
+    readiness back, since the worker can still serve without them.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.steps: Dict[str, dict] = {}
+
+    def start(self, steps: List[StartupStep]):
+        """Run the steps in a background task."""
+        self.steps = {name: {"status": "pending", "attempts": 0, "duration_ms": None, "error": None} for name, _, _ in steps}
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(steps))
+
+    async def stop(self):
+        """Cancel any step still running."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def complete(self) -> bool:
+        return all(step["status"] in ("done", "skipped") for step in self.steps.values())
+
+    async def _run(self, steps: List[StartupStep]):
+        for name, run, required in steps:
+            state = self.steps[name]
+            while True:
+                state["status"] = "running"
+                state["attempts"] += 1
+                started = time.perf_counter()
+                try:
+                    await run()
+                except Exception as exc:
+                    state["error"] = str(exc)
+                    print(f"Startup step {name} failed (attempt {state['attempts']}): {exc}")
+                    if not required:
+                        state["status"] = "skipped"
+                        break
+                    state["status"] = "retrying"
+                    await asyncio.sleep(settings.STARTUP_RETRY_SECONDS)
+                    continue
+                state["status"] = "done"
+                state["error"] = None
+                state["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                break
+
+startup_tasks = StartupTasks()
+
+class MongoProbe:
+    """Ping MongoDB with a tight timeout, remembering the outcome briefly.
+
+    Load balancers probe every worker every few seconds; within
+    ``HEALTH_CACHE_SECONDS`` they get the previous answer, so probes add
+    almost no database load. At most one ping is outstanding: a ping that
+    timed out keeps its executor thread until server selection gives up,
+    and later probes wait on that same ping rather than piling up threads.
+    """
+
+    def __init__(self):
+        self._ping: Optional[asyncio.Task] = None
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+
+    async def _send_ping(self) -> float:
+        if db.client is None:
+            raise RuntimeError("MongoDB client is not connected")
+        started = time.perf_counter()
+        await db.client.admin.command("ping")
+        return time.perf_counter() - started
+
+    async def check(self) -> dict:
+        """Ping result: ``ok`` plus the ping time or the error."""
+        if self._result is not None and time.monotonic() - self._checked_at < settings.HEALTH_CACHE_SECONDS:
+            return self._result
+
+        if self._ping is None or self._ping.done():
+            self._ping = asyncio.create_task(self._send_ping())
+            # Nobody may be awaiting it any more once a probe timed out
+            self._ping.add_done_callback(lambda task: task.cancelled() or task.exception())
+        timeout = settings.HEALTH_PING_TIMEOUT_MS / 1000
+        try:
+            seconds = await asyncio.wait_for(asyncio.shield(self._ping), timeout)
+            result = {"ok": True, "ping_ms": round(seconds * 1000, 2), "error": None}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "ping_ms": None, "error": f"ping timed out after {settings.HEALTH_PING_TIMEOUT_MS} ms"}
+        except Exception as exc:
+            result = {"ok": False, "ping_ms": None, "error": str(exc)}
+
+        self._result, self._checked_at = result, time.monotonic()
+        return result
+
+mongo_probe = MongoProbe()
+
+def server_round_trips() -> Dict[str, Optional[float]]:
+    """Average round-trip time per server, as measured by the driver's heartbeats."""
+    if db.client is None:
+        return {}
+    servers = db.client.topology_description.server_descriptions()
+    return {
+        f"{host}:{port}": round(server.round_trip_time * 1000, 2) if server.round_trip_time is not None else None
+        for (host, port), server in servers.items()
+    }
+
+def pool_utilization() -> dict:
+    """Connections checked out against the configured pool size."""
+    return {
+        "in_use": pool_metrics.in_use,
+        "open": pool_metrics.open,
+        "max_size": settings.MONGODB_MAX_POOL_SIZE,
+        "utilization": round(pool_metrics.in_use / settings.MONGODB_MAX_POOL_SIZE, 4) if settings.MONGODB_MAX_POOL_SIZE else None,
+    }
+
+async def readiness_report() -> dict:
+    """Whether this worker should receive traffic, and why not."""
+    mongodb = await mongo_probe.check()
+    ready = mongodb["ok"] and startup_tasks.complete
+    return {
+        "status": "ready" if ready else "not_ready",
+        "startup": startup_tasks.steps,
+        # Failed unique builds do not hold readiness back; see create_indexes
+        "failed_indexes": failed_indexes,
+        "mongodb": {**mongodb, "server_rtt_ms": server_round_trips()},
+        "pool": pool_utilization(),
+    }
@@ -0,0 +1,152 @@
+import time
+from typing import Dict, List, Set
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+from app.core.metrics import registry
+
+# Every index the endpoints rely on, grouped by collection. Unique indexes
+# back the uniqueness the handlers already assume (one account per email,
+# one profile per user, one progress report and one meal plan per patient
+# per week, one active subscription per user).
+INDEXES: Dict[str, List[dict]] = {
+    "users": [
+        {"keys": [("email", ASCENDING)], "unique": True},
+        {"keys": [("role", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]},
+        {"keys": [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]},
+        {"keys": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    ],
+    "patient_profiles": [
+        {"keys": [("user_id", ASCENDING)], "unique": True},
+    ],
+    "nutritionist_profiles": [
+        {"keys": [("user_id", ASCENDING)], "unique": True},
+        {"keys": [("verified", ASCENDING), ("created_at", DESCENDING)]},
+    ],
+    "assignments": [
+        {"keys": [("nutritionist_id", ASCENDING), ("active", ASCENDING), ("_id", ASCENDING)]},
+        {"keys": [("patient_id", ASCENDING), ("nutritionist_id", ASCENDING), ("active", ASCENDING)]},
+        {"keys": [("nutritionist_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]},
+        {"keys": [("patient_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]},
+        {"keys": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    ],
+    "progress_reports": [
+        {"keys": [("patient_id", ASCENDING), ("week_start", ASCENDING)], "unique": True},
+        {"keys": [("patient_id", ASCENDING), ("created_at", ASCENDING)]},
+    ],
+    "meal_plans": [
+        {"keys": [("patient_id", ASCENDING), ("week_start", ASCENDING)], "unique": True},
+        {"keys": [("patient_id", ASCENDING), ("status", ASCENDING), ("week_start", DESCENDING)]},
+        {"keys": [("nutritionist_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"keys": [("nutritionist_id", ASCENDING), ("week_start", DESCENDING), ("_id", DESCENDING)]},
+    ],
+    "subscriptions": [
+        {"keys": [("user_id", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]},
+        {
+            "keys": [("user_id", ASCENDING)],
+            "name": "user_id_active_unique",
+            "unique": True,
+            "partialFilterExpression": {"status": "active"},
+        },
+    ],
+}
+
+# Collections whose unique indexes this process has seen in place. Until a
+# collection is listed, inserts into it keep a duplicate pre-check (see
+# app.api.writes), since a missing or still-building unique index would
+# otherwise let duplicates through silently.
+confirmed_unique: Set[str] = set()
+
+# "collection.index" -> error of the last failed build, until it succeeds.
+# Reported by /health/ready and as index_builds_failed in /metrics.
+failed_indexes: Dict[str, str] = {}
+
+def unique_filters(collection_name: str, document: dict) -> List[dict]:
+    """Queries for documents ``document`` would collide with under each unique index.
+
+    Unique indexes whose partial filter ``document`` does not match are
+    skipped, since they don't constrain it.
+    """
+    filters = []
+    for spec in INDEXES.get(collection_name, []):
+        if not spec.get("unique"):
+            continue
+        partial = spec.get("partialFilterExpression", {})
+        if any(document.get(field) != value for field, value in partial.items()):
+            continue
+        filters.append({**{field: document.get(field) for field, _ in spec["keys"]}, **partial})
+    return filters
+
+def index_name(spec: dict) -> str:
+    """Get the index name, defaulting to MongoDB's own naming scheme."""
+    if "name" in spec:
+        return spec["name"]
+    return "_".join(f"{field}_{direction}" for field, direction in spec["keys"])
+
+async def ensure_indexes(database, create: bool = True) -> List[dict]:
+    """Create any missing index in the registry and report what happened.
+
+    Safe to run repeatedly: indexes that already exist are left alone. A
+    failed build (for example a unique index over duplicate data) is
+    reported rather than raised so the remaining indexes still get built.
+    With ``create=False`` missing indexes are only reported. Either way
+    ``confirmed_unique`` is updated from what was found.
+    """
+    results = []
+    for collection_name, specs in INDEXES.items():
+        collection = database[collection_name]
+        existing = await collection.index_information()
+
+        for spec in specs:
+            name = index_name(spec)
+            result = {
+                "collection": collection_name, "index": name, "unique": bool(spec.get("unique")),
+                "status": "exists", "duration_ms": 0.0
+            }
+
+            if name not in existing and not create:
+                result["status"] = "missing"
+            elif name not in existing:
+                options = {key: value for key, value in spec.items() if key not in ("keys", "name")}
+                started = time.perf_counter()
+                try:
+                    await collection.create_index(spec["keys"], name=name, **options)
+                    result["status"] = "created"
+                except PyMongoError as exc:
+                    result["status"] = "failed"
+                    result["error"] = str(exc)
+                result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+            if result["status"] == "failed":
+                failed_indexes[f"{collection_name}.{name}"] = result["error"]
+            elif result["status"] != "missing":
+                failed_indexes.pop(f"{collection_name}.{name}", None)
+            results.append(result)
+
+        unique = [result for spec, result in zip(specs, results[-len(specs):]) if spec.get("unique")]
+        if unique and all(result["status"] in ("exists", "created") for result in unique):
+            confirmed_unique.add(collection_name)
+        else:
+            confirmed_unique.discard(collection_name)
+
+    return results
+
+def print_index_report(results: List[dict], verbose: bool = False):
+    """Print created, failed and missing indexes, plus existing ones when verbose."""
+    existing = 0
+    for result in results:
+        if result["status"] == "exists":
+            existing += 1
+            if not verbose:
+                continue
+        line = f"Index {result['collection']}.{result['index']}: {result['status']}"
+        if result["status"] in ("created", "failed"):
+            line += f" in {result['duration_ms']} ms"
+        if "error" in result:
+            line += f" ({result['error']})"
+        print(line)
+    
+    if not verbose:
+        print(f"Indexes checked: {len(results)} ({existing} already present).")
+
+registry.register_stats("index_builds", lambda: {"failed": len(failed_indexes)}, gauges=("failed",))
@@ -0,0 +1,160 @@
+import contextvars
+import threading
+from typing import Dict, Optional
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+from app.core.config import settings
+from app.core.metrics import UNMATCHED_ROUTE, registry
+
+class QueryCollector:
+    """Mongo commands issued while handling a single request.
+
+    Motor runs pymongo on executor threads (copying the request's context),
+    and handlers may fan out with ``asyncio.gather``, so updates are locked.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[int, str] = {}
+        self.count = 0
+        self.db_seconds = 0.0
+        self.docs_returned = 0
+        self.slowest_seconds = 0.0
+        self.slowest_command: Optional[str] = None
+
+    def command_started(self, event: monitoring.CommandStartedEvent):
+        target = event.command.get(event.command_name)
+        label = f"{event.command_name} {target}" if isinstance(target, str) else event.command_name
+        with self._lock:
+            self._in_flight[event.request_id] = label
+
+    def command_finished(self, request_id: int, duration_micros: int, docs: int):
+        seconds = duration_micros / 1_000_000
+        with self._lock:
+            label = self._in_flight.pop(request_id, None)
+            if label is None:
+                return
+            self.count += 1
+            self.db_seconds += seconds
+            self.docs_returned += docs
+            if seconds >= self.slowest_seconds:
+                self.slowest_seconds = seconds
+                self.slowest_command = label
+
+_current_collector: contextvars.ContextVar[Optional[QueryCollector]] = contextvars.ContextVar(
+    "query_collector", default=None
+)
+
+def current_collector() -> Optional[QueryCollector]:
+    """Get the collector for the request being handled, if any."""
+    return _current_collector.get()
+
+def _docs_in_reply(reply) -> int:
+    cursor = reply.get("cursor") if reply else None
+    if not isinstance(cursor, dict):
+        return 0
+    return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+
+class CommandInstrumentation(monitoring.CommandListener):
+    """Route pymongo command events to the current request's collector."""
+
+    def started(self, event):
+        collector = _current_collector.get()
+        if collector is not None:
+            collector.command_started(event)
+
+    def succeeded(self, event):
+        collector = _current_collector.get()
+        if collector is not None:
+            collector.command_finished(event.request_id, event.duration_micros, _docs_in_reply(event.reply))
+
+    def failed(self, event):
+        collector = _current_collector.get()
+        if collector is not None:
+            collector.command_finished(event.request_id, event.duration_micros, 0)
+
+command_instrumentation = CommandInstrumentation()
+
+# Totals per route template, e.g. "/api/v1/nutritionists/dashboard/stats".
+route_query_stats: Dict[str, dict] = {}
+
+def _record_route(route: str, collector: QueryCollector):
+    stats = route_query_stats.get(route)
+    if stats is None:
+        stats = route_query_stats[route] = {
+            "requests": 0,
+            "commands": 0,
+            "db_seconds": 0.0,
+            "docs_returned": 0,
+            "max_commands": 0,
+            "slowest_seconds": 0.0,
+            "slowest_command": None,
+        }
+    stats["requests"] += 1
+    stats["commands"] += collector.count
+    stats["db_seconds"] += collector.db_seconds
+    stats["docs_returned"] += collector.docs_returned
+    stats["max_commands"] = max(stats["max_commands"], collector.count)
+    if collector.slowest_seconds >= stats["slowest_seconds"]:
+        stats["slowest_seconds"] = collector.slowest_seconds
+        stats["slowest_command"] = collector.slowest_command
+
+@registry.register_collector
+def collect_route_queries(families):
+    """Mongo work per route template, for the metrics scrape."""
+    for route, stats in route_query_stats.items():
+        labels = (("route", route),)
+        families.add("db_commands_total", "counter", "Mongo commands issued by route template", stats["commands"], labels)
+        families.add("db_seconds_total", "counter", "Time spent in Mongo commands by route template", stats["db_seconds"], labels)
+        families.add("db_docs_returned_total", "counter", "Documents returned by Mongo by route template", stats["docs_returned"], labels)
+
+def route_template(scope) -> str:
+    """Get the matched route's path template.
+
+    Requests that match no route are folded into one ``UNMATCHED_ROUTE``
+    label, as in ``MetricsMiddleware``, so scanned 404 paths cannot grow
+    ``route_query_stats`` or the metric series without bound.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+class QueryInstrumentationMiddleware:
+    """Collect Mongo command stats for every HTTP request.
+
+    In debug mode the per-request numbers are added as ``X-DB-*`` response
+    headers, and any route exceeding ``QUERY_BUDGET_PER_REQUEST`` commands
+    gets a warning printed so N+1 loops show up without reading code.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        collector = QueryCollector()
+        token = _current_collector.set(collector)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(collector.count)
+                headers["X-DB-Time-Ms"] = f"{collector.db_seconds * 1000:.2f}"
+                headers["X-DB-Docs"] = str(collector.docs_returned)
+                if collector.slowest_command:
+                    headers["X-DB-Slowest"] = f"{collector.slowest_command} {collector.slowest_seconds * 1000:.2f}ms"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_collector.reset(token)
+            route = route_template(scope)
+            _record_route(route, collector)
+            if collector.count > settings.QUERY_BUDGET_PER_REQUEST:
+                print(
+                    f"Warning: {scope['method']} {route} issued {collector.count} Mongo commands "
+                    f"(budget {settings.QUERY_BUDGET_PER_REQUEST}, {collector.db_seconds * 1000:.1f} ms in DB)."
+                )
@@ -0,0 +1,70 @@
+import asyncio
+from typing import Dict, Hashable, Iterable, List, Optional
+from app.core.database import get_collection
+
+class BatchLoader:
+    """Coalesce lookups by key into a single ``$in`` query.
+
+    Every ``load(key)`` made in the same event-loop tick (typically from one
+    ``asyncio.gather``) is answered by one ``find``, and results, including
+    misses, are cached for the life of the loader. Loaders are created per
+    request, so the cache never outlives the request that filled it.
+    """
+
+    def __init__(self, collection_name: str, key_field: str = "_id", projection: Optional[dict] = None):
+        self.collection_name = collection_name
+        self.key_field = key_field
+        self.projection = projection
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self._dispatch_scheduled = False
+
+    def load(self, key: Hashable) -> asyncio.Future:
+        """Get a future for the document with this key (``None`` if missing)."""
+        future = self._futures.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._futures[key] = future
+        self._queue.append(key)
+        if not self._dispatch_scheduled:
+            self._dispatch_scheduled = True
+            loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[dict]]:
+        """Load several keys with one query, preserving order."""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self):
+        keys = self._queue
+        self._queue = []
+        self._dispatch_scheduled = False
+        asyncio.ensure_future(self._fetch(keys))
+
+    async def _fetch(self, keys: List[Hashable]):
+        collection = get_collection(self.collection_name)
+        try:
+            documents = await collection.find({self.key_field: {"$in": keys}}, self.projection).to_list(length=None)
+        except Exception as exc:
+            for key in keys:
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        found = {document[self.key_field]: document for document in documents}
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+class Loaders:
+    """Batch loaders shared by everything handling one request."""
+
+    def __init__(self):
+        self.users = BatchLoader("users", projection={"password_hash": 0})
+        self.patient_profiles = BatchLoader("patient_profiles", key_field="user_id")
+        self.nutritionist_profiles = BatchLoader("nutritionist_profiles", key_field="user_id")
@@ -0,0 +1,394 @@
+import asyncio
+import glob
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import orjson
+from pymongo import monitoring
+from app.core.config import settings
+
+# Prometheus text exposition without a client library. Metrics live in
+# plain dicts updated from the event loop, so recording a request costs a
+# few dict operations. Under several workers each one periodically writes
+# its samples to METRICS_MULTIPROCESS_DIR and /metrics sums them, since a
+# scrape only ever reaches one worker.
+
+Labels = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class Families(dict):
+    """Collected samples: metric name -> type, help text and sample values."""
+
+    def add(self, name: str, kind: str, help_text: str, value: float, labels: Labels = (), sample: Optional[str] = None):
+        family = self.get(name)
+        if family is None:
+            family = self[name] = {"type": kind, "help": help_text, "samples": {}}
+        key = (sample or name, labels)
+        family["samples"][key] = family["samples"].get(key, 0.0) + value
+
+class Counter:
+    """Monotonic count per label values."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self, families: Families):
+        for labels, value in self._values.items():
+            families.add(self.name, "counter", self.help, value, tuple(zip(self.labelnames, labels)))
+
+class Gauge:
+    """Value that goes up and down, without labels."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.value = 0.0
+
+    def collect(self, families: Families):
+        families.add(self.name, "gauge", self.help, self.value)
+
+class Histogram:
+    """Bucketed observations per label values.
+
+    Each series is a list of per-bucket counts (the last one being +Inf)
+    followed by the sum; buckets are only made cumulative when rendered.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self, families: Families):
+        for labels, series in self._series.items():
+            labels = tuple(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                families.add(self.name, "histogram", self.help, cumulative, labels + (("le", le),), f"{self.name}_bucket")
+            families.add(self.name, "histogram", self.help, series[-1], labels, f"{self.name}_sum")
+            families.add(self.name, "histogram", self.help, cumulative, labels, f"{self.name}_count")
+
+class Registry:
+    """Metrics plus collectors that turn existing ``stats()`` counters into samples."""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[Families], None]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[Families], None]):
+        self._collectors.append(collector)
+        return collector
+
+    def register_stats(
+        self,
+        prefix: str,
+        stats: Callable[[], dict],
+        labels: Labels = (),
+        counters: Iterable[str] = (),
+        gauges: Iterable[str] = ()
+    ):
+        """Expose keys of a component's ``stats()`` dict as ``<prefix>_<key>``.
+
+        Counter keys get a ``_total`` suffix. Missing or ``None`` values are
+        skipped, so one prefix can be shared by components with different keys.
+        """
+        counters, gauges = tuple(counters), tuple(gauges)
+
+        def collect(families: Families):
+            values = stats()
+            for key in counters:
+                if values.get(key) is not None:
+                    families.add(f"{prefix}_{key}_total", "counter", f"{prefix} {key}", values[key], labels)
+            for key in gauges:
+                if values.get(key) is not None:
+                    families.add(f"{prefix}_{key}", "gauge", f"{prefix} {key}", values[key], labels)
+
+        return self.register_collector(collect)
+
+    def collect(self) -> Families:
+        families = Families()
+        for metric in self._metrics:
+            metric.collect(families)
+        for collector in self._collectors:
+            try:
+                collector(families)
+            except Exception as exc:  # one broken collector must not hide the rest
+                print(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {exc}")
+        return families
+
+registry = Registry()
+
+def register_ttl_cache(name: str, cache):
+    """Expose a ``TTLCache``'s counters as ``cache_*{cache="<name>"}``."""
+    registry.register_stats(
+        "cache", cache.stats, (("cache", name),),
+        counters=("hits", "misses", "evictions"), gauges=("size", "maxsize")
+    )
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def render(families: Families) -> str:
+    """Prometheus text format (version 0.0.4)."""
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for (sample, labels), value in family["samples"].items():
+            if labels:
+                label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+                lines.append(f"{sample}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{sample} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+# Multi-process aggregation
+
+def _dump(families: Families) -> bytes:
+    return orjson.dumps({
+        name: {
+            "type": family["type"],
+            "help": family["help"],
+            "samples": [[sample, labels, value] for (sample, labels), value in family["samples"].items()],
+        }
+        for name, family in families.items()
+    })
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _merge_worker_files(families: Families, directory: str):
+    """Add other workers' last written samples; gauges of exited workers are dropped."""
+    own = f"{os.getpid()}.json"
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        filename = os.path.basename(path)
+        if filename == own:
+            continue
+        try:
+            with open(path, "rb") as dump:
+                data = orjson.loads(dump.read())
+        except (OSError, ValueError):
+            continue
+        alive = _pid_alive(int(filename.split(".")[0])) if filename.split(".")[0].isdigit() else False
+        for name, family in data.items():
+            if family["type"] == "gauge" and not alive:
+                continue
+            for sample, labels, value in family["samples"]:
+                families.add(name, family["type"], family["help"], value, tuple(tuple(label) for label in labels), sample)
+
+def write_worker_file(directory: str):
+    """Write this worker's samples for the others to merge (atomically, via rename)."""
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as dump:
+        dump.write(_dump(registry.collect()))
+    os.replace(temporary, path)
+
+def render_latest() -> str:
+    """Render this worker's metrics, summed with every other worker's when configured."""
+    families = registry.collect()
+    if settings.METRICS_MULTIPROCESS_DIR:
+        _merge_worker_files(families, settings.METRICS_MULTIPROCESS_DIR)
+    return render(families)
+
+class WorkerFileWriter:
+    """Background task writing this worker's samples every METRICS_FLUSH_SECONDS."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if settings.METRICS_MULTIPROCESS_DIR and self._task is None:
+            os.makedirs(settings.METRICS_MULTIPROCESS_DIR, exist_ok=True)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Keep the final counts; gauges are ignored once this pid is gone
+        write_worker_file(settings.METRICS_MULTIPROCESS_DIR)
+
+    async def _run(self):
+        while True:
+            try:
+                write_worker_file(settings.METRICS_MULTIPROCESS_DIR)
+            except OSError as exc:
+                print(f"Writing worker metrics failed: {exc}")
+            await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+
+worker_file_writer = WorkerFileWriter()
+
+# HTTP requests
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code",
+    ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template",
+    ("method", "route")
+))
+http_in_flight = registry.register(Gauge("http_requests_in_flight", "HTTP requests being handled"))
+
+# Paths that matched no route are folded together so scanners can't
+# create a series per probed URL.
+UNMATCHED_ROUTE = "<unmatched>"
+
+class MetricsMiddleware:
+    """Record latency, status and in-flight count for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.value += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            http_in_flight.value -= 1
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            http_request_duration.observe(duration, (method, template))
+            http_requests.inc((method, template, str(status_code)))
+
+# MongoDB connection pool
+
+pool_checkout_wait = registry.register(Histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool",
+    buckets=POOL_WAIT_BUCKETS
+))
+pool_checkout_failures = registry.register(Counter(
+    "mongodb_pool_checkout_failures_total", "Connection checkouts that failed, by reason", ("reason",)
+))
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Checkout wait times and connection counts from pymongo pool events.
+
+    A checkout starts and finishes on the same (Motor executor) thread, so
+    the start time is kept thread-locally. Events arrive from several
+    threads, hence the lock around the shared numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open = 0
+        self.in_use = 0
+
+    def _waited(self) -> Optional[float]:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return None if started is None else time.perf_counter() - started
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = self._waited()
+        with self._lock:
+            self.in_use += 1
+            if waited is not None:
+                pool_checkout_wait.observe(waited)
+
+    def connection_check_out_failed(self, event):
+        waited = self._waited()
+        with self._lock:
+            if waited is not None:
+                pool_checkout_wait.observe(waited)
+            pool_checkout_failures.inc((str(event.reason),))
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def collect(self, families: Families):
+        help_text = "Pooled MongoDB connections by state"
+        families.add("mongodb_pool_connections", "gauge", help_text, self.open, (("state", "open"),))
+        families.add("mongodb_pool_connections", "gauge", help_text, self.in_use, (("state", "in_use"),))
+        families.add("mongodb_pool_max_size", "gauge", "Configured maximum pool size", settings.MONGODB_MAX_POOL_SIZE)
+
+pool_metrics = registry.register(PoolMetrics())
@@ -1,11 +1,20 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import register_ttl_cache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Decoded payloads of recently verified tokens, keyed by a SHA-256 digest of
+# the token. Entries never outlive the token's own exp claim.
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+register_ttl_cache("token", token_cache)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -36,8 +45,17 @@ def create_refresh_token(data: dict) -> str:
 
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token."""
+    cache_key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(cache_key)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
-        return None 
\ No newline at end of file
+        return None
+    
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(cache_key, payload, ttl=min(exp - time.time(), token_cache.ttl))
+    return payload 
\ No newline at end of file
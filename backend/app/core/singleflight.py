@@ -0,0 +1,79 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+from app.core.metrics import registry
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its outcome.
+
+    Callers arriving while a call for their key is running await that call
+    instead of starting their own, and get its result or exception. Nothing
+    is kept once the call finishes, so this only merges concurrent work; it
+    is not a cache. If the running call is cancelled (its client went away),
+    the waiters start over rather than inheriting the cancellation.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.coalesced_by_label: Dict[str, int] = {}
+        registry.register_stats(
+            "singleflight", self.stats, (("flight", name),),
+            counters=("calls", "executions", "coalesced", "failures"), gauges=("in_flight",)
+        )
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], label: Optional[str] = None) -> T:
+        """Await ``fn()``, or the call already running for ``key``."""
+        self.calls += 1
+        running = self._calls.get(key)
+        if running is not None:
+            self.coalesced += 1
+            if label is not None:
+                self.coalesced_by_label[label] = self.coalesced_by_label.get(label, 0) + 1
+            try:
+                return await asyncio.shield(running)
+            except asyncio.CancelledError:
+                if not running.cancelled():
+                    raise
+                self.calls -= 1
+                return await self.do(key, fn, label)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            self.failures += 1
+            future.set_exception(exc)
+            # Nobody may be waiting; don't log it as never retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counters, including how many callers shared a running call."""
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "in_flight": len(self._calls),
+            "coalesced_by_label": dict(self.coalesced_by_label),
+        }
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+from app.core.metrics import registry
+
+class Snapshot:
+    """A value recomputed in the background on a fixed interval.
+
+    Readers get whatever was computed last, so a request never waits on the
+    underlying queries once the first refresh has finished. A failed refresh
+    keeps serving the previous value and is retried on the next tick.
+    """
+
+    def __init__(self, name: str, compute: Callable[[], Awaitable[Any]], interval_seconds: float):
+        self.name = name
+        self.compute = compute
+        self.interval_seconds = interval_seconds
+        self._value: Any = None
+        self._refreshed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+        self.failures = 0
+        self.last_duration_seconds = 0.0
+        self.last_error: Optional[str] = None
+        registry.register_stats(
+            "snapshot", self.stats, (("snapshot", name),),
+            counters=("refreshes", "failures"), gauges=("age_seconds", "last_duration_ms")
+        )
+
+    def start(self):
+        """Start the background refresh loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the background refresh loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self) -> Any:
+        """Recompute the value now, sharing one computation between callers."""
+        refreshed_at = self._refreshed_at
+        async with self._lock:
+            # Someone else refreshed while we waited for the lock
+            if self._refreshed_at != refreshed_at:
+                return self._value
+            started = time.perf_counter()
+            try:
+                self._value = await self.compute()
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = str(exc)
+                raise
+            finally:
+                self.last_duration_seconds = time.perf_counter() - started
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+            self.last_error = None
+            return self._value
+
+    async def get(self) -> Any:
+        """Get the latest value, computing it only if there is none yet."""
+        if self._refreshed_at is None:
+            return await self.refresh()
+        return self._value
+
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the last successful refresh, if any."""
+        if self._refreshed_at is None:
+            return None
+        return time.monotonic() - self._refreshed_at
+
+    def stats(self) -> dict:
+        """Refresh counters for monitoring."""
+        age = self.age_seconds()
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval_seconds,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "last_duration_ms": round(self.last_duration_seconds * 1000, 2),
+            "last_error": self.last_error,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:
+                print(f"Snapshot {self.name} refresh failed: {exc}")
+            await asyncio.sleep(self.interval_seconds)
@@ -0,0 +1,222 @@
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from app.core.database import get_collection
+from app.services.time_buckets import truncate
+
+# Progress report fields analysed per patient and week
+METRICS = ("weight_kg", "waist_cm", "adherence_pct", "energy_levels")
+
+class Cohort:
+    """A nutritionist's patients as (patients x weeks) arrays, one per metric.
+    
+    Week ``j`` of every array starts ``j`` weeks after ``start`` (a Monday);
+    weeks without a report, or reports without the field, are NaN.
+    """
+    
+    def __init__(self, patient_ids: List, start: datetime, weeks: int):
+        self.patient_ids = patient_ids
+        self.start = start
+        self.weeks = weeks
+        self.values: Dict[str, np.ndarray] = {
+            metric: np.full((len(patient_ids), weeks), np.nan) for metric in METRICS
+        }
+    
+    def week_starts(self) -> List[datetime]:
+        """Start of every week column."""
+        return [self.start + timedelta(weeks=week) for week in range(self.weeks)]
+    
+    def fill(self, groups: Iterable[dict]):
+        """Scatter per-patient report arrays (see ``cohort_pipeline``) into the cohort.
+        
+        Each group is ``{"_id": patient_id, "week": [...], "weight_kg": [...], ...}``
+        with parallel arrays; flattening them with ``chain`` keeps the per-value
+        work in C rather than in a Python loop over reports.
+        """
+        row_of = {patient_id: row for row, patient_id in enumerate(self.patient_ids)}
+        groups = [group for group in groups if group["_id"] in row_of]
+        if not groups:
+            return
+        
+        lengths = np.array([len(group["week"]) for group in groups], dtype=np.intp)
+        rows = np.repeat(np.array([row_of[group["_id"]] for group in groups], dtype=np.intp), lengths)
+        columns = np.fromiter(chain.from_iterable(group["week"] for group in groups), dtype=np.intp, count=int(lengths.sum()))
+        keep = (columns >= 0) & (columns < self.weeks)
+        rows, columns = rows[keep], columns[keep]
+        
+        for metric in METRICS:
+            # None (field not reported) becomes NaN
+            values = np.array(list(chain.from_iterable(group[metric] for group in groups)), dtype=float)
+            self.values[metric][rows, columns] = values[keep]
+
+def cohort_pipeline(patient_ids: List, start: datetime) -> List[dict]:
+    """Group reports per patient into parallel week index and metric arrays.
+    
+    The week index is computed by the server with ``$dateDiff`` (MongoDB 5.0
+    or newer), so the client decodes one document per patient instead of one
+    per report.
+    """
+    return [
+        {"$match": {"patient_id": {"$in": patient_ids}, "week_start": {"$gte": start}}},
+        {"$group": {
+            "_id": "$patient_id",
+            "week": {"$push": {"$dateDiff": {
+                "startDate": start,
+                "endDate": "$week_start",
+                "unit": "week",
+                "startOfWeek": "monday"
+            }}},
+            **{metric: {"$push": {"$ifNull": [f"${metric}", None]}} for metric in METRICS}
+        }}
+    ]
+
+def least_squares_slope(values: np.ndarray) -> np.ndarray:
+    """Least-squares slope per row against the week index, ignoring NaNs.
+    
+    Rows with fewer than two observations get NaN.
+    """
+    observed = ~np.isnan(values)
+    weeks = np.arange(values.shape[1], dtype=float)
+    y = np.where(observed, values, 0.0)
+    mask = observed.astype(float)
+    
+    # Closed form from per-row sums; matrix-vector products keep it in BLAS
+    counts = mask.sum(axis=1)
+    sum_x = mask @ weeks
+    sum_xx = mask @ (weeks * weeks)
+    sum_y = y.sum(axis=1)
+    sum_xy = y @ weeks
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (counts * sum_xy - sum_x * sum_y) / (counts * sum_xx - sum_x * sum_x)
+    
+    slope[counts < 2] = np.nan
+    return slope
+
+def last_observed_index(values: np.ndarray) -> np.ndarray:
+    """Column of the last non-NaN value per row (-1 for rows with none)."""
+    observed = ~np.isnan(values)
+    last = values.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    last[~observed.any(axis=1)] = -1
+    return last
+
+def current_week_index(values: np.ndarray) -> np.ndarray:
+    """Column each row's "current" figures end at.
+    
+    The last column is the week still in progress, so rows without a report
+    in it yet end at the week before instead of treating this week as missed.
+    """
+    last = values.shape[1] - 1
+    return np.where(np.isnan(values[:, last]), max(last - 1, 0), last)
+
+def window_ending_at(values: np.ndarray, end: np.ndarray, window: int) -> np.ndarray:
+    """The ``window`` columns ending at each row's ``end`` column, NaN before column 0."""
+    columns = end[:, None] - np.arange(window - 1, -1, -1)[None, :]
+    gathered = np.take_along_axis(values, np.clip(columns, 0, None), axis=1)
+    gathered[columns < 0] = np.nan
+    return gathered
+
+def latest_rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the ``window`` weeks ending at each row's latest report, ignoring NaNs.
+    
+    Only that one window is gathered per row rather than the whole rolling
+    series, which keeps the cost proportional to ``window``.
+    """
+    gathered = window_ending_at(values, last_observed_index(values), window)
+    observed = ~np.isnan(gathered)
+    counts = observed.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, np.where(observed, gathered, 0.0).sum(axis=1) / counts, np.nan)
+
+def adherence_streaks(adherence: np.ndarray, threshold: float) -> Dict[str, np.ndarray]:
+    """Current and longest run of consecutive weeks at or above the threshold.
+    
+    A week without a report breaks a streak. The current streak is the run
+    ending at the current week (see ``current_week_index``).
+    """
+    hits = np.nan_to_num(adherence, nan=-1.0) >= threshold
+    totals = np.cumsum(hits, axis=1)
+    # Subtract the running total as of the last miss to restart the count
+    resets = np.maximum.accumulate(np.where(hits, 0, totals), axis=1)
+    runs = totals - resets
+    current = np.take_along_axis(runs, current_week_index(adherence)[:, None], axis=1)[:, 0]
+    return {"current": current, "longest": runs.max(axis=1)}
+
+def detect_plateaus(weight: np.ndarray, weeks: int, tolerance_kg_per_week: float) -> np.ndarray:
+    """Flag rows whose weight trend over the ``weeks`` weeks up to the current one is flat.
+    
+    Needs a report in each of those weeks so a single quiet week does not
+    count as a plateau.
+    """
+    tail = window_ending_at(weight, current_week_index(weight), weeks)
+    enough = (~np.isnan(tail)).sum(axis=1) >= weeks
+    slope = least_squares_slope(tail)
+    with np.errstate(invalid="ignore"):
+        return enough & (np.abs(slope) <= tolerance_kg_per_week)
+
+def compute_cohort_trends(
+    cohort: Cohort,
+    rolling_window: int = 4,
+    streak_threshold: float = 80,
+    plateau_weeks: int = 4,
+    plateau_tolerance_kg: float = 0.1
+) -> Dict[str, np.ndarray]:
+    """Compute every per-patient trend for the cohort in batch."""
+    values = cohort.values
+    streaks = adherence_streaks(values["adherence_pct"], streak_threshold)
+    trends = {
+        "report_count": (~np.isnan(values["weight_kg"])).sum(axis=1),
+        "current_adherence_streak": streaks["current"],
+        "longest_adherence_streak": streaks["longest"],
+        "plateau": detect_plateaus(values["weight_kg"], plateau_weeks, plateau_tolerance_kg)
+    }
+    for metric in METRICS:
+        trends[f"{metric}_slope"] = least_squares_slope(values[metric])
+        trends[f"{metric}_rolling"] = latest_rolling_mean(values[metric], rolling_window)
+    return trends
+
+def _column(values: np.ndarray, digits: int) -> List[Optional[float]]:
+    """Round a float array and convert it to a list with None for NaN."""
+    return [None if value != value else value for value in np.round(values, digits).tolist()]
+
+def _nanmedian(values: np.ndarray) -> Optional[float]:
+    values = values[~np.isnan(values)]
+    return round(float(np.median(values)), 2) if values.size else None
+
+def summarize_trends(cohort: Cohort, trends: Dict[str, np.ndarray]) -> dict:
+    """Turn trend arrays into a JSON-friendly cohort summary and per-patient rows."""
+    columns = {
+        "patient_id": [str(patient_id) for patient_id in cohort.patient_ids],
+        "report_count": trends["report_count"].tolist(),
+        "current_adherence_streak": trends["current_adherence_streak"].tolist(),
+        "longest_adherence_streak": trends["longest_adherence_streak"].tolist(),
+        "plateau": trends["plateau"].tolist()
+    }
+    for metric in METRICS:
+        columns[f"{metric}_slope"] = _column(trends[f"{metric}_slope"], 3)
+        columns[f"{metric}_rolling"] = _column(trends[f"{metric}_rolling"], 2)
+    
+    names = list(columns)
+    patients = [dict(zip(names, row)) for row in zip(*columns.values())]
+    
+    return {
+        "week_starts": cohort.week_starts(),
+        "cohort": {
+            "patients": len(cohort.patient_ids),
+            "reporting_patients": int((trends["report_count"] > 0).sum()),
+            "median_weight_kg_slope": _nanmedian(trends["weight_kg_slope"]),
+            "median_adherence_pct_slope": _nanmedian(trends["adherence_pct_slope"]),
+            "plateaued_patients": int(trends["plateau"].sum()),
+            "patients_on_adherence_streak": int((trends["current_adherence_streak"] > 0).sum())
+        },
+        "patients": patients
+    }
+
+async def load_cohort(patient_ids: List, weeks: int, end: Optional[datetime] = None) -> Cohort:
+    """Load the last ``weeks`` weeks of reports for these patients into a Cohort."""
+    last_week = truncate(end or datetime.utcnow(), "week")
+    cohort = Cohort(patient_ids, last_week - timedelta(weeks=weeks - 1), weeks)
+    
+    groups = get_collection("progress_reports").aggregate(cohort_pipeline(patient_ids, cohort.start))
+    cohort.fill(await groups.to_list(length=None))
+    return cohort
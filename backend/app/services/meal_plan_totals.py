@@ -0,0 +1,28 @@
+from typing import List
+
+MACRO_FIELDS = (("calories", "calories"), ("protein_g", "protein"), ("carbs_g", "carbs"), ("fat_g", "fat"))
+
+def _empty_totals() -> dict:
+    return {"calories": 0, "protein": 0.0, "carbs": 0.0, "fat": 0.0}
+
+def compute_nutrition_totals(days: List[dict]) -> dict:
+    """Sum meal macros per day and for the whole week.
+    
+    The result is stored on the meal plan document (``daily_totals`` and
+    ``totals``) whenever its days are written, so listings never have to
+    walk every meal.
+    """
+    daily_totals = []
+    week_totals = _empty_totals()
+    
+    for day in days:
+        day_totals = _empty_totals()
+        for meal in day["meals"]:
+            for meal_field, total_field in MACRO_FIELDS:
+                day_totals[total_field] += meal[meal_field]
+        
+        for total_field in week_totals:
+            week_totals[total_field] += day_totals[total_field]
+        daily_totals.append({"day_of_week": day["day_of_week"], **day_totals})
+    
+    return {"daily_totals": daily_totals, "totals": week_totals}
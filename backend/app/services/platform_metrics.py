@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import get_collection
+from app.core.snapshot import Snapshot
+from app.services.time_buckets import bucketed_series, resolve_range
+
+# Subscriptions that went through payment; pending ones never charged anything
+PAID_STATUSES = ["active", "canceled", "expired"]
+
+def _count(match: dict) -> list:
+    return [{"$match": match}, {"$count": "count"}]
+
+def _facet_count(facet: dict, name: str) -> int:
+    rows = facet.get(name) or []
+    return rows[0]["count"] if rows else 0
+
+async def _facet(collection_name: str, facets: dict) -> dict:
+    results = await get_collection(collection_name).aggregate([{"$facet": facets}]).to_list(length=1)
+    return results[0] if results else {}
+
+async def compute_platform_metrics() -> dict:
+    """Compute admin platform metrics with one $facet aggregation per collection."""
+    recent_cutoff = datetime.utcnow() - timedelta(days=30)
+    trend_start, trend_end = resolve_range("day", None, None, default_buckets=30)
+    
+    users, subscriptions, meal_plans, progress, daily_trends = await asyncio.gather(
+        _facet("users", {
+            "roles": [{"$group": {"_id": "$role", "count": {"$sum": 1}}}],
+            "recent": _count({"created_at": {"$gte": recent_cutoff}})
+        }),
+        _facet("subscriptions", {
+            "active": _count({"status": "active"}),
+            "revenue": [
+                {"$match": {"status": {"$in": PAID_STATUSES}}},
+                {"$group": {"_id": None, "total": {"$sum": "$price_inr"}}}
+            ]
+        }),
+        _facet("meal_plans", {
+            "total": [{"$count": "count"}],
+            "published": _count({"status": "published"})
+        }),
+        _facet("progress_reports", {
+            "total": [{"$count": "count"}]
+        }),
+        bucketed_series({
+            "signups": ("users", {}, "created_at"),
+            "subscriptions": ("subscriptions", {}, "created_at")
+        }, trend_start, trend_end, "day")
+    )
+    
+    roles = {row["_id"]: row["count"] for row in users.get("roles", [])}
+    revenue = subscriptions.get("revenue") or []
+    
+    return {
+        "users": {
+            "total_patients": roles.get("patient", 0),
+            "total_nutritionists": roles.get("nutritionist", 0),
+            "total_admins": roles.get("admin", 0),
+            "recent_signups_30d": _facet_count(users, "recent")
+        },
+        "subscriptions": {
+            "active_subscriptions": _facet_count(subscriptions, "active"),
+            "total_revenue": revenue[0]["total"] if revenue else 0
+        },
+        "meal_plans": {
+            "total_meal_plans": _facet_count(meal_plans, "total"),
+            "published_meal_plans": _facet_count(meal_plans, "published")
+        },
+        "progress": {
+            "total_progress_reports": _facet_count(progress, "total")
+        },
+        "trends": {
+            "unit": "day",
+            "buckets": daily_trends
+        }
+    }
+
+platform_metrics = Snapshot(
+    "platform_metrics",
+    compute_platform_metrics,
+    settings.PLATFORM_METRICS_REFRESH_SECONDS
+)
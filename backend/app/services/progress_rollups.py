@@ -0,0 +1,190 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.database import get_collection
+
+ROLLUPS_COLLECTION = "patient_progress_rollups"
+
+# One document per one-off data migration: a lease while it runs, then
+# completed_at once it has succeeded.
+MIGRATIONS_COLLECTION = "migrations"
+BACKFILL_MIGRATION = "progress_rollups_backfill"
+
+# Stand-in for "no report yet" when comparing week_start values in updates.
+_EPOCH = datetime(1970, 1, 1)
+
+def _rollup_pipeline(match: dict) -> List[dict]:
+    """Aggregation that rebuilds rollup documents from raw progress reports."""
+    return [
+        {"$match": match},
+        {"$sort": {"patient_id": 1, "week_start": 1}},
+        {"$group": {
+            "_id": "$patient_id",
+            "report_count": {"$sum": 1},
+            "weight_sum": {"$sum": "$weight_kg"},
+            "adherence_sum": {"$sum": "$adherence_pct"},
+            "first_week_start": {"$first": "$week_start"},
+            "latest_week_start": {"$last": "$week_start"},
+            "latest_report_at": {"$max": "$created_at"},
+            "weeks": {"$push": "$week_start"},
+            "weights": {"$push": "$weight_kg"}
+        }},
+        {"$set": {
+            "latest_weight_kg": {"$arrayElemAt": ["$weights", -1]},
+            "previous_weight_kg": {"$arrayElemAt": ["$weights", -2]},
+            "previous_week_start": {"$arrayElemAt": ["$weeks", -2]},
+            "updated_at": datetime.utcnow()
+        }},
+        {"$project": {"weeks": 0, "weights": 0}}
+    ]
+
+async def record_report(report: dict):
+    """Fold a newly inserted progress report into its patient's rollup.
+    
+    Runs as a single pipeline update, so concurrent reports for the same
+    patient can't lose increments. Counts and sums are incremented, the
+    latest report date only moves forward, and the two most recent weekly
+    weights are kept for trend calculations.
+    """
+    week_start = report["week_start"]
+    weight = report["weight_kg"]
+    
+    await get_collection(ROLLUPS_COLLECTION).update_one(
+        {"_id": report["patient_id"]},
+        [
+            {"$set": {
+                "_is_latest": {"$gte": [week_start, {"$ifNull": ["$latest_week_start", _EPOCH]}]},
+                "_is_previous": {"$gte": [week_start, {"$ifNull": ["$previous_week_start", _EPOCH]}]}
+            }},
+            {"$set": {
+                "report_count": {"$add": [{"$ifNull": ["$report_count", 0]}, 1]},
+                "weight_sum": {"$add": [{"$ifNull": ["$weight_sum", 0]}, weight]},
+                "adherence_sum": {"$add": [{"$ifNull": ["$adherence_sum", 0]}, report["adherence_pct"]]},
+                "first_week_start": {"$min": ["$first_week_start", week_start]},
+                "latest_report_at": {"$max": ["$latest_report_at", report["created_at"]]},
+                "latest_week_start": {"$cond": ["$_is_latest", week_start, "$latest_week_start"]},
+                "latest_weight_kg": {"$cond": ["$_is_latest", weight, "$latest_weight_kg"]},
+                "previous_week_start": {"$cond": [
+                    "$_is_latest",
+                    "$latest_week_start",
+                    {"$cond": ["$_is_previous", week_start, "$previous_week_start"]}
+                ]},
+                "previous_weight_kg": {"$cond": [
+                    "$_is_latest",
+                    "$latest_weight_kg",
+                    {"$cond": ["$_is_previous", weight, "$previous_weight_kg"]}
+                ]},
+                "updated_at": datetime.utcnow()
+            }},
+            {"$project": {"_is_latest": 0, "_is_previous": 0}}
+        ],
+        upsert=True
+    )
+
+async def refresh_patient_rollup(patient_id):
+    """Recompute one patient's rollup from their reports."""
+    rollups_collection = get_collection(ROLLUPS_COLLECTION)
+    progress_collection = get_collection("progress_reports")
+    
+    rollups = await progress_collection.aggregate(_rollup_pipeline({"patient_id": patient_id})).to_list(length=1)
+    if rollups:
+        await rollups_collection.replace_one({"_id": patient_id}, rollups[0], upsert=True)
+    else:
+        await rollups_collection.delete_one({"_id": patient_id})
+
+async def rebuild_rollups() -> int:
+    """Rebuild every rollup from the full report history.
+    
+    Rollups are merged into the live collection instead of replacing it
+    with ``$out``, so the upserts of reports recorded meanwhile are not
+    thrown away with the old collection. Patients who reported during the
+    rebuild are then recomputed individually, since the merge may have
+    overwritten their increments with an older snapshot, and rollups the
+    rebuild did not touch (patients with no reports left) are removed.
+    """
+    rollups_collection = get_collection(ROLLUPS_COLLECTION)
+    progress_collection = get_collection("progress_reports")
+    started = datetime.utcnow()
+    
+    pipeline = _rollup_pipeline({}) + [{"$merge": {
+        "into": ROLLUPS_COLLECTION,
+        "on": "_id",
+        "whenMatched": "replace",
+        "whenNotMatched": "insert"
+    }}]
+    await progress_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    
+    for patient_id in await progress_collection.distinct("patient_id", {"created_at": {"$gte": started}}):
+        await refresh_patient_rollup(patient_id)
+    await rollups_collection.delete_many({"updated_at": {"$lt": started}})
+    return await rollups_collection.count_documents({})
+
+async def _acquire_backfill_lease(owner: str) -> bool:
+    """Take the backfill lease unless it is held or the backfill has completed."""
+    now = datetime.utcnow()
+    try:
+        await get_collection(MIGRATIONS_COLLECTION).update_one(
+            {
+                "_id": BACKFILL_MIGRATION,
+                "completed_at": None,
+                "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}]
+            },
+            {"$set": {
+                "lease_owner": owner,
+                "lease_expires_at": now + timedelta(seconds=settings.ROLLUP_BACKFILL_LEASE_SECONDS)
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The document exists but did not match: leased or completed
+        return False
+    return True
+
+async def backfill_rollups():
+    """Build the rollups once for data recorded before they existed.
+    
+    Runs as a required startup step on every worker. A ``migrations``
+    document records completion, so the rebuild happens once per database
+    rather than whenever the rollups collection looks empty, and its lease
+    lets only one worker run it. The others raise while it is held and are
+    retried by the startup loop until the backfill has completed.
+    """
+    migrations = get_collection(MIGRATIONS_COLLECTION)
+    if await migrations.find_one({"_id": BACKFILL_MIGRATION, "completed_at": {"$ne": None}}, {"_id": 1}):
+        return
+    
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    if not await _acquire_backfill_lease(owner):
+        raise RuntimeError("Progress rollup backfill is running on another worker")
+    
+    try:
+        count = 0
+        if await get_collection("progress_reports").find_one({}, {"_id": 1}) is not None:
+            count = await rebuild_rollups()
+    except Exception:
+        await migrations.update_one(
+            {"_id": BACKFILL_MIGRATION, "lease_owner": owner},
+            {"$set": {"lease_expires_at": None}}
+        )
+        raise
+    
+    await migrations.update_one(
+        {"_id": BACKFILL_MIGRATION, "lease_owner": owner},
+        {"$set": {"completed_at": datetime.utcnow(), "rollups": count, "lease_expires_at": None}}
+    )
+    print(f"Backfilled {count} patient progress rollups.")
+
+async def get_rollups(patient_ids: Iterable) -> Dict:
+    """Get rollups for a set of patients, keyed by patient id."""
+    cursor = get_collection(ROLLUPS_COLLECTION).find({"_id": {"$in": list(patient_ids)}})
+    return {rollup["_id"]: rollup async for rollup in cursor}
+
+def rollup_averages(rollup: Optional[dict]) -> Tuple[float, float]:
+    """Get (average weight, average adherence) for a rollup."""
+    if not rollup or not rollup.get("report_count"):
+        return 0.0, 0.0
+    count = rollup["report_count"]
+    return rollup["weight_sum"] / count, rollup["adherence_sum"] / count
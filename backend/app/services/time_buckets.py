@@ -0,0 +1,127 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from app.core.database import get_collection
+
+BUCKET_UNITS = ("day", "week", "month")
+
+# Upper bound on buckets per request so a wide range at day granularity
+# cannot turn into an unbounded response.
+MAX_BUCKETS = 366
+
+# name -> (collection, match filter, date field)
+SeriesSpec = Dict[str, Tuple[str, dict, str]]
+
+def truncate(moment: datetime, unit: str) -> datetime:
+    """Truncate a datetime to the start of its bucket (weeks start on Monday)."""
+    start = datetime(moment.year, moment.month, moment.day)
+    if unit == "week":
+        return start - timedelta(days=start.weekday())
+    if unit == "month":
+        return start.replace(day=1)
+    return start
+
+def next_bucket(bucket_start: datetime, unit: str) -> datetime:
+    """Get the start of the bucket following this one."""
+    if unit == "day":
+        return bucket_start + timedelta(days=1)
+    if unit == "week":
+        return bucket_start + timedelta(weeks=1)
+    if bucket_start.month == 12:
+        return bucket_start.replace(year=bucket_start.year + 1, month=1)
+    return bucket_start.replace(month=bucket_start.month + 1)
+
+def bucket_starts(start: datetime, end: datetime, unit: str) -> List[datetime]:
+    """List every bucket start overlapping [start, end)."""
+    starts = []
+    current = truncate(start, unit)
+    while current < end:
+        starts.append(current)
+        current = next_bucket(current, unit)
+    return starts
+
+def bucket_label(bucket_start: datetime, unit: str) -> str:
+    """Human readable label for a bucket."""
+    if unit == "month":
+        return bucket_start.strftime("%B %Y")
+    if unit == "week":
+        return f"Week of {bucket_start.strftime('%Y-%m-%d')}"
+    return bucket_start.strftime("%Y-%m-%d")
+
+def resolve_range(unit: str, start: Optional[date], end: Optional[date], default_buckets: int) -> Tuple[datetime, datetime]:
+    """Validate query parameters and turn them into a [start, end) datetime range.
+
+    ``end`` is inclusive as a date. Without ``start`` the range covers the
+    last ``default_buckets`` buckets up to and including the current one.
+    """
+    if unit not in BUCKET_UNITS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid bucket unit, expected one of: {', '.join(BUCKET_UNITS)}"
+        )
+    
+    end_date = end or datetime.utcnow().date()
+    range_end = datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1)
+    
+    if start is None:
+        range_start = truncate(range_end - timedelta(days=1), unit)
+        for _ in range(default_buckets - 1):
+            range_start = truncate(range_start - timedelta(days=1), unit)
+    else:
+        range_start = datetime(start.year, start.month, start.day)
+    
+    if range_start >= range_end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be on or before end"
+        )
+    if len(bucket_starts(range_start, range_end, unit)) > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range too large, at most {MAX_BUCKETS} buckets are allowed"
+        )
+    return range_start, range_end
+
+async def count_by_bucket(
+    collection_name: str,
+    match: dict,
+    date_field: str,
+    start: datetime,
+    end: datetime,
+    unit: str
+) -> Dict[datetime, int]:
+    """Count documents per bucket with a single $group on $dateTrunc.
+
+    ``$dateTrunc`` needs MongoDB 5.0 or newer. Buckets without documents
+    are simply absent from the result.
+    """
+    pipeline = [
+        {"$match": {**match, date_field: {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {"$dateTrunc": {"date": f"${date_field}", "unit": unit, "startOfWeek": "monday"}},
+            "count": {"$sum": 1}
+        }}
+    ]
+    rows = await get_collection(collection_name).aggregate(pipeline).to_list(length=None)
+    return {row["_id"]: row["count"] for row in rows}
+
+async def bucketed_series(series: SeriesSpec, start: datetime, end: datetime, unit: str) -> List[dict]:
+    """Count several series over the same buckets, one aggregation each, run concurrently.
+
+    Returns one entry per bucket in the range, zero-filled, e.g.
+    ``{"bucket_start": ..., "label": "October 2026", "meal_plans": 3, ...}``.
+    """
+    names = list(series)
+    counts = await asyncio.gather(*(
+        count_by_bucket(collection_name, match, date_field, start, end, unit)
+        for collection_name, match, date_field in series.values()
+    ))
+    
+    buckets = []
+    for bucket_start in bucket_starts(start, end, unit):
+        bucket = {"bucket_start": bucket_start, "label": bucket_label(bucket_start, unit)}
+        for name, series_counts in zip(names, counts):
+            bucket[name] = series_counts.get(bucket_start, 0)
+        buckets.append(bucket)
+    return buckets
@@ -0,0 +1,115 @@
+"""Cohort trend analytics at nutritionist-cohort scale.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_cohort_trends --patients 10000 --weeks 52
+
+Builds synthetic progress reports (with missed weeks and missing waist
+measurements) and the per-patient groups the cohort pipeline returns for
+them, then times each client-side stage of /progress/nutritionist/trends:
+decoding the reply, scattering it into arrays, the vectorised trend
+computation and shaping the JSON response. Decoding one document per report
+is timed too, to show what grouping on the server saves. A per-patient
+Python loop computing only the weight slope is timed for comparison, and
+the vectorised slopes are checked against numpy.polyfit.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+import bson
+import numpy as np
+from bson import ObjectId
+from app.services.cohort_trends import METRICS, Cohort, compute_cohort_trends, summarize_trends
+
+def make_reports(patient_ids, start: datetime, weeks: int, missing: float):
+    rng = random.Random(42)
+    reports = []
+    for patient_id in patient_ids:
+        weight = rng.uniform(60, 130)
+        weekly_change = rng.uniform(-1.0, 0.2)
+        for week in range(weeks):
+            weight += weekly_change + rng.gauss(0, 0.3)
+            if rng.random() < missing:
+                continue
+            reports.append({
+                "patient_id": patient_id,
+                "week_start": start + timedelta(weeks=week),
+                "weight_kg": round(weight, 1),
+                "waist_cm": round(weight * 0.9, 1) if rng.random() > 0.3 else None,
+                "adherence_pct": rng.randint(40, 100),
+                "energy_levels": rng.randint(1, 10)
+            })
+    return reports
+
+def group_reports(reports, start: datetime):
+    """What the cohort pipeline's $group stage returns for these reports."""
+    groups = {}
+    for report in reports:
+        group = groups.get(report["patient_id"])
+        if group is None:
+            group = groups[report["patient_id"]] = {"_id": report["patient_id"], "week": [], **{metric: [] for metric in METRICS}}
+        group["week"].append((report["week_start"] - start).days // 7)
+        for metric in METRICS:
+            group[metric].append(report[metric])
+    return list(groups.values())
+
+def python_weight_slopes(reports, start: datetime):
+    by_patient = {}
+    for report in reports:
+        by_patient.setdefault(report["patient_id"], []).append(
+            ((report["week_start"] - start).days // 7, report["weight_kg"])
+        )
+    slopes = {}
+    for patient_id, points in by_patient.items():
+        n = len(points)
+        x_mean = sum(x for x, _ in points) / n
+        y_mean = sum(y for _, y in points) / n
+        denominator = sum((x - x_mean) ** 2 for x, _ in points)
+        slopes[patient_id] = sum((x - x_mean) * (y - y_mean) for x, y in points) / denominator if denominator else None
+    return slopes
+
+def timed(label: str, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"{label:<28} {elapsed_ms:9.1f} ms")
+    return result, elapsed_ms
+
+def main(args):
+    start = datetime(2024, 1, 1)
+    patient_ids = [ObjectId() for _ in range(args.patients)]
+    reports = make_reports(patient_ids, start, args.weeks, args.missing)
+    print(f"{args.patients} patients x {args.weeks} weeks, {len(reports):,} reports")
+    
+    report_bytes = b"".join(bson.encode(report) for report in reports)
+    group_bytes = b"".join(bson.encode(group) for group in group_reports(reports, start))
+    timed("decode per-report reply", lambda: bson.decode_all(report_bytes))
+    groups, decode_ms = timed("decode grouped reply", lambda: bson.decode_all(group_bytes))
+    
+    cohort = Cohort(patient_ids, start, args.weeks)
+    _, fill_ms = timed("fill arrays", lambda: cohort.fill(groups))
+    trends, compute_ms = timed("compute trends (numpy)", lambda: compute_cohort_trends(cohort))
+    _, summarize_ms = timed("summarize response", lambda: summarize_trends(cohort, trends))
+    loop_slopes, loop_ms = timed("weight slope (python loop)", lambda: python_weight_slopes(reports, start))
+    
+    # Spot-check slopes against numpy.polyfit
+    for row in range(0, args.patients, max(1, args.patients // 50)):
+        series = cohort.values["weight_kg"][row]
+        observed = ~np.isnan(series)
+        expected = np.polyfit(np.arange(args.weeks)[observed], series[observed], 1)[0]
+        assert abs(trends["weight_kg_slope"][row] - expected) < 1e-9
+        assert abs(loop_slopes[patient_ids[row]] - expected) < 1e-9
+    
+    total_ms = decode_ms + fill_ms + compute_ms + summarize_ms
+    verdict = "within" if total_ms <= args.budget_ms else "over"
+    print(f"total {total_ms:.1f} ms, {verdict} the {args.budget_ms} ms request budget")
+    print(f"numpy computes all metrics {loop_ms / compute_ms:.1f}x faster than the loop computes one")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--missing", type=float, default=0.15, help="fraction of weeks without a report")
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    main(parser.parse_args())
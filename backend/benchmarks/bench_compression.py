@@ -0,0 +1,60 @@
+"""Response compression: size and CPU per level, and the precompressed cache hit path.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_compression --iterations 500
+
+Bodies are the serialized responses used by bench_response_serialization:
+a 7-day, 35-meal plan and a 52-week progress list. For each encoding and
+level the compressed size and the time per compression are printed,
+followed by the cost of serving the same body again from the
+precompressed cache (hashing the body and looking up the entry).
+"""
+import argparse
+import time
+from app.api.responses import DocumentSerializer
+from app.core import compression
+from app.core.config import settings
+from app.models.meal_plan import MealPlanResponse
+from app.models.progress import ProgressReportResponse
+from benchmarks.bench_response_serialization import meal_plan_document, progress_documents
+
+def measure(render, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+def bench_body(title: str, body: bytes, iterations: int):
+    print(f"{title}: {len(body):,} bytes")
+    levels = [("gzip", level) for level in (1, 6, 9)]
+    if compression.brotli is not None:
+        levels += [("br", level) for level in (1, 4, 6, 11)]
+    else:
+        print("  (Brotli not installed, skipping br)")
+
+    for encoding, level in levels:
+        if encoding == "br":
+            settings.COMPRESSION_BROTLI_LEVEL = level
+        else:
+            settings.COMPRESSION_GZIP_LEVEL = level
+        size = len(compression.compress(body, encoding))
+        per_call_us = measure(lambda: compression.compress(body, encoding), iterations)
+        print(f"  {encoding:<4} level {level:<2} {size:8,} bytes ({size / len(body):6.1%}) {per_call_us:9.1f} us")
+
+    encoding = compression.SUPPORTED_ENCODINGS[0]
+    compression.precompressed_cache.clear()
+    compression._compress_cached(body, encoding, 'W/"bench"')
+    per_call_us = measure(lambda: compression._compress_cached(body, encoding, 'W/"bench"'), iterations)
+    print(f"  {encoding:<4} cached         {per_call_us:9.1f} us")
+
+def main(args):
+    plan = DocumentSerializer(MealPlanResponse).response(meal_plan_document()).body
+    reports = DocumentSerializer(ProgressReportResponse).list_response(progress_documents(52)).body
+    bench_body("7-day, 35-meal plan", plan, args.iterations)
+    bench_body("52-week progress list", reports, args.iterations)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    main(parser.parse_args())
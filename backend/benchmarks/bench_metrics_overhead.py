@@ -0,0 +1,114 @@
+"""Per-request cost of the Prometheus metrics middleware.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_metrics_overhead --requests 20000 --routes 40
+
+Two apps are timed with and without MetricsMiddleware, called directly as
+ASGI apps on one event loop so no network or client noise is measured.
+The first is a bare ASGI app that only sends a response, which isolates the
+middleware itself. The second is a FastAPI app with --routes parameterised
+routes, so route matching, templates and histogram series are realistic.
+Requests are spread across the routes. The best of --repeat rounds is kept
+for each variant, and the added microseconds per request are compared
+with --budget-us. The cost of rendering a /metrics scrape of the resulting
+series is printed too.
+"""
+import argparse
+import asyncio
+import gc
+import time
+from fastapi import FastAPI
+from app.core.metrics import MetricsMiddleware, registry, render
+
+class FakeRoute:
+    def __init__(self, path: str):
+        self.path = path
+
+def bare_app(routes):
+    async def app(scope, receive, send):
+        # Stand-in for the router, which records the matched route in the scope
+        scope["route"] = routes[scope["path"]]
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+    return app
+
+def fastapi_app(count: int, with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+    for index in range(count):
+        async def endpoint(item_id: str):
+            return {"id": item_id}
+        app.add_api_route(f"/api/v1/resource{index}/{{item_id}}", endpoint, methods=["GET"])
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+def make_scope(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+async def time_app(app, paths, requests: int) -> float:
+    """Seconds per request, with garbage collection paused to cut noise."""
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for index in range(requests):
+            await app(make_scope(paths[index % len(paths)]), receive, send)
+        return (time.perf_counter() - started) / requests
+    finally:
+        gc.enable()
+
+async def compare(name: str, plain, instrumented, paths, args):
+    # Warm up both (first requests build route caches and histogram series)
+    await time_app(plain, paths, len(paths) * 10)
+    await time_app(instrumented, paths, len(paths) * 10)
+    plain_best = instrumented_best = float("inf")
+    for _ in range(args.repeat):
+        plain_best = min(plain_best, await time_app(plain, paths, args.requests))
+        instrumented_best = min(instrumented_best, await time_app(instrumented, paths, args.requests))
+    overhead_us = (instrumented_best - plain_best) * 1e6
+    verdict = "within" if overhead_us <= args.budget_us else "over"
+    print(f"{name:<8} without {plain_best * 1e6:8.2f} us  with {instrumented_best * 1e6:8.2f} us  "
+          f"overhead {overhead_us:6.2f} us/request, {verdict} the {args.budget_us:g} us budget")
+    return overhead_us
+
+async def main(args):
+    templates = [f"/api/v1/resource{index}/{{item_id}}" for index in range(args.routes)]
+    paths = [template.replace("{item_id}", "64b7f0c2a1b2c3d4e5f60718") for template in templates]
+    print(f"{args.requests} requests x {args.repeat} rounds over {args.routes} route(s)")
+
+    routes = {path: FakeRoute(template) for path, template in zip(paths, templates)}
+    plain = bare_app(routes)
+    await compare("asgi", plain, MetricsMiddleware(plain), paths, args)
+    await compare("fastapi", fastapi_app(args.routes, False), fastapi_app(args.routes, True), paths, args)
+
+    started = time.perf_counter()
+    text = render(registry.collect())
+    print(f"scrape   {len(text.splitlines())} lines rendered in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--routes", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,80 @@
+"""Login throughput and event-loop responsiveness under concurrent bcrypt work.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_password_hashing --logins 40 --workers 4
+
+Each mode fires ``--logins`` concurrent password verifications while a probe
+coroutine stands in for an unrelated endpoint (e.g. /patients/current-plan)
+and records how long it waits to get scheduled. "inline" is the old
+behaviour of calling bcrypt directly inside the handler.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from app.core.hashing import PasswordHasher, PasswordHasherSaturated
+from app.core.security import get_password_hash, verify_password
+
+PROBE_INTERVAL = 0.01
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def probe(stop: asyncio.Event, delays: list):
+    while not stop.is_set():
+        scheduled = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        delays.append(time.perf_counter() - scheduled - PROBE_INTERVAL)
+
+async def inline_login(password: str, hashed: str):
+    await asyncio.sleep(0)
+    return verify_password(password, hashed)
+
+async def run_mode(name: str, login, logins: int):
+    stop = asyncio.Event()
+    delays = []
+    probe_task = asyncio.create_task(probe(stop, delays))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe_task
+    rejected = sum(isinstance(result, PasswordHasherSaturated) for result in results)
+    completed = logins - rejected
+    delays_ms = [delay * 1000 for delay in delays]
+    print(
+        f"{name:<10} logins/s={completed / elapsed:7.1f}  rejected={rejected:<4}"
+        f" probe p50={statistics.median(delays_ms):7.1f}ms"
+        f" p99={percentile(delays_ms, 99):7.1f}ms max={max(delays_ms):7.1f}ms"
+    )
+
+async def main(args):
+    password = "correct horse battery staple"
+    hashed = get_password_hash(password)
+
+    await run_mode("inline", lambda: inline_login(password, hashed), args.logins)
+
+    for executor_type in ("thread", "process"):
+        hasher = PasswordHasher(executor_type=executor_type, max_workers=args.workers, max_pending=args.max_pending)
+        hasher.start()
+        # Warm the pool so process start-up isn't billed to the first logins.
+        await hasher.verify(password, hashed)
+        try:
+            await run_mode(executor_type, lambda: hasher.verify(password, hashed), args.logins)
+        finally:
+            hasher.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
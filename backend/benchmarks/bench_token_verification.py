@@ -0,0 +1,36 @@
+"""Cold versus warm cost of verify_token per request.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_token_verification --requests 20000
+
+"cold" clears the token cache before every call, so each one pays for
+jwt.decode with HMAC verification and claim parsing. "warm" replays the
+same bearer token, the way a dashboard load does 5-8 times in a row.
+"""
+import argparse
+import time
+from app.core.security import create_access_token, token_cache, verify_token
+
+def run(label: str, token: str, requests: int, clear_cache: bool):
+    token_cache.clear()
+    started = time.perf_counter()
+    for _ in range(requests):
+        if clear_cache:
+            token_cache.clear()
+        assert verify_token(token) is not None
+    elapsed = time.perf_counter() - started
+    per_call_us = elapsed / requests * 1_000_000
+    print(f"{label:<5} {per_call_us:8.2f} us/request  ({requests / elapsed:,.0f} verifications/s)")
+    return per_call_us
+
+def main(args):
+    token = create_access_token(data={"sub": "64b7f0c2a1b2c3d4e5f60718", "email": "bench@example.com", "role": "patient"})
+    cold = run("cold", token, args.requests, clear_cache=True)
+    warm = run("warm", token, args.requests, clear_cache=False)
+    print(f"speedup {cold / warm:.1f}x, cache {token_cache.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    main(parser.parse_args())
@@ -0,0 +1,135 @@
+"""Throughput against worker count for the production server (serve.py).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_worker_scaling --workers 1 2 4 --duration 10
+
+For each worker count a server is started with serve.py on a free port
+and driven by --clients load-generator processes. Each process keeps
+--concurrency requests in flight for --duration seconds. Requests per
+second, latency percentiles and the speedup over the first worker count
+are printed.
+
+The default target is /openapi.json with gzip. It needs no database and
+is CPU-bound (JSON encoding plus compression), which is the work extra
+workers spread across cores. Use --path and --header (e.g. a bearer
+token) to load an API route against a running MongoDB instead. Expect
+scaling only up to the cores left over after the load generators.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    # Nothing to index when only the no-database default path is loaded
+    env.setdefault("CREATE_INDEXES_ON_STARTUP", "false")
+    env["DEBUG"] = "false"
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"server with {workers} worker(s) did not start")
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+async def drive(url: str, headers: dict, concurrency: int, duration: float) -> Tuple[int, int, List[float]]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=30) as client:
+        async def loop():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    await response.aread()
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return len(latencies), errors, latencies
+
+def client_process(args) -> Tuple[int, int, List[float]]:
+    return asyncio.run(drive(*args))
+
+def run_load(url: str, headers: dict, clients: int, concurrency: int, duration: float) -> dict:
+    with multiprocessing.Pool(clients) as pool:
+        started = time.perf_counter()
+        results = pool.map(client_process, [(url, headers, concurrency, duration)] * clients)
+        elapsed = time.perf_counter() - started
+    latencies = sorted(latency for _, _, client_latencies in results for latency in client_latencies)
+    requests = sum(count for count, _, _ in results)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "requests": requests,
+        "errors": sum(errors for _, errors, _ in results),
+        "rps": requests / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+def main(args):
+    headers = {"Accept-Encoding": "gzip"}
+    for header in args.header:
+        name, _, value = header.partition(":")
+        headers[name.strip()] = value.strip()
+    print(f"{args.path}: {args.clients} client process(es) x {args.concurrency} in flight, {args.duration:g}s per run, "
+          f"{os.cpu_count()} CPU(s)")
+
+    baseline = None
+    for workers in args.workers:
+        port = free_port()
+        server = start_server(workers, port)
+        try:
+            url = f"http://127.0.0.1:{port}{args.path}"
+            run_load(url, headers, args.clients, args.concurrency, min(args.duration, 2))  # warm up every worker
+            result = run_load(url, headers, args.clients, args.concurrency, args.duration)
+        finally:
+            stop_server(server)
+        baseline = baseline or result["rps"]
+        print(f"  {workers:>2} worker(s) {result['rps']:9.0f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+              f"p99 {result['p99_ms']:7.2f} ms  errors {result['errors']:>5}  x{result['rps'] / baseline:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/openapi.json")
+    parser.add_argument("--header", action="append", default=[], help="extra request header, e.g. 'Authorization: Bearer ...'")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    main(parser.parse_args())
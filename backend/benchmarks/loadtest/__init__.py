@@ -0,0 +1,25 @@
+"""End-to-end load tests against a seeded synthetic dataset.
+
+Run from the backend directory:
+
+    # Seed the MongoDB in MONGODB_URL and write the ids the run needs
+    python -m benchmarks.loadtest seed --nutritionists 20 --patients-per-nutritionist 25 --weeks 26
+
+    # Drive the app in-process (or a running server with --target)
+    python -m benchmarks.loadtest run --duration 30 --concurrency 32 --output before.json
+    python -m benchmarks.loadtest run --target http://127.0.0.1:8000 --output after.json
+
+    # Fail (exit 1) when the second run regressed
+    python -m benchmarks.loadtest compare before.json after.json
+
+    # Fail (exit 1) when a covered endpoint's query scans a collection,
+    # sorts in memory or examines far more documents than it matches
+    python -m benchmarks.loadtest explain --max-ratio 10 --output plans.json
+
+``run --mongomock`` seeds and drives an in-memory database instead (needs
+mongomock-motor); it checks the harness and the call mix, but its timings
+say little about MongoDB and some aggregation routes fail on it.
+Per-route Mongo command counts come from the server's /metrics, so they
+are missing under mongomock (no command monitoring there), and explain
+needs a real MongoDB.
+"""
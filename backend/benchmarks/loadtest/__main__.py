@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+import httpx
+from pymongo import monitoring
+from benchmarks.loadtest import __doc__ as DESCRIPTION
+from benchmarks.loadtest.dataset import Dataset, seed
+from benchmarks.loadtest.plans import CommandCapture, capture_commands, explain_commands, print_plan_report
+from benchmarks.loadtest.report import build_report, commands_per_route, compare_reports, load_report, print_report, save_report
+from benchmarks.loadtest.runner import build_users, drive, in_process_client, scrape_metrics
+from benchmarks.loadtest.scenario import Scenario, parse_mix
+
+def add_seed_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--nutritionists", type=int, default=20)
+    parser.add_argument("--patients-per-nutritionist", type=int, default=25)
+    parser.add_argument("--weeks", type=int, default=26, help="weeks of progress reports per patient")
+    parser.add_argument("--meal-plans", type=int, default=4, help="weekly meal plans per patient")
+    parser.add_argument("--pending-nutritionists", type=int, default=5, help="unverified nutritionists for the admin queue")
+    parser.add_argument("--random-seed", type=int, default=42)
+
+async def seed_database(args) -> Dataset:
+    from app.core.database import db
+    started = time.perf_counter()
+    dataset = await seed(
+        db.db,
+        admins=args.admins,
+        nutritionists=args.nutritionists,
+        patients_per_nutritionist=args.patients_per_nutritionist,
+        weeks=args.weeks,
+        meal_plans_per_patient=args.meal_plans,
+        pending_nutritionists=args.pending_nutritionists,
+        random_seed=args.random_seed
+    )
+    print(f"Seeded {dataset.counts()} in {time.perf_counter() - started:.1f}s.")
+    return dataset
+
+async def seed_command(args):
+    from app.core.database import close_mongo_connection, connect_to_mongo, create_indexes
+    await connect_to_mongo()
+    try:
+        await create_indexes()
+        dataset = await seed_database(args)
+    finally:
+        await close_mongo_connection()
+    dataset.save(args.manifest)
+    print(f"Manifest written to {args.manifest}.")
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def load_run(client: httpx.AsyncClient, dataset: Dataset, args) -> dict:
+    users = build_users(dataset, token_hours=max(1.0, (args.warmup + args.duration) / 3600 + 1))
+    scenario = Scenario(users, parse_mix(args.mix), writes=not args.no_writes)
+    print(f"{args.concurrency} clients, {args.duration:g}s (after {args.warmup:g}s warmup), mix {args.mix}, "
+          f"{'with' if not args.no_writes else 'without'} writes, dataset {dataset.counts()}")
+
+    if args.warmup:
+        await drive(client, scenario, args.concurrency, args.warmup, random_seed=args.random_seed + 1, record=False)
+    metrics_before = await scrape_metrics(client)
+    samples, elapsed = await drive(client, scenario, args.concurrency, args.duration, args.requests, args.random_seed)
+    metrics_after = await scrape_metrics(client)
+
+    meta = {
+        "started_at": datetime.utcnow().isoformat(),
+        "git": git_revision(),
+        "target": args.target or ("in-process (mongomock)" if args.mongomock else "in-process"),
+        "dataset": dataset.counts(),
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "mix": args.mix,
+        "writes": not args.no_writes,
+        "cpus": os.cpu_count(),
+        "python": sys.version.split()[0],
+    }
+    return build_report(meta, samples, elapsed, commands_per_route(metrics_before, metrics_after))
+
+async def run_command(args):
+    if args.target:
+        if args.seed or args.mongomock:
+            raise SystemExit("--target drives a running server; seed it with the seed command instead")
+        dataset = Dataset.load(args.manifest)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=args.target.rstrip("/"), limits=limits, timeout=60) as client:
+            report = await load_run(client, dataset, args)
+    else:
+        async with in_process_client(args.mongomock) as client:
+            dataset = await seed_database(args) if args.seed or args.mongomock else Dataset.load(args.manifest)
+            report = await load_run(client, dataset, args)
+
+    print_report(report)
+    if args.output:
+        save_report(report, args.output)
+        print(f"Report written to {args.output}.")
+
+async def explain_command(args):
+    from app.core.database import db
+    from app.core.indexes import ensure_indexes, print_index_report
+
+    # Registered before the app's client exists so it sees every command
+    capture = CommandCapture()
+    monitoring.register(capture)
+    async with in_process_client(mongomock=False) as client:
+        dataset = await seed_database(args) if args.seed else Dataset.load(args.manifest)
+        # Plans are checked against the indexes this revision declares
+        print_index_report(await ensure_indexes(db.db))
+        failed_calls = await capture_commands(client, build_users(dataset, token_hours=1))
+        results = await explain_commands(db.client, capture.commands, args.max_ratio, args.min_examined)
+
+    print_plan_report(results, failed_calls)
+    if args.output:
+        meta = {"started_at": datetime.utcnow().isoformat(), "git": git_revision(), "dataset": dataset.counts()}
+        save_report({"meta": meta, "queries": results, "failed_calls": failed_calls}, args.output)
+        print(f"Report written to {args.output}.")
+    if failed_calls or any(result["problems"] for result in results):
+        sys.exit(1)
+
+def compare_command(args):
+    regressions = compare_reports(load_report(args.base), load_report(args.new), args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"{len(regressions)} regression(s):")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions.")
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="replace the load-test data in MONGODB_URL")
+    add_seed_arguments(seed_parser)
+    seed_parser.add_argument("--manifest", default="loadtest-dataset.json")
+
+    run_parser = commands.add_parser("run", help="drive the call mix and report latencies")
+    run_parser.add_argument("--target", help="base URL of a running server (default: the app in-process)")
+    run_parser.add_argument("--mongomock", action="store_true", help="seed and use an in-memory database (in-process only)")
+    run_parser.add_argument("--seed", action="store_true", help="seed MONGODB_URL first instead of reading --manifest")
+    add_seed_arguments(run_parser)
+    run_parser.add_argument("--manifest", default="loadtest-dataset.json")
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--duration", type=float, default=30)
+    run_parser.add_argument("--warmup", type=float, default=5)
+    run_parser.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    run_parser.add_argument("--mix", default="patient=70,nutritionist=25,admin=5")
+    run_parser.add_argument("--no-writes", action="store_true", help="leave out the update calls")
+    run_parser.add_argument("--output", help="save the report as JSON for compare")
+
+    compare_parser = commands.add_parser("compare", help="compare two saved reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="allowed slowdown in percent")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=2, help="ignore latency changes smaller than this")
+
+    explain_parser = commands.add_parser("explain", help="explain the covered endpoints' queries and check their plans")
+    explain_parser.add_argument("--seed", action="store_true", help="seed MONGODB_URL first instead of reading --manifest")
+    add_seed_arguments(explain_parser)
+    explain_parser.add_argument("--manifest", default="loadtest-dataset.json")
+    explain_parser.add_argument("--max-ratio", type=float, default=10, help="allowed docs examined per doc matched")
+    explain_parser.add_argument("--min-examined", type=int, default=50, help="ignore the ratio below this many docs examined")
+    explain_parser.add_argument("--output", help="save the plans as JSON")
+
+    args = parser.parse_args()
+    if args.command == "seed":
+        asyncio.run(seed_command(args))
+    elif args.command == "run":
+        asyncio.run(run_command(args))
+    elif args.command == "explain":
+        asyncio.run(explain_command(args))
+    else:
+        compare_command(args)
+
+if __name__ == "__main__":
+    main()
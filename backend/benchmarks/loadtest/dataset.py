@@ -0,0 +1,245 @@
+"""Synthetic dataset for load tests.
+
+Documents are written straight to the database in the shapes the API
+itself stores, which is far faster than signing up users through the API
+(bcrypt) and lets a run start from months of history. Every seeded user
+has an email under LOADTEST_DOMAIN, so a reseed removes exactly the data
+of the previous one and nothing else.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+import orjson
+from bson import ObjectId
+from app.core.security import get_password_hash
+from app.services.meal_plan_totals import compute_nutrition_totals
+from app.services.progress_rollups import rebuild_rollups
+
+LOADTEST_DOMAIN = "loadtest.invalid"
+LOADTEST_PASSWORD = "loadtest-password"
+BATCH_SIZE = 1000
+
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "snack")
+DIETARY_PREFS = ("veg", "non_veg", "vegan", "keto", "paleo")
+
+class Dataset:
+    """Ids of the seeded users and what belongs to them, saved as a manifest for runs."""
+
+    def __init__(self, admins=None, nutritionists=None, patients=None, meal_plans=None):
+        self.admins: List[str] = admins or []
+        self.nutritionists: Dict[str, List[str]] = nutritionists or {}  # nutritionist id -> patient ids
+        self.patients: Dict[str, str] = patients or {}  # patient id -> nutritionist id
+        self.meal_plans: Dict[str, List[str]] = meal_plans or {}  # nutritionist id -> meal plan ids
+
+    def counts(self) -> dict:
+        return {
+            "admins": len(self.admins),
+            "nutritionists": len(self.nutritionists),
+            "patients": len(self.patients),
+            "meal_plans": sum(len(plans) for plans in self.meal_plans.values()),
+        }
+
+    def save(self, path: str):
+        with open(path, "wb") as manifest:
+            manifest.write(orjson.dumps(self.__dict__, option=orjson.OPT_INDENT_2))
+
+    @classmethod
+    def load(cls, path: str) -> "Dataset":
+        with open(path, "rb") as manifest:
+            return cls(**orjson.loads(manifest.read()))
+
+async def _insert(collection, documents: List[dict]):
+    for start in range(0, len(documents), BATCH_SIZE):
+        await collection.insert_many(documents[start:start + BATCH_SIZE], ordered=False)
+
+async def clear_previous(database) -> int:
+    """Delete everything owned by previously seeded load-test users."""
+    user_ids = [user["_id"] async for user in database.users.find({"email": {"$regex": f"@{LOADTEST_DOMAIN}$"}}, {"_id": 1})]
+    if not user_ids:
+        return 0
+    owned = {"$in": user_ids}
+    await database.patient_profiles.delete_many({"user_id": owned})
+    await database.nutritionist_profiles.delete_many({"user_id": owned})
+    await database.subscriptions.delete_many({"user_id": owned})
+    await database.assignments.delete_many({"$or": [{"patient_id": owned}, {"nutritionist_id": owned}]})
+    await database.meal_plans.delete_many({"$or": [{"patient_id": owned}, {"nutritionist_id": owned}]})
+    await database.progress_reports.delete_many({"patient_id": owned})
+    await database.patient_progress_rollups.delete_many({"_id": owned})
+    await database.users.delete_many({"_id": owned})
+    return len(user_ids)
+
+def _user(email: str, role: str, password_hash: str, created_at: datetime) -> dict:
+    return {
+        "_id": ObjectId(),
+        "email": email,
+        "phone": "9000000000",
+        "role": role,
+        "password_hash": password_hash,
+        "status": "active",
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+def _meal_plan_days(rng: random.Random) -> List[dict]:
+    days = []
+    for day_of_week in range(7):
+        meals = [
+            {
+                "meal_type": meal_type,
+                "title": f"{meal_type.title()} {rng.randint(1, 40)}",
+                "calories": rng.randint(150, 700),
+                "protein_g": round(rng.uniform(5, 45), 1),
+                "carbs_g": round(rng.uniform(10, 90), 1),
+                "fat_g": round(rng.uniform(3, 35), 1),
+                "notes": None,
+            }
+            for meal_type in MEAL_TYPES
+        ]
+        days.append({"day_of_week": day_of_week, "meals": meals})
+    return days
+
+async def seed(
+    database,
+    admins: int = 2,
+    nutritionists: int = 20,
+    patients_per_nutritionist: int = 25,
+    weeks: int = 26,
+    meal_plans_per_patient: int = 4,
+    pending_nutritionists: int = 5,
+    random_seed: int = 42
+) -> Dataset:
+    """Replace the previous load-test data with a fresh synthetic dataset."""
+    rng = random.Random(random_seed)
+    await clear_previous(database)
+
+    now = datetime.utcnow()
+    this_week = datetime.combine((now - timedelta(days=now.weekday())).date(), datetime.min.time())
+    # One hash for every user; bcrypt per user would dominate seeding time
+    password_hash = get_password_hash(LOADTEST_PASSWORD)
+    dataset = Dataset()
+    users, patient_profiles, nutritionist_profiles, subscriptions = [], [], [], []
+    assignments, meal_plans, progress_reports = [], [], []
+
+    for index in range(admins):
+        admin = _user(f"loadtest-admin{index}@{LOADTEST_DOMAIN}", "admin", password_hash, now - timedelta(days=400))
+        users.append(admin)
+        dataset.admins.append(str(admin["_id"]))
+
+    for index in range(nutritionists + pending_nutritionists):
+        nutritionist = _user(f"loadtest-nutritionist{index}@{LOADTEST_DOMAIN}", "nutritionist", password_hash, now - timedelta(days=rng.randint(30, 400)))
+        users.append(nutritionist)
+        nutritionist_profiles.append({
+            "user_id": nutritionist["_id"],
+            "registration_no": f"LT-{index:05d}",
+            "qualifications": "MSc Nutrition",
+            "years_experience": rng.randint(1, 25),
+            "bio": "Synthetic nutritionist created for load testing.",
+            "rate_week_inr": float(rng.choice((999, 1499, 1999, 2499))),
+            # Pending nutritionists feed the admin verification queue
+            "verified": index < nutritionists,
+            "created_at": nutritionist["created_at"],
+            "updated_at": nutritionist["created_at"],
+        })
+        if index >= nutritionists:
+            continue
+        nutritionist_id = nutritionist["_id"]
+        dataset.nutritionists[str(nutritionist_id)] = []
+        dataset.meal_plans[str(nutritionist_id)] = []
+
+        for patient_index in range(patients_per_nutritionist):
+            joined = now - timedelta(weeks=weeks, days=rng.randint(0, 30))
+            patient = _user(f"loadtest-patient{index}-{patient_index}@{LOADTEST_DOMAIN}", "patient", password_hash, joined)
+            patient_id = patient["_id"]
+            users.append(patient)
+            dataset.nutritionists[str(nutritionist_id)].append(str(patient_id))
+            dataset.patients[str(patient_id)] = str(nutritionist_id)
+
+            start_weight = round(rng.uniform(60, 130), 1)
+            patient_profiles.append({
+                "user_id": patient_id,
+                "first_name": f"Patient{patient_index}",
+                "last_name": f"Cohort{index}",
+                "dob": datetime(rng.randint(1955, 2004), rng.randint(1, 12), rng.randint(1, 28)),
+                "height_cm": float(rng.randint(150, 195)),
+                "start_weight_kg": start_weight,
+                "gender": rng.choice(("male", "female", "other")),
+                "allergies": [],
+                "dietary_prefs": [rng.choice(DIETARY_PREFS)],
+                "medical_notes": None,
+                "created_at": joined,
+                "updated_at": joined,
+            })
+            assignments.append({
+                "patient_id": patient_id,
+                "nutritionist_id": nutritionist_id,
+                "start_date": joined,
+                "end_date": None,
+                "active": True,
+                "notes": None,
+                "created_at": joined,
+                "updated_at": joined,
+            })
+            subscriptions.append({
+                "user_id": patient_id,
+                "plan": rng.choice(("weekly", "monthly")),
+                "price_inr": float(rng.choice((999, 2999))),
+                "status": "active",
+                "current_period_start": now - timedelta(days=10),
+                "current_period_end": now + timedelta(days=20),
+                "gateway_customer_id": None,
+                "created_at": joined,
+                "updated_at": joined,
+            })
+
+            weight = start_weight
+            weekly_change = rng.uniform(-0.9, 0.2)
+            for week in range(weeks, 0, -1):
+                weight = round(max(40.0, weight + weekly_change + rng.uniform(-0.6, 0.6)), 1)
+                if rng.random() < 0.15:  # missed check-ins
+                    continue
+                week_start = this_week - timedelta(weeks=week)
+                created_at = week_start + timedelta(days=6)
+                progress_reports.append({
+                    "patient_id": patient_id,
+                    "week_start": week_start,
+                    "weight_kg": weight,
+                    "waist_cm": round(rng.uniform(70, 120), 1) if rng.random() < 0.7 else None,
+                    "photos": [],
+                    "adherence_pct": rng.randint(40, 100),
+                    "energy_levels": rng.randint(3, 10),
+                    "notes": None,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+
+            for week in range(meal_plans_per_patient):
+                week_start = this_week - timedelta(weeks=meal_plans_per_patient - 1 - week)
+                days = _meal_plan_days(rng)
+                plan = {
+                    "_id": ObjectId(),
+                    "patient_id": patient_id,
+                    "nutritionist_id": nutritionist_id,
+                    "week_start": week_start,
+                    "notes": None,
+                    # The latest plan is the patient's current one
+                    "status": "published" if week == meal_plans_per_patient - 1 else "archived",
+                    "days": days,
+                    "created_at": week_start - timedelta(days=2),
+                    "updated_at": week_start - timedelta(days=2),
+                }
+                plan.update(compute_nutrition_totals(days))
+                meal_plans.append(plan)
+                dataset.meal_plans[str(nutritionist_id)].append(str(plan["_id"]))
+
+    await _insert(database.users, users)
+    await _insert(database.patient_profiles, patient_profiles)
+    await _insert(database.nutritionist_profiles, nutritionist_profiles)
+    await _insert(database.subscriptions, subscriptions)
+    await _insert(database.assignments, assignments)
+    await _insert(database.meal_plans, meal_plans)
+    await _insert(database.progress_reports, progress_reports)
+    try:
+        await rebuild_rollups()
+    except Exception as exc:  # mongomock lacks some pipeline stages
+        print(f"Progress rollups not rebuilt ({exc}); rollup-backed routes will fall back or error.")
+    return dataset
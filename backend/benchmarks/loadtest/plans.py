@@ -0,0 +1,231 @@
+"""Query-plan checks: explain every read the covered endpoints send to MongoDB.
+
+The endpoints are called in-process against the seeded database while the
+driver's command events are captured; each find, aggregate, count and
+distinct is then re-run through ``explain`` at ``executionStats``
+verbosity. Commands are attributed to a call through context variables,
+so only what the call's own request issues is explained. A query fails when its winning plan scans a collection, sorts
+in memory because no index provides the order, or examines more than
+``max_ratio`` documents per document it matches.
+"""
+import contextvars
+import copy
+from typing import Dict, List, Optional, Tuple
+import httpx
+from bson import json_util
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.core.instrumentation import current_collector
+from benchmarks.loadtest.scenario import API, User
+
+READ_COMMANDS = ("find", "aggregate", "count", "distinct")
+
+# Fields the driver adds to every command; explain rejects some of them
+DRIVER_FIELDS = (
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber",
+    "readConcern", "writeConcern", "apiVersion", "apiStrict", "apiDeprecationErrors"
+)
+
+# Keys under which explain output nests child stages
+PLAN_CHILDREN = (
+    "inputStage", "inputStages", "queryPlan", "thenStage", "elseStage",
+    "outerStage", "innerStage", "shards", "winningPlan"
+)
+
+# (role, path) for every filter combination the covered handlers build.
+# {patient_id} and {nutritionist_id} are filled from the seeded dataset,
+# and paged lists are followed to their second page to explain the keyset query.
+PLAN_CALLS = [
+    ("admin", "/admin/users?limit=50"),
+    ("admin", "/admin/users?role=patient&limit=50"),
+    ("admin", "/admin/users?status=active&limit=50"),
+    ("admin", "/admin/users?role=nutritionist&status=active&limit=50"),
+    ("admin", "/assignments/?limit=20"),
+    ("admin", "/assignments/?active=true&limit=20"),
+    ("admin", "/assignments/?patient_id={patient_id}"),
+    ("admin", "/assignments/?patient_id={patient_id}&active=true"),
+    ("admin", "/assignments/?nutritionist_id={nutritionist_id}&limit=10"),
+    ("admin", "/assignments/?nutritionist_id={nutritionist_id}&active=true&limit=10"),
+    ("admin", "/assignments/?patient_id={patient_id}&nutritionist_id={nutritionist_id}&active=true"),
+    ("nutritionist", "/meal-plans/?limit=20"),
+    ("nutritionist", "/meal-plans/?patient_id={patient_id}&limit=2"),
+    ("nutritionist", "/nutritionists/analytics/overview"),
+    ("nutritionist", "/nutritionists/analytics/overview?unit=week"),
+    ("nutritionist", "/progress/nutritionist/analytics?time_period=month"),
+    ("nutritionist", "/progress/nutritionist/analytics?time_period=year"),
+    ("nutritionist", "/progress/nutritionist/trends?weeks=12"),
+]
+
+# Label of the call being captured; set around each request in capture_commands
+_call_label: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("plan_call_label", default=None)
+
+class CommandCapture(monitoring.CommandListener):
+    """Keep a copy of every read command a captured call's request sends.
+
+    Register it with ``pymongo.monitoring.register`` before the app's
+    client is created. The in-process client runs the request in the
+    calling task and Motor copies the context onto its executor threads,
+    so a command is recorded only when it carries both the call's label and
+    the request's QueryCollector. Snapshot refreshes, health pings and
+    other background work run outside any request and are left out.
+    """
+
+    def __init__(self):
+        self.commands: List[Tuple[str, str, dict]] = []
+
+    def started(self, event):
+        label = _call_label.get()
+        if label is None or current_collector() is None or event.command_name not in READ_COMMANDS:
+            return
+        command = {key: copy.deepcopy(value) for key, value in event.command.items() if key not in DRIVER_FIELDS}
+        self.commands.append((label, event.database_name, command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def plan_stages(plan) -> List[dict]:
+    """Every stage in a plan tree, root first."""
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in plan_stages(item)]
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan] if "stage" in plan else []
+    for key in PLAN_CHILDREN:
+        if key in plan:
+            stages.extend(plan_stages(plan[key]))
+    return stages
+
+def describe_plan(stages: List[dict]) -> str:
+    """Leaf-first summary such as ``IXSCAN role_1_created_at_-1__id_-1 > FETCH > LIMIT``."""
+    return " > ".join(
+        f"{stage['stage']} {stage['indexName']}" if "indexName" in stage else stage["stage"]
+        for stage in reversed(stages)
+    )
+
+def explain_sections(explain: dict) -> List[Tuple[dict, dict]]:
+    """(queryPlanner, executionStats) for each collection read in an explain result.
+
+    Finds and counts report at the top level. An aggregation does too when
+    its whole pipeline ran in the query layer, and otherwise reports in its
+    leading ``$cursor`` stage.
+    """
+    if "queryPlanner" in explain:
+        return [(explain["queryPlanner"], explain.get("executionStats", {}))]
+    sections = []
+    for stage in explain.get("stages", []):
+        cursor = stage.get("$cursor")
+        if isinstance(cursor, dict) and "queryPlanner" in cursor:
+            sections.append((cursor["queryPlanner"], cursor.get("executionStats", {})))
+    return sections
+
+def docs_matched(stats: dict) -> int:
+    """Documents that passed the query's filter, from the topmost fetch or scan."""
+    for stage in plan_stages(stats.get("executionStages", {})):
+        if stage["stage"] in ("FETCH", "COLLSCAN"):
+            return stage.get("nReturned", 0)
+    return stats.get("nReturned", 0)
+
+def check_explain(explain: dict, max_ratio: float, min_examined: int) -> dict:
+    """Summarize one explain result and list what makes it fail."""
+    result = {"plan": [], "keys_examined": 0, "docs_examined": 0, "docs_matched": 0, "problems": []}
+    ratio_checked = True
+    for planner, stats in explain_sections(explain):
+        stages = plan_stages(planner.get("winningPlan", {}))
+        names = {stage["stage"] for stage in stages}
+        result["plan"].append(describe_plan(stages))
+        if "COLLSCAN" in names:
+            result["problems"].append(f"COLLSCAN on {planner.get('namespace')}")
+        if "SORT" in names:
+            result["problems"].append("in-memory SORT")
+        # The slot-based engine only reports a pushed-down $group's output
+        # count, which says nothing about how selective the scan was
+        if "GROUP" in names:
+            ratio_checked = False
+        result["keys_examined"] += stats.get("totalKeysExamined", 0)
+        result["docs_examined"] += stats.get("totalDocsExamined", 0)
+        result["docs_matched"] += docs_matched(stats)
+
+    if not result["plan"]:
+        result["problems"].append("no query plan in explain output")
+    examined, matched = result["docs_examined"], result["docs_matched"]
+    if ratio_checked and examined >= min_examined and examined > max_ratio * max(matched, 1):
+        result["problems"].append(f"examined {examined} docs for {matched} matched (ratio > {max_ratio:g})")
+    result["plan"] = " | ".join(result["plan"])
+    return result
+
+def plan_targets(users: Dict[str, List[User]]) -> Tuple[Dict[str, User], Dict[str, str]]:
+    """The user per role and the ids substituted into PLAN_CALLS."""
+    nutritionist = users["nutritionist"][0]
+    targets = {"admin": users["admin"][0], "nutritionist": nutritionist}
+    ids = {"nutritionist_id": nutritionist.user_id, "patient_id": nutritionist.patients[0]}
+    return targets, ids
+
+async def capture_commands(client: httpx.AsyncClient, users: Dict[str, List[User]]) -> List[str]:
+    """Call every PLAN_CALLS path (and its second page) and return the calls that failed.
+
+    A ``CommandCapture`` registered beforehand records what each call reads.
+    """
+    targets, ids = plan_targets(users)
+    failed_calls = []
+    for role, path in PLAN_CALLS:
+        headers = {"Authorization": f"Bearer {targets[role].token}"}
+        url = API + path.format(**ids)
+        for label in (f"GET {url}", f"GET {url} (page 2)"):
+            token = _call_label.set(label)
+            try:
+                response = await client.get(url, headers=headers)
+            finally:
+                _call_label.reset(token)
+            if response.status_code != 200:
+                failed_calls.append(f"{label}: HTTP {response.status_code}")
+                break
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+            url = f"{url}{'&' if '?' in url else '?'}cursor={cursor}"
+    return failed_calls
+
+async def explain_commands(
+    mongo_client,
+    commands: List[Tuple[str, str, dict]],
+    max_ratio: float,
+    min_examined: int
+) -> List[dict]:
+    """Explain each distinct captured command and check its plan."""
+    results = []
+    seen = set()
+    for label, database_name, command in commands:
+        key = (database_name, json_util.dumps(command))
+        if key in seen:
+            continue
+        seen.add(key)
+        command_name = next(iter(command))
+        result = {"call": label, "collection": command[command_name], "command": command_name, "query": key[1]}
+        try:
+            explain = await mongo_client[database_name].command(
+                {"explain": command, "verbosity": "executionStats"}
+            )
+        except PyMongoError as e:
+            result.update(plan="", keys_examined=0, docs_examined=0, docs_matched=0, problems=[f"explain failed: {e}"])
+        else:
+            result.update(check_explain(explain, max_ratio, min_examined))
+        results.append(result)
+    return results
+
+def print_plan_report(results: List[dict], failed_calls: List[str]):
+    for result in results:
+        verdict = "FAIL" if result["problems"] else "ok"
+        print(f"{verdict:<4} {result['call']}")
+        print(f"     {result['command']} {result['collection']}: {result['plan']}")
+        print(f"     keys examined {result['keys_examined']}, docs examined {result['docs_examined']}, "
+              f"docs matched {result['docs_matched']}")
+        for problem in result["problems"]:
+            print(f"     - {problem}")
+    for call in failed_calls:
+        print(f"FAIL {call}")
+    failures = sum(1 for result in results if result["problems"])
+    print(f"{len(results)} queries explained, {failures} failing, {len(failed_calls)} failed calls.")
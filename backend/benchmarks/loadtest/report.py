@@ -0,0 +1,153 @@
+"""Latency percentiles, throughput and query counts per route, and run comparison."""
+import re
+import statistics
+from typing import Dict, List, Optional, Tuple
+import orjson
+
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99, mean and max in milliseconds."""
+    if not latencies:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+    return {
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+def parse_metrics(text: str) -> Dict[str, Dict[Tuple[Tuple[str, str], ...], float]]:
+    """Prometheus text format -> metric name -> labels -> value."""
+    samples: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+    for line in text.splitlines():
+        match = SAMPLE_LINE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        key = tuple(sorted(LABEL.findall(labels or "")))
+        samples.setdefault(name, {})[key] = float(value)
+    return samples
+
+def commands_per_route(before: str, after: str) -> Dict[str, Optional[float]]:
+    """Mongo commands per request for every route template, from two /metrics scrapes.
+
+    The server counts commands per route template (all methods together),
+    so a route's figure covers its GETs and PUTs alike.
+    """
+    before_samples, after_samples = parse_metrics(before), parse_metrics(after)
+
+    def by_route(samples, name):
+        totals: Dict[str, float] = {}
+        for labels, value in samples.get(name, {}).items():
+            route = dict(labels).get("route")
+            if route is not None:
+                totals[route] = totals.get(route, 0.0) + value
+        return totals
+
+    requests_before, requests_after = by_route(before_samples, "http_requests_total"), by_route(after_samples, "http_requests_total")
+    commands_before, commands_after = by_route(before_samples, "db_commands_total"), by_route(after_samples, "db_commands_total")
+    result = {}
+    for route, count in requests_after.items():
+        requests = count - requests_before.get(route, 0.0)
+        if requests > 0:
+            commands = commands_after.get(route, 0.0) - commands_before.get(route, 0.0)
+            result[route] = round(commands / requests, 2)
+    return result
+
+def build_report(meta: dict, samples: Dict[str, dict], elapsed: float, commands: Dict[str, Optional[float]]) -> dict:
+    """Summarize raw samples (per call: latencies, errors, statuses) into the saved report."""
+    routes = {}
+    all_latencies = []
+    for name in sorted(samples):
+        sample = samples[name]
+        all_latencies.extend(sample["latencies"])
+        route = name.split(" ", 1)[1]
+        routes[name] = {
+            "requests": len(sample["latencies"]),
+            "errors": sample["errors"],
+            "statuses": {str(code): count for code, count in sorted(sample["statuses"].items())},
+            "rps": round(len(sample["latencies"]) / elapsed, 2),
+            **percentiles(sample["latencies"]),
+            "db_commands_per_request": commands.get(route),
+        }
+    errors = sum(route["errors"] for route in routes.values())
+    return {
+        "meta": meta,
+        "totals": {
+            "requests": len(all_latencies),
+            "errors": errors,
+            "error_rate": round(errors / len(all_latencies), 4) if all_latencies else 0.0,
+            "duration_s": round(elapsed, 2),
+            "rps": round(len(all_latencies) / elapsed, 2) if elapsed else 0.0,
+            **percentiles(all_latencies),
+        },
+        "routes": routes,
+    }
+
+def print_report(report: dict):
+    totals = report["totals"]
+    print(f"{'route':<62} {'reqs':>6} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'db/req':>7}")
+    for name, route in report["routes"].items():
+        commands = route["db_commands_per_request"]
+        print(f"{name:<62} {route['requests']:>6} {route['errors']:>4} {route['rps']:>8.1f} {route['p50_ms']:>8.2f} "
+              f"{route['p95_ms']:>8.2f} {route['p99_ms']:>8.2f} {'-' if commands is None else f'{commands:.2f}':>7}")
+    print(f"{'total':<62} {totals['requests']:>6} {totals['errors']:>4} {totals['rps']:>8.1f} {totals['p50_ms']:>8.2f} "
+          f"{totals['p95_ms']:>8.2f} {totals['p99_ms']:>8.2f}")
+    print("(latencies in ms; db/req is Mongo commands per request for the route template)")
+
+def save_report(report: dict, path: str):
+    with open(path, "wb") as output:
+        output.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+
+def load_report(path: str) -> dict:
+    with open(path, "rb") as report:
+        return orjson.loads(report.read())
+
+def _change(base: float, new: float) -> str:
+    if not base:
+        return "   new" if new else "     -"
+    return f"{(new - base) / base * 100:+5.0f}%"
+
+def compare_reports(base: dict, new: dict, threshold_pct: float = 10, min_delta_ms: float = 2) -> List[str]:
+    """Print both runs side by side and return the regressions found.
+
+    A route regresses when its p95 or p99 grows by more than threshold_pct
+    and min_delta_ms, when it issues more Mongo commands per request (by
+    threshold_pct and at least half a command), or when its error rate
+    rises by more than a percentage point. Total throughput dropping by
+    more than threshold_pct is a regression too.
+    """
+    regressions = []
+    print(f"{'route':<62} {'p95 base':>9} {'p95 new':>9} {'':>6} {'p99 base':>9} {'p99 new':>9} {'':>6} {'db/req':>11}")
+    for name in sorted(set(base["routes"]) | set(new["routes"])):
+        old, current = base["routes"].get(name), new["routes"].get(name)
+        if old is None or current is None:
+            print(f"{name:<62} only in {'new' if old is None else 'base'} run")
+            continue
+        old_commands, new_commands = old["db_commands_per_request"], current["db_commands_per_request"]
+        commands = "-" if old_commands is None or new_commands is None else f"{old_commands:.1f}->{new_commands:.1f}"
+        print(f"{name:<62} {old['p95_ms']:>9.2f} {current['p95_ms']:>9.2f} {_change(old['p95_ms'], current['p95_ms'])} "
+              f"{old['p99_ms']:>9.2f} {current['p99_ms']:>9.2f} {_change(old['p99_ms'], current['p99_ms'])} {commands:>11}")
+
+        for key in ("p95_ms", "p99_ms"):
+            delta = current[key] - old[key]
+            if delta > min_delta_ms and delta > old[key] * threshold_pct / 100:
+                regressions.append(f"{name}: {key[:3]} {old[key]:.2f} -> {current[key]:.2f} ms")
+        if old_commands is not None and new_commands is not None:
+            delta = new_commands - old_commands
+            if delta >= 0.5 and delta > old_commands * threshold_pct / 100:
+                regressions.append(f"{name}: Mongo commands per request {old_commands:.2f} -> {new_commands:.2f}")
+        old_rate = old["errors"] / old["requests"] if old["requests"] else 0.0
+        new_rate = current["errors"] / current["requests"] if current["requests"] else 0.0
+        if new_rate - old_rate > 0.01:
+            regressions.append(f"{name}: error rate {old_rate:.1%} -> {new_rate:.1%}")
+
+    old_rps, new_rps = base["totals"]["rps"], new["totals"]["rps"]
+    print(f"{'throughput':<62} {old_rps:>9.1f} {new_rps:>9.1f} {_change(old_rps, new_rps)} req/s")
+    if old_rps and (old_rps - new_rps) / old_rps * 100 > threshold_pct:
+        regressions.append(f"throughput {old_rps:.1f} -> {new_rps:.1f} req/s")
+    return regressions
@@ -0,0 +1,109 @@
+"""Concurrent virtual clients driving the call mix against the API."""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+import httpx
+from app.core.security import create_access_token
+from benchmarks.loadtest.dataset import Dataset
+from benchmarks.loadtest.scenario import Scenario, User
+
+def build_users(dataset: Dataset, token_hours: float) -> Dict[str, List[User]]:
+    """Virtual identities for every seeded user, with tokens minted locally.
+
+    Logging in would cost a bcrypt verification per user on the server, so
+    tokens are signed here instead; a remote server must share SECRET_KEY.
+    """
+    expires = timedelta(hours=token_hours)
+
+    def token(user_id: str, role: str) -> str:
+        return create_access_token({"sub": user_id, "role": role}, expires_delta=expires)
+
+    return {
+        "admin": [User(user_id, "admin", token(user_id, "admin")) for user_id in dataset.admins],
+        "nutritionist": [
+            User(user_id, "nutritionist", token(user_id, "nutritionist"), patients, dataset.meal_plans.get(user_id, []))
+            for user_id, patients in dataset.nutritionists.items() if patients
+        ],
+        "patient": [User(user_id, "patient", token(user_id, "patient")) for user_id in dataset.patients],
+    }
+
+@asynccontextmanager
+async def in_process_client(mongomock: bool):
+    """An httpx client calling the app in this process, with its database set up."""
+    import main
+    from app.core.database import db
+    from app.core.health import startup_tasks
+    from app.core.indexes import ensure_indexes
+
+    # Record server errors as 500s instead of aborting the run
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    if mongomock:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--mongomock needs the mongomock-motor package (pip install mongomock-motor)")
+        db.client = AsyncMongoMockClient()
+        db.db = db.client.nutritionist_db
+        await ensure_indexes(db.db)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            yield client
+        return
+
+    async with main.app.router.lifespan_context(main.app):
+        while not startup_tasks.complete:
+            await asyncio.sleep(0.2)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            yield client
+
+async def scrape_metrics(client: httpx.AsyncClient) -> str:
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return ""
+    return response.text if response.status_code == 200 else ""
+
+async def drive(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    concurrency: int,
+    duration: float,
+    max_requests: Optional[int] = None,
+    random_seed: int = 42,
+    record: bool = True
+) -> Tuple[Dict[str, dict], float]:
+    """Keep ``concurrency`` requests in flight until the time or request budget runs out."""
+    samples: Dict[str, dict] = {}
+    issued = 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(index: int):
+        nonlocal issued
+        rng = random.Random(random_seed * 1000 + index)
+        while time.monotonic() < deadline and (max_requests is None or issued < max_requests):
+            issued += 1
+            user, call = scenario.next(rng)
+            method, path, body = call.build(rng, user)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers={"Authorization": f"Bearer {user.token}"})
+                await response.aread()
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = 0
+            latency = time.perf_counter() - started
+            if not record:
+                continue
+            sample = samples.get(call.name)
+            if sample is None:
+                sample = samples[call.name] = {"latencies": [], "errors": 0, "statuses": {}}
+            sample["latencies"].append(latency)
+            sample["statuses"][status_code] = sample["statuses"].get(status_code, 0) + 1
+            if status_code == 0 or status_code >= 400:
+                sample["errors"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(index) for index in range(concurrency)))
+    return samples, time.perf_counter() - started
@@ -0,0 +1,121 @@
+"""The call mix: what each kind of user does, mirroring frontend/src/services/api.ts.
+
+Each call is named after the route template it hits, so results line up
+with the server's per-route metrics. Weights are relative within a role.
+Writes are updates of existing documents, so a run never fails on unique
+indexes and can be repeated against the same dataset.
+"""
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+API = "/api/v1"
+
+# (method, path, JSON body or None)
+Request = Tuple[str, str, Optional[dict]]
+
+class Call:
+    def __init__(self, name: str, weight: float, build: Callable[[random.Random, "User"], Request], write: bool = False):
+        self.name = name
+        self.weight = weight
+        self.build = build
+        self.write = write
+
+class User:
+    """A seeded user the virtual clients act as."""
+
+    def __init__(self, user_id: str, role: str, token: str, patients: List[str] = (), meal_plans: List[str] = ()):
+        self.user_id = user_id
+        self.role = role
+        self.token = token
+        self.patients = list(patients)
+        self.meal_plans = list(meal_plans)
+
+def get(path: str) -> Callable[[random.Random, User], Request]:
+    return lambda rng, user: ("GET", API + path, None)
+
+def patient_of(path: str) -> Callable[[random.Random, User], Request]:
+    return lambda rng, user: ("GET", API + path.format(patient_id=rng.choice(user.patients)), None)
+
+def meal_plan_of(path: str) -> Callable[[random.Random, User], Request]:
+    return lambda rng, user: ("GET", API + path.format(meal_plan_id=rng.choice(user.meal_plans)), None)
+
+PATIENT_CALLS = [
+    Call("GET /api/v1/auth/me", 5, get("/auth/me")),
+    Call("GET /api/v1/patients/profile", 10, get("/patients/profile")),
+    Call("GET /api/v1/patients/current-plan", 12, get("/patients/current-plan")),
+    Call("GET /api/v1/patients/progress", 6, get("/patients/progress?limit=10&skip=0")),
+    Call("GET /api/v1/subscriptions/current", 3, get("/subscriptions/current")),
+    Call("GET /api/v1/subscriptions/", 1, get("/subscriptions/?limit=10&skip=0")),
+    Call("PUT /api/v1/patients/profile", 1, lambda rng, user: (
+        "PUT", API + "/patients/profile", {"height_cm": float(rng.randint(150, 195))}
+    ), write=True),
+    Call("PUT /api/v1/users/me", 0.5, lambda rng, user: (
+        "PUT", API + "/users/me", {"phone": f"9{rng.randint(0, 999999999):09d}"}
+    ), write=True),
+]
+
+NUTRITIONIST_CALLS = [
+    Call("GET /api/v1/auth/me", 3, get("/auth/me")),
+    Call("GET /api/v1/nutritionists/profile", 3, get("/nutritionists/profile")),
+    Call("GET /api/v1/nutritionists/dashboard/stats", 8, get("/nutritionists/dashboard/stats")),
+    Call("GET /api/v1/nutritionists/patients", 8, get("/nutritionists/patients?limit=20&skip=0")),
+    Call("GET /api/v1/nutritionists/patients/{patient_id}/progress", 5,
+         patient_of("/nutritionists/patients/{patient_id}/progress?limit=10&skip=0")),
+    Call("GET /api/v1/nutritionists/meal-plans", 5, get("/nutritionists/meal-plans?limit=20&skip=0")),
+    Call("GET /api/v1/nutritionists/progress/summary", 3, get("/nutritionists/progress/summary")),
+    Call("GET /api/v1/nutritionists/analytics/overview", 2, get("/nutritionists/analytics/overview")),
+    Call("GET /api/v1/meal-plans/{meal_plan_id}", 5, meal_plan_of("/meal-plans/{meal_plan_id}")),
+    Call("GET /api/v1/meal-plans/", 3, patient_of("/meal-plans/?patient_id={patient_id}&limit=20&skip=0")),
+    Call("GET /api/v1/progress/", 3, patient_of("/progress/?patient_id={patient_id}&limit=10&skip=0")),
+    Call("GET /api/v1/progress/summary/{patient_id}", 3, patient_of("/progress/summary/{patient_id}")),
+    Call("GET /api/v1/progress/nutritionist/overview", 3, get("/progress/nutritionist/overview?limit=20&skip=0")),
+    Call("GET /api/v1/progress/nutritionist/analytics", 2, get("/progress/nutritionist/analytics?time_period=month")),
+    Call("PUT /api/v1/meal-plans/{meal_plan_id}", 1, lambda rng, user: (
+        "PUT", API + f"/meal-plans/{rng.choice(user.meal_plans)}", {"notes": f"Load test note {rng.randint(0, 9999)}"}
+    ), write=True),
+    Call("PUT /api/v1/nutritionists/profile", 0.5, lambda rng, user: (
+        "PUT", API + "/nutritionists/profile", {"years_experience": rng.randint(1, 25)}
+    ), write=True),
+]
+
+ADMIN_CALLS = [
+    Call("GET /api/v1/auth/me", 1, get("/auth/me")),
+    Call("GET /api/v1/admin/users", 3, lambda rng, user: (
+        "GET", API + f"/admin/users?role={rng.choice(('patient', 'nutritionist'))}&limit=50&skip=0", None
+    )),
+    Call("GET /api/v1/admin/metrics", 2, get("/admin/metrics")),
+    Call("GET /api/v1/admin/nutritionists/pending", 2, get("/admin/nutritionists/pending?limit=20&skip=0")),
+    Call("GET /api/v1/assignments/", 1, get("/assignments/?limit=20&skip=0")),
+]
+
+CALLS: Dict[str, List[Call]] = {
+    "patient": PATIENT_CALLS,
+    "nutritionist": NUTRITIONIST_CALLS,
+    "admin": ADMIN_CALLS,
+}
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "patient=70,nutritionist=25,admin=5" into role weights."""
+    weights = {}
+    for part in mix.split(","):
+        role, _, weight = part.partition("=")
+        role = role.strip()
+        if role not in CALLS:
+            raise ValueError(f"unknown role {role!r} in --mix (expected {', '.join(CALLS)})")
+        weights[role] = float(weight)
+    return weights
+
+class Scenario:
+    """Picks the next (user, call) the way the traffic mix says."""
+
+    def __init__(self, users: Dict[str, List[User]], mix: Dict[str, float], writes: bool = True):
+        self.roles = [role for role in mix if users.get(role) and mix[role] > 0]
+        self.role_weights = [mix[role] for role in self.roles]
+        self.users = users
+        self.calls = {role: [call for call in CALLS[role] if writes or not call.write] for role in self.roles}
+        self.call_weights = {role: [call.weight for call in calls] for role, calls in self.calls.items()}
+
+    def next(self, rng: random.Random) -> Tuple[User, Call]:
+        role = rng.choices(self.roles, self.role_weights)[0]
+        call = rng.choices(self.calls[role], self.call_weights[role])[0]
+        return rng.choice(self.users[role]), call
@@ -1,18 +1,67 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.cache import shared_cache
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.database import connect_to_mongo, close_mongo_connection, create_indexes, check_indexes
+from app.core.hashing import password_hasher
+from app.core.health import readiness_report, startup_tasks
+from app.core.instrumentation import QueryInstrumentationMiddleware
+from app.core.metrics import MetricsMiddleware, render_latest, worker_file_writer
+from app.services.platform_metrics import platform_metrics
+from app.services.progress_rollups import backfill_rollups
+from app.api.profiling import ProfilerMiddleware
 from app.api.v1.api import api_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open per-worker resources on startup and release them on shutdown."""
+    await connect_to_mongo()
+    password_hasher.start()
+    platform_metrics.start()
+    worker_file_writer.start()
+    # Index builds and warmup run in the background; /health/ready waits for them
+    if settings.CREATE_INDEXES_ON_STARTUP:
+        startup_steps = [("indexes", create_indexes, True)]
+    else:
+        startup_steps = [("indexes", check_indexes, False)]
+    startup_steps.append(("progress_rollups", backfill_rollups, True))
+    startup_steps.append(("platform_metrics", platform_metrics.get, False))
+    startup_tasks.start(startup_steps)
+    yield
+    await startup_tasks.stop()
+    await worker_file_writer.stop()
+    await platform_metrics.stop()
+    password_hasher.shutdown()
+    await shared_cache.close()
+    await close_mongo_connection()
+
 app = FastAPI(
     title=settings.APP_NAME,
     version="1.0.0",
     description="A comprehensive nutritionist platform API",
     openapi_url="/openapi.json",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+# Per-request Mongo command stats (added first so CORS stays outermost)
+app.add_middleware(QueryInstrumentationMiddleware)
+
+# Opt-in profiling of flagged admin requests
+if settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+
+# gzip/brotli for large JSON bodies such as full meal plans
+app.add_middleware(CompressionMiddleware)
+
+# Prometheus request metrics (timing includes compression)
+app.add_middleware(MetricsMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -20,17 +69,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "X-DB-Queries", "X-DB-Time-Ms", "X-DB-Docs", "X-DB-Slowest", "X-Profile", "X-Profile-Id"],
 )
 
-# Database connection events
-@app.on_event("startup")
-async def startup_db_client():
-    await connect_to_mongo()
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    await close_mongo_connection()
-
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
@@ -42,6 +83,22 @@ async def root():
 async def health_check():
     return {"status": "healthy", "message": "API is running"}
 
+@app.get("/health/live")
+async def liveness():
+    """The worker's event loop is responding; says nothing about MongoDB."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """503 while startup steps are running or MongoDB does not answer a ping."""
+    report = await readiness_report()
+    status_code = 200 if report["status"] == "ready" else 503
+    return ORJSONResponse(report, status_code=status_code, headers={"Cache-Control": "no-store"})
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
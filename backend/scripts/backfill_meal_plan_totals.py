@@ -0,0 +1,35 @@
+"""Store nutrition totals on meal plans written before totals existed.
+
+Run from the backend directory:
+
+    python -m scripts.backfill_meal_plan_totals
+"""
+import asyncio
+from pymongo import UpdateOne
+from app.core.database import connect_to_mongo, close_mongo_connection, get_collection
+from app.services.meal_plan_totals import compute_nutrition_totals
+
+BATCH_SIZE = 500
+
+async def main():
+    await connect_to_mongo()
+    try:
+        meal_plans_collection = get_collection("meal_plans")
+        cursor = meal_plans_collection.find({"totals": {"$exists": False}}, {"days": 1})
+        
+        updated = 0
+        batch = []
+        async for plan in cursor:
+            batch.append(UpdateOne({"_id": plan["_id"]}, {"$set": compute_nutrition_totals(plan.get("days", []))}))
+            if len(batch) >= BATCH_SIZE:
+                updated += (await meal_plans_collection.bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            updated += (await meal_plans_collection.bulk_write(batch, ordered=False)).modified_count
+        
+        print(f"Backfilled nutrition totals on {updated} meal plans.")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
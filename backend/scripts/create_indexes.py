@@ -0,0 +1,22 @@
+"""Create every MongoDB index in the registry and report build times.
+
+Run from the backend directory:
+
+    python -m scripts.create_indexes
+"""
+import asyncio
+from app.core.database import connect_to_mongo, close_mongo_connection, db
+from app.core.indexes import ensure_indexes, print_index_report
+
+async def main() -> int:
+    await connect_to_mongo()
+    try:
+        results = await ensure_indexes(db.db)
+    finally:
+        await close_mongo_connection()
+    
+    print_index_report(results, verbose=True)
+    return 1 if any(result["status"] == "failed" for result in results) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
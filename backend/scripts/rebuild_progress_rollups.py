@@ -0,0 +1,22 @@
+"""Backfill patient_progress_rollups from the full progress report history.
+
+Run from the backend directory:
+
+    python -m scripts.rebuild_progress_rollups
+"""
+import asyncio
+import time
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.services.progress_rollups import rebuild_rollups
+
+async def main():
+    await connect_to_mongo()
+    try:
+        started = time.perf_counter()
+        count = await rebuild_rollups()
+        print(f"Rebuilt {count} patient rollups in {time.perf_counter() - started:.2f}s.")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
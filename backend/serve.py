@@ -0,0 +1,108 @@
+"""Production entry point: run the API under uvicorn with several worker processes.
+
+Run from the backend directory:
+
+    python serve.py --workers 4
+
+Without --workers, WEB_CONCURRENCY is used, and when that is 0 one worker
+is started per available core (CPU affinity and any cgroup CPU quota are
+taken into account, so containers get the cores they are actually allowed).
+Each worker imports the app itself and opens its own MongoDB client in the
+app's lifespan. Nothing holding sockets or threads is created before the
+workers start. With several workers, /metrics totals are shared through
+METRICS_MULTIPROCESS_DIR (a fresh temporary directory when unset). For
+development keep using ``uvicorn main:app --reload``.
+"""
+import argparse
+import glob
+import math
+import os
+import shutil
+import tempfile
+import uvicorn
+from app.core.config import settings
+
+def _cgroup_cpu_limit():
+    """CPU quota from cgroup v2 ``cpu.max`` or v1 ``cfs_quota_us``, if one is set."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as quota_file, \
+                open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as period_file:
+            quota, period = int(quota_file.read()), int(period_file.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+def available_cpus() -> int:
+    """Cores this process may use, rounded up to at least one."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS or Windows
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+def worker_count(requested: int = 0) -> int:
+    """Workers to start: the requested count, else WEB_CONCURRENCY, else one per core."""
+    return requested or settings.WEB_CONCURRENCY or available_cpus()
+
+def prepare_metrics_dir(workers: int):
+    """Give the workers an empty shared metrics directory so /metrics reports totals.
+
+    Returns the directory if a temporary one was created for this run.
+    """
+    directory = settings.METRICS_MULTIPROCESS_DIR
+    created = None
+    if not directory:
+        if workers == 1:
+            return None
+        directory = created = tempfile.mkdtemp(prefix="nutri-metrics-")
+        # Workers read their settings from the environment they inherit
+        os.environ["METRICS_MULTIPROCESS_DIR"] = directory
+    os.makedirs(directory, exist_ok=True)
+    # Counts left by a previous run would otherwise be added to this one
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        os.remove(path)
+    return created
+
+def main(args):
+    workers = worker_count(args.workers)
+    metrics_dir = prepare_metrics_dir(workers)
+    print(f"Starting {workers} worker(s) on {args.host}:{args.port}.")
+    if workers > 1 and settings.CACHE_BACKEND == "memory":
+        print(
+            "Warning: CACHE_BACKEND=memory keeps caches per worker, so invalidations "
+            "(e.g. a suspended user's cached principal) only reach one worker; use CACHE_BACKEND=redis."
+        )
+    try:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            lifespan="on",
+            proxy_headers=True,
+            timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+            access_log=args.access_log
+        )
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: WEB_CONCURRENCY or one per core)")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--access-log", action="store_true", help="log every request (off by default for throughput)")
+    main(parser.parse_args())
@@ -0,0 +1,121 @@
+import itertools
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+import main
+from app.core.database import db
+from app.core.instrumentation import current_collector, route_query_stats
+from app.core.security import create_access_token
+
+# mongomock sends no pymongo command events, so these collection methods
+# report to the request's QueryCollector themselves, one command per call.
+COUNTED_METHODS = (
+    "find", "find_one", "aggregate", "count_documents", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "find_one_and_update", "bulk_write"
+)
+
+_request_ids = itertools.count(1)
+
+class MockCommandEvent:
+    """Just enough of a CommandStartedEvent for QueryCollector."""
+
+    def __init__(self, command_name: str, collection_name: str):
+        self.command_name = command_name
+        self.command = {command_name: collection_name}
+        self.request_id = next(_request_ids)
+
+def _counted(method_name: str, method):
+    def wrapper(self, *args, **kwargs):
+        collector = current_collector()
+        if collector is not None:
+            event = MockCommandEvent(method_name, self.name)
+            collector.command_started(event)
+            collector.command_finished(event.request_id, 0, 0)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+@pytest.fixture
+def database(monkeypatch):
+    """An empty in-memory database behind the app, with commands counted per request."""
+    for method_name in COUNTED_METHODS:
+        monkeypatch.setattr(
+            AsyncMongoMockCollection, method_name,
+            _counted(method_name, getattr(AsyncMongoMockCollection, method_name))
+        )
+    monkeypatch.setattr(db, "client", AsyncMongoMockClient())
+    monkeypatch.setattr(db, "db", db.client.nutritionist_db)
+    return db.db
+
+@pytest.fixture
+async def client(database):
+    """An HTTP client calling the app in-process (the lifespan is not run)."""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+def auth_headers(user: dict) -> dict:
+    token = create_access_token({"sub": str(user["_id"]), "role": user["role"]})
+    return {"Authorization": f"Bearer {token}"}
+
+async def commands_issued(client: httpx.AsyncClient, url: str, headers: dict) -> int:
+    """Mongo commands the app issued to answer one GET."""
+    def total():
+        return sum(stats["commands"] for stats in route_query_stats.values())
+    before = total()
+    response = await client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return total() - before
+
+async def create_user(database, role: str, **fields) -> dict:
+    now = datetime.utcnow()
+    user = {
+        "_id": ObjectId(),
+        "email": f"{role}-{ObjectId()}@example.com",
+        "phone": "5550000000",
+        "role": role,
+        "status": "active",
+        "password_hash": "not-used",
+        "created_at": now,
+        "updated_at": now,
+        **fields,
+    }
+    await database.users.insert_one(user)
+    return user
+
+async def create_roster(database, patients: int, reports_per_patient: int = 3) -> dict:
+    """A nutritionist with ``patients`` assigned patients, each with profile, reports and rollup."""
+    nutritionist = await create_user(database, "nutritionist")
+    now = datetime.utcnow()
+    for index in range(patients):
+        patient = await create_user(database, "patient")
+        await database.patient_profiles.insert_one({
+            "user_id": patient["_id"],
+            "first_name": "Patient",
+            "last_name": str(index),
+            "start_weight_kg": 90.0,
+            "created_at": now,
+        })
+        await database.assignments.insert_one({
+            "nutritionist_id": nutritionist["_id"],
+            "patient_id": patient["_id"],
+            "active": True,
+            "start_date": now,
+            "created_at": now,
+        })
+        weeks = [now - timedelta(weeks=week) for week in range(reports_per_patient)]
+        await database.progress_reports.insert_many([
+            {"patient_id": patient["_id"], "week_start": week, "weight_kg": 90.0 - index, "adherence_pct": 80, "created_at": week}
+            for week in weeks
+        ])
+        await database.patient_progress_rollups.insert_one({
+            "_id": patient["_id"],
+            "report_count": reports_per_patient,
+            "weight_sum": (90.0 - index) * reports_per_patient,
+            "adherence_sum": 80 * reports_per_patient,
+            "latest_report_at": weeks[0],
+            "latest_week_start": weeks[0],
+        })
+    return nutritionist
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from app.core.cache import MemoryBackend, RedisBackend, SharedCache
+
+@pytest.fixture
+def server():
+    return FakeServer()
+
+def redis_cache(server: FakeServer, **options) -> SharedCache:
+    """A worker's cache over a Redis server shared with every other worker."""
+    return SharedCache(RedisBackend(FakeRedis(server=server), prefix="test:"), **options)
+
+async def server_keys(server: FakeServer, pattern: str):
+    return await FakeRedis(server=server).keys(pattern)
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request, server):
+    if request.param == "memory":
+        return SharedCache(MemoryBackend())
+    return redis_cache(server)
+
+async def test_get_set_and_ttl(cache):
+    assert await cache.get("missing") is None
+
+    await cache.set("key", b"value", ttl=0.05)
+    assert await cache.get("key") == b"value"
+
+    await asyncio.sleep(0.1)
+    assert await cache.get("key") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+async def test_ttl_is_capped(server):
+    cache = redis_cache(server, max_ttl=60)
+    await cache.set("key", b"value", ttl=3600)
+    ttl_ms = await cache.backend.client.pttl("test:key")
+    assert 0 < ttl_ms <= 60_000
+
+async def test_invalidate_drops_every_entry_under_a_tag(cache):
+    await cache.set("a", b"1", tags=("patient:1",))
+    await cache.set("b", b"2", tags=("patient:1", "nutritionist:9"))
+    await cache.set("c", b"3", tags=("patient:2",))
+
+    await cache.invalidate("patient:1")
+
+    assert await cache.get("a") is None
+    assert await cache.get("b") is None
+    assert await cache.get("c") == b"3"
+    assert cache.invalidated == 2
+
+async def test_invalidation_reaches_other_workers(server):
+    first, second = redis_cache(server), redis_cache(server)
+    await first.set("key", b"value", tags=("tag",))
+    assert await second.get("key") == b"value"
+
+    await second.invalidate("tag")
+
+    assert await first.get("key") is None
+
+async def test_fill_lock_lets_one_worker_compute(server):
+    workers = [redis_cache(server, lock_wait=2, poll_interval=0.01) for _ in range(3)]
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        await asyncio.sleep(0.05)
+        return b"value", ("tag",)
+
+    values = await asyncio.gather(*(worker.get_or_set("key", compute) for worker in workers))
+
+    assert values == [b"value"] * 3
+    assert len(computed) == 1
+    assert sum(worker.lock_waits for worker in workers) == 2
+    assert not await server_keys(server, "test:lock:*")
+
+async def test_lock_holder_that_never_stores_is_not_waited_on_forever(server):
+    holder, waiter = redis_cache(server), redis_cache(server, lock_wait=0.05, poll_interval=0.01)
+    assert await holder.backend.acquire_lock("key", ttl=10)
+
+    async def compute():
+        return b"value", ()
+
+    assert await waiter.get_or_set("key", compute) == b"value"
+    assert waiter.lock_waits == 0
+
+async def test_fill_invalidated_midway_is_not_stored(cache):
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def compute():
+        started.set()
+        await release.wait()
+        return b"stale", ("patient:1",)
+
+    fill = asyncio.create_task(cache.get_or_set("key", compute))
+    await started.wait()
+    await cache.invalidate("patient:1")
+    release.set()
+
+    assert await fill == b"stale"
+    assert await cache.get("key") is None
+    assert cache.stale_fills == 1
+
+async def test_fill_after_invalidation_is_stored(cache):
+    await cache.invalidate("patient:1")
+
+    async def compute():
+        return b"fresh", ("patient:1",)
+
+    await cache.get_or_set("key", compute)
+    assert await cache.get("key") == b"fresh"
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from starlette.requests import Request
+from app.api.coalescing import coalesced_response, request_flight
+from app.core.singleflight import SingleFlight
+
+def make_request(query: bytes = b"") -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/api/v1/reports", "query_string": query, "headers": [],
+    })
+
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test-share")
+    release = asyncio.Event()
+    executions = []
+
+    async def compute():
+        executions.append(1)
+        await release.wait()
+        return {"value": 1}
+
+    calls = [asyncio.create_task(flight.do("key", compute, label="route")) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert len(flight) == 1
+    release.set()
+
+    results = await asyncio.gather(*calls)
+    assert results == [{"value": 1}] * 3
+    assert len(executions) == 1
+    assert (flight.executions, flight.coalesced) == (1, 2)
+    assert flight.stats()["coalesced_by_label"] == {"route": 2}
+    assert len(flight) == 0
+
+async def test_nothing_is_kept_after_the_call():
+    flight = SingleFlight("test-no-cache")
+    values = iter([1, 2])
+
+    async def compute():
+        return next(values)
+
+    assert await flight.do("key", compute) == 1
+    assert await flight.do("key", compute) == 2
+
+async def test_exception_reaches_every_waiter():
+    flight = SingleFlight("test-errors")
+    release = asyncio.Event()
+
+    async def compute():
+        await release.wait()
+        raise LookupError("not found")
+
+    calls = [asyncio.create_task(flight.do("key", compute)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    assert [type(result) for result in results] == [LookupError, LookupError]
+    assert flight.failures == 1
+
+async def test_waiters_start_over_when_the_leader_is_cancelled():
+    flight = SingleFlight("test-cancel")
+    executions = []
+
+    async def compute():
+        executions.append(1)
+        await asyncio.sleep(0.05 if len(executions) == 1 else 0)
+        return "done"
+
+    leader = asyncio.create_task(flight.do("key", compute))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", compute))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "done"
+    assert len(executions) == 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+async def test_identical_requests_share_one_encoded_body():
+    release = asyncio.Event()
+    executions = []
+
+    async def compute():
+        executions.append(1)
+        await release.wait()
+        return {"patients": 3}
+
+    same = [
+        asyncio.create_task(coalesced_response(make_request(b"weeks=12&unit=week"), "user-1", compute)),
+        # Query parameter order does not matter
+        asyncio.create_task(coalesced_response(make_request(b"unit=week&weeks=12"), "user-1", compute)),
+    ]
+    other_principal = asyncio.create_task(coalesced_response(make_request(b"weeks=12&unit=week"), "user-2", compute))
+    other_query = asyncio.create_task(coalesced_response(make_request(b"weeks=4&unit=week"), "user-1", compute))
+    await asyncio.sleep(0)
+    assert len(request_flight) == 3
+    release.set()
+
+    responses = await asyncio.gather(*same, other_principal, other_query)
+    assert len(executions) == 3
+    assert {response.body for response in responses} == {b'{"patients":3}'}
+    assert all(response.media_type == "application/json" for response in responses)
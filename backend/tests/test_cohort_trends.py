@@ -0,0 +1,94 @@
+from datetime import datetime
+import numpy as np
+from bson import ObjectId
+from app.services.cohort_trends import (
+    Cohort,
+    adherence_streaks,
+    compute_cohort_trends,
+    detect_plateaus,
+    latest_rolling_mean,
+    least_squares_slope,
+)
+
+NAN = np.nan
+
+def test_slope_matches_polyfit_and_skips_missing_weeks():
+    values = np.array([
+        [90.0, 89.5, NAN, 88.2, 87.9],
+        [NAN, NAN, 70.0, NAN, NAN],
+    ])
+
+    slope = least_squares_slope(values)
+
+    observed = ~np.isnan(values[0])
+    expected = np.polyfit(np.arange(5)[observed], values[0][observed], 1)[0]
+    assert np.isclose(slope[0], expected)
+    assert np.isnan(slope[1])
+
+def test_rolling_mean_ends_at_latest_report():
+    values = np.array([
+        [1.0, 2.0, 3.0, 4.0, NAN],
+        [NAN, NAN, NAN, NAN, NAN],
+    ])
+
+    rolling = latest_rolling_mean(values, 2)
+
+    assert rolling[0] == 3.5
+    assert np.isnan(rolling[1])
+
+def test_streaks_break_on_misses_and_missing_weeks():
+    adherence = np.array([
+        [90, 85, 70, 90, 95, 80],
+        [90, 90, NAN, 90, 90, 90],
+        [90, 90, 90, 90, 50, 90],
+    ], dtype=float)
+
+    streaks = adherence_streaks(adherence, 80)
+
+    assert streaks["current"].tolist() == [3, 3, 1]
+    assert streaks["longest"].tolist() == [3, 3, 4]
+
+def test_current_week_without_report_does_not_reset_trends():
+    # Eleven flat weeks at 90% adherence, nothing reported yet this week
+    weight = np.append(np.full(11, 80.0), NAN)[None, :]
+    adherence = np.append(np.full(11, 90.0), NAN)[None, :]
+
+    streaks = adherence_streaks(adherence, 80)
+
+    assert detect_plateaus(weight, 4, 0.1).tolist() == [True]
+    assert streaks["current"].tolist() == [11]
+    assert streaks["longest"].tolist() == [11]
+
+def test_missed_week_before_the_current_one_ends_the_streak():
+    adherence = np.array([[90, 90, 90, NAN, NAN]], dtype=float)
+    weight = np.array([[80, 80, 80, NAN, NAN]], dtype=float)
+
+    assert adherence_streaks(adherence, 80)["current"].tolist() == [0]
+    assert detect_plateaus(weight, 3, 0.1).tolist() == [False]
+
+def test_plateau_needs_a_flat_trend_and_every_week_reported():
+    weight = np.array([
+        [85.0, 84.0, 83.0, 83.05, 83.0, 82.95],
+        [85.0, 84.0, 83.0, 82.0, 81.0, 80.0],
+        [85.0, 84.0, 83.0, NAN, 83.0, 83.0],
+    ])
+
+    assert detect_plateaus(weight, 4, 0.1).tolist() == [True, False, False]
+
+def test_fill_scatters_reports_into_week_columns():
+    patients = [ObjectId(), ObjectId()]
+    cohort = Cohort(patients, datetime(2024, 1, 1), 4)
+
+    cohort.fill([
+        {"_id": patients[1], "week": [0, 3, 7], "weight_kg": [80.0, 79.0, 70.0], "waist_cm": [None, 90.0, 90.0],
+         "adherence_pct": [90, 85, 80], "energy_levels": [3, 4, 5]},
+        {"_id": ObjectId(), "week": [0], "weight_kg": [60.0], "waist_cm": [None], "adherence_pct": [50], "energy_levels": [1]},
+    ])
+
+    assert np.isnan(cohort.values["weight_kg"][0]).all()
+    assert np.array_equal(cohort.values["weight_kg"][1], [80.0, NAN, NAN, 79.0], equal_nan=True)
+    assert np.array_equal(cohort.values["waist_cm"][1], [NAN, NAN, NAN, 90.0], equal_nan=True)
+
+    trends = compute_cohort_trends(cohort)
+    assert trends["report_count"].tolist() == [0, 2]
+    assert np.isclose(trends["weight_kg_slope"][1], -1 / 3)
@@ -0,0 +1,105 @@
+import gzip
+import httpx
+import orjson
+import pytest
+from app.core.compression import (
+    SUPPORTED_ENCODINGS, CompressionMiddleware, compression_stats, negotiate_encoding, precompressed_cache
+)
+
+LARGE_JSON = orjson.dumps([{"week": week, "weight_kg": 80.5, "notes": "steady progress"} for week in range(200)])
+
+def asgi_app(body: bytes = LARGE_JSON, status: int = 200, headers: dict = None, chunks: int = 1):
+    """An app answering every request with the given body, split into ``chunks`` messages."""
+    headers = {"content-type": "application/json", **(headers or {})}
+
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(key.encode(), value.encode()) for key, value in headers.items()],
+        })
+        size = -(-len(body) // chunks) if body else 0
+        parts = [body[index:index + size] for index in range(0, len(body), size)] if body else [b""]
+        for index, part in enumerate(parts):
+            await send({"type": "http.response.body", "body": part, "more_body": index < len(parts) - 1})
+    return app
+
+async def fetch(app, accept_encoding: str = "gzip") -> httpx.Response:
+    transport = httpx.ASGITransport(app=CompressionMiddleware(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        request = client.build_request("GET", "/", headers={"Accept-Encoding": accept_encoding})
+        response = await client.send(request, stream=True)
+        await response.aread()
+        return response
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    precompressed_cache.clear()
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0, identity", None),
+    ("*", SUPPORTED_ENCODINGS[0]),
+    ("br;q=0.5, gzip", "gzip"),
+    ("", None),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+async def test_large_json_is_gzipped():
+    response = await fetch(asgi_app())
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) < len(LARGE_JSON)
+    assert response.content == LARGE_JSON
+
+async def test_identity_client_gets_plain_body_with_vary():
+    response = await fetch(asgi_app(), accept_encoding="identity")
+
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.content == LARGE_JSON
+
+async def test_small_and_streamed_bodies_are_left_alone():
+    small_before, streaming_before = compression_stats.skipped_small, compression_stats.skipped_streaming
+
+    small = await fetch(asgi_app(body=b'{"ok": true}'))
+    streamed = await fetch(asgi_app(chunks=3))
+
+    assert "Content-Encoding" not in small.headers
+    assert "Content-Encoding" not in streamed.headers
+    assert streamed.content == LARGE_JSON
+    assert compression_stats.skipped_small == small_before + 1
+    assert compression_stats.skipped_streaming == streaming_before + 1
+
+async def test_binary_and_encoded_bodies_get_no_vary():
+    image = await fetch(asgi_app(headers={"content-type": "image/png"}))
+    encoded_body = gzip.compress(LARGE_JSON)
+    encoded = await fetch(asgi_app(body=encoded_body, headers={"content-encoding": "gzip"}))
+
+    assert "Vary" not in image.headers
+    assert "Vary" not in encoded.headers
+    assert encoded.content == LARGE_JSON
+
+async def test_not_modified_repeats_vary():
+    response = await fetch(asgi_app(body=b"", status=304, headers={"etag": 'W/"abc"'}))
+
+    assert response.status_code == 304
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+async def test_precompressed_cache_is_keyed_by_etag_and_encoding():
+    hits_before = compression_stats.cache_hits
+    tagged = asgi_app(headers={"etag": 'W/"v1"'})
+
+    first = await fetch(tagged)
+    second = await fetch(tagged)
+    assert compression_stats.cache_hits == hits_before + 1
+    assert first.content == second.content == LARGE_JSON
+    assert precompressed_cache.get(('W/"v1"', "gzip")) is not None
+
+    # A different body under the same tag is compressed afresh, never served stale
+    other_body = LARGE_JSON.replace(b"steady", b"faster")
+    changed = await fetch(asgi_app(body=other_body, headers={"etag": 'W/"v1"'}))
+    assert changed.content == other_body
+    assert compression_stats.cache_hits == hits_before + 1
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from tests.conftest import auth_headers, create_user
+
+def meal_plan(nutritionist: dict, patient: dict) -> dict:
+    now = datetime.utcnow().replace(microsecond=0)
+    return {
+        "_id": ObjectId(),
+        "patient_id": patient["_id"],
+        "nutritionist_id": nutritionist["_id"],
+        "week_start": now,
+        "status": "published",
+        "days": [{"day_of_week": 0, "meals": [
+            {"meal_type": "lunch", "title": "Dal", "calories": 500, "protein_g": 20.0, "carbs_g": 60.0, "fat_g": 12.0}
+        ]}],
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def progress_report(patient: dict, weeks_ago: int) -> dict:
+    week = datetime.utcnow().replace(microsecond=0) - timedelta(weeks=weeks_ago)
+    return {
+        "patient_id": patient["_id"], "week_start": week, "weight_kg": 80.0, "adherence_pct": 90,
+        "energy_levels": 7, "photos": [], "created_at": week, "updated_at": week,
+    }
+
+async def test_unchanged_document_answers_304(client, database):
+    nutritionist, patient = await create_user(database, "nutritionist"), await create_user(database, "patient")
+    plan = meal_plan(nutritionist, patient)
+    await database.meal_plans.insert_one(plan)
+    url = f"/api/v1/meal-plans/{plan['_id']}"
+    headers = auth_headers(nutritionist)
+
+    first = await client.get(url, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    revalidated = await client.get(url, headers={**headers, "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+    assert revalidated.headers["Last-Modified"] == first.headers["Last-Modified"]
+
+    # Weak comparison: a strong form of the same tag matches too
+    strong = await client.get(url, headers={**headers, "If-None-Match": etag[2:]})
+    assert strong.status_code == 304
+
+    since = await client.get(url, headers={**headers, "If-Modified-Since": first.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+async def test_changed_document_is_sent_again(client, database):
+    nutritionist, patient = await create_user(database, "nutritionist"), await create_user(database, "patient")
+    plan = meal_plan(nutritionist, patient)
+    await database.meal_plans.insert_one(plan)
+    url = f"/api/v1/meal-plans/{plan['_id']}"
+    headers = auth_headers(nutritionist)
+    etag = (await client.get(url, headers=headers)).headers["ETag"]
+
+    await database.meal_plans.update_one({"_id": plan["_id"]}, {"$set": {"updated_at": plan["updated_at"] + timedelta(seconds=5)}})
+
+    response = await client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["id"] == str(plan["_id"])
+
+async def test_if_none_match_takes_precedence_over_if_modified_since(client, database):
+    nutritionist, patient = await create_user(database, "nutritionist"), await create_user(database, "patient")
+    plan = meal_plan(nutritionist, patient)
+    await database.meal_plans.insert_one(plan)
+    url = f"/api/v1/meal-plans/{plan['_id']}"
+    headers = auth_headers(nutritionist)
+    last_modified = (await client.get(url, headers=headers)).headers["Last-Modified"]
+
+    response = await client.get(url, headers={**headers, "If-None-Match": 'W/"other"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+
+async def test_list_page_etag_covers_its_window(client, database):
+    patient = await create_user(database, "patient")
+    await database.progress_reports.insert_many([progress_report(patient, weeks_ago) for weeks_ago in range(4)])
+    headers = auth_headers(patient)
+    url = "/api/v1/patients/progress?limit=2"
+
+    first = await client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert "Last-Modified" not in first.headers
+    etag = first.headers["ETag"]
+
+    conditional = {**headers, "If-None-Match": etag}
+    revalidated = await client.get(url, headers=conditional)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+    other_page = await client.get("/api/v1/patients/progress?limit=2&skip=2", headers=conditional)
+    assert other_page.status_code == 200
+    assert other_page.headers["ETag"] != etag
+
+    await database.progress_reports.insert_one(progress_report(patient, weeks_ago=-1))
+    changed = await client.get(url, headers=conditional)
+    assert changed.status_code == 200
+
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from app.core import health
+from app.core.config import settings
+from app.core.health import MongoProbe, StartupTasks
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "STARTUP_RETRY_SECONDS", 0)
+
+async def wait_for_steps(tasks: StartupTasks):
+    await asyncio.wait_for(tasks._task, timeout=1)
+
+async def test_required_step_is_retried_until_it_succeeds():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("MongoDB is down")
+
+    tasks = StartupTasks()
+    tasks.start([("indexes", flaky, True)])
+    assert not tasks.complete
+    await wait_for_steps(tasks)
+
+    state = tasks.steps["indexes"]
+    assert (state["status"], state["attempts"], state["error"]) == ("done", 3, None)
+    assert tasks.complete
+
+async def test_failed_required_step_holds_readiness_back():
+    async def down():
+        raise ConnectionError("MongoDB is down")
+
+    tasks = StartupTasks()
+    tasks.start([("indexes", down, True), ("warmup", asyncio.sleep, False)])
+    await asyncio.sleep(0.01)
+
+    assert tasks.steps["indexes"]["status"] in ("running", "retrying")
+    assert tasks.steps["indexes"]["error"] == "MongoDB is down"
+    # Later steps wait for the required one
+    assert tasks.steps["warmup"]["status"] == "pending"
+    assert not tasks.complete
+    await tasks.stop()
+
+async def test_best_effort_step_is_tried_once():
+    attempts = []
+
+    async def warmup():
+        attempts.append(1)
+        raise RuntimeError("cold")
+
+    tasks = StartupTasks()
+    tasks.start([("warmup", warmup, False)])
+    await wait_for_steps(tasks)
+
+    assert len(attempts) == 1
+    assert tasks.steps["warmup"]["status"] == "skipped"
+    assert tasks.complete
+
+class FakeProbe(MongoProbe):
+    def __init__(self, delay: float = 0, error: Exception = None):
+        super().__init__()
+        self.delay, self.error, self.pings = delay, error, 0
+
+    async def _send_ping(self) -> float:
+        self.pings += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return 0.001
+
+async def test_probe_result_is_cached(monkeypatch):
+    monkeypatch.setattr(settings, "HEALTH_CACHE_SECONDS", 60)
+    probe = FakeProbe()
+
+    assert (await probe.check())["ok"]
+    assert (await probe.check())["ok"]
+    assert probe.pings == 1
+
+async def test_slow_ping_times_out_and_is_reused(monkeypatch):
+    monkeypatch.setattr(settings, "HEALTH_CACHE_SECONDS", 0)
+    monkeypatch.setattr(settings, "HEALTH_PING_TIMEOUT_MS", 10)
+    probe = FakeProbe(delay=0.2)
+
+    first = await probe.check()
+    second = await probe.check()
+
+    assert not first["ok"] and "timed out" in first["error"]
+    assert not second["ok"]
+    # The second probe waited on the ping still outstanding instead of sending another
+    assert probe.pings == 1
+    probe._ping.cancel()
+
+async def test_ready_endpoint_follows_startup_and_ping(client, monkeypatch):
+    probe = FakeProbe()
+    monkeypatch.setattr(settings, "HEALTH_CACHE_SECONDS", 0)
+    monkeypatch.setattr(health, "mongo_probe", probe)
+    monkeypatch.setattr(health, "server_round_trips", lambda: {})
+    monkeypatch.setattr(health.startup_tasks, "steps", {"indexes": {"status": "retrying"}})
+
+    not_ready = await client.get("/health/ready")
+    assert not_ready.status_code == 503
+    assert not_ready.json()["startup"]["indexes"]["status"] == "retrying"
+    assert not_ready.headers["Cache-Control"] == "no-store"
+
+    monkeypatch.setattr(health.startup_tasks, "steps", {"indexes": {"status": "done"}})
+    ready = await client.get("/health/ready")
+    assert ready.status_code == 200
+    assert ready.json()["status"] == "ready"
+
+    probe.error = ConnectionError("no primary")
+    down = await client.get("/health/ready")
+    assert down.status_code == 503
+    assert down.json()["mongodb"]["error"] == "no primary"
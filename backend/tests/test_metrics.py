@@ -0,0 +1,14 @@
+from app.core.instrumentation import route_query_stats
+from app.core.metrics import UNMATCHED_ROUTE, registry, render
+
+async def test_unmatched_paths_share_one_series(client, database):
+    for index in range(3):
+        response = await client.get(f"/scan/probe-{index}")
+        assert response.status_code == 404
+
+    exposition = render(registry.collect())
+
+    assert UNMATCHED_ROUTE in route_query_stats
+    assert not any(route.startswith("/scan/") for route in route_query_stats)
+    assert "/scan/probe" not in exposition
+    assert f'db_commands_total{{route="{UNMATCHED_ROUTE}"}}' in exposition
@@ -0,0 +1,29 @@
+import pytest
+from tests.conftest import auth_headers, commands_issued, create_roster
+
+ROSTER_ROUTES = [
+    "/api/v1/nutritionists/patients?limit=100",
+    "/api/v1/nutritionists/dashboard/stats",
+    "/api/v1/nutritionists/progress/summary",
+]
+
+@pytest.mark.parametrize("url", ROSTER_ROUTES)
+async def test_query_count_does_not_grow_with_patients(client, database, url):
+    small = await create_roster(database, patients=5)
+    large = await create_roster(database, patients=10)
+
+    small_count = await commands_issued(client, url, auth_headers(small))
+    large_count = await commands_issued(client, url, auth_headers(large))
+
+    assert small_count > 0
+    assert large_count == small_count
+
+async def test_patient_summaries_cover_every_patient(client, database):
+    nutritionist = await create_roster(database, patients=4)
+
+    response = await client.get("/api/v1/nutritionists/progress/summary", headers=auth_headers(nutritionist))
+
+    summaries = response.json()
+    assert len(summaries) == 4
+    assert {summary["total_reports"] for summary in summaries} == {3}
+    assert {summary["avg_adherence"] for summary in summaries} == {80}
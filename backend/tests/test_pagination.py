@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, keyset_filter
+from tests.conftest import auth_headers, create_user
+
+SORT = [("created_at", -1), ("_id", -1)]
+
+def test_cursor_round_trips_sort_values():
+    doc = {"_id": ObjectId(), "created_at": datetime(2024, 5, 1, 12, 30, 15, 123000), "email": "a@example.com"}
+
+    assert decode_cursor(encode_cursor(doc, SORT), SORT) == [doc["created_at"], doc["_id"]]
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor({"created_at": None}, [("created_at", -1)])])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, SORT)
+    assert error.value.status_code == 400
+
+def test_keyset_filter_continues_after_cursor():
+    created_at, last_id = datetime(2024, 5, 1), ObjectId()
+    cursor = encode_cursor({"created_at": created_at, "_id": last_id}, SORT)
+
+    assert keyset_filter({"role": "patient"}, SORT, cursor) == {"$and": [
+        {"role": "patient"},
+        {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]},
+    ]}
+
+async def test_cursor_pages_cover_every_document_once(client, database):
+    admin = await create_user(database, "admin")
+    start = datetime(2024, 1, 1)
+    # Pairs share a created_at so the _id tie-breaker is exercised
+    for index in range(7):
+        await create_user(database, "patient", created_at=start + timedelta(days=index // 2))
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"role": "patient", "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/v1/admin/users", params=params, headers=auth_headers(admin))
+        assert response.status_code == 200
+        seen.extend(user["id"] for user in response.json())
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 7
+    skip_limit = await client.get("/api/v1/admin/users", params={"role": "patient", "limit": 7}, headers=auth_headers(admin))
+    assert [user["id"] for user in skip_limit.json()] == seen
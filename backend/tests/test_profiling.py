@@ -0,0 +1,29 @@
+from app.api.profiling import PENDING_PROFILE, profile_key
+from app.core.cache import shared_cache
+from tests.conftest import auth_headers, create_user
+
+async def test_pending_profile_answers_202(client, database):
+    admin = await create_user(database, "admin")
+    await shared_cache.set(profile_key("reserved"), PENDING_PROFILE, ttl=60)
+
+    response = await client.get("/api/v1/admin/profiles/reserved", headers=auth_headers(admin))
+
+    assert response.status_code == 202
+    assert response.headers["Retry-After"] == "1"
+
+async def test_profile_id_resolves_once_response_is_sent(client, database):
+    admin = await create_user(database, "admin")
+    headers = auth_headers(admin)
+
+    profiled = await client.get("/api/v1/admin/metrics/profiler", headers={**headers, "X-Profile": "html"})
+    assert profiled.status_code == 200
+    profile_id = profiled.headers["X-Profile-Id"]
+
+    response = await client.get(f"/api/v1/admin/profiles/{profile_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["X-Profile-Route"] == "GET /api/v1/admin/metrics/profiler"
+
+async def test_unknown_profile_is_404(client, database):
+    admin = await create_user(database, "admin")
+    response = await client.get("/api/v1/admin/profiles/missing", headers=auth_headers(admin))
+    assert response.status_code == 404
@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from app.services import progress_rollups
+from app.services.progress_rollups import BACKFILL_MIGRATION, backfill_rollups
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    """Replace the $merge rebuild (which mongomock lacks) with a counter."""
+    calls = []
+
+    async def rebuild_rollups():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return 7
+
+    monkeypatch.setattr(progress_rollups, "rebuild_rollups", rebuild_rollups)
+    return calls
+
+async def test_backfill_runs_once_despite_existing_rollups(database, rebuilds):
+    # A rollup upserted by a request served before the backfill
+    await database.progress_reports.insert_one({"patient_id": ObjectId()})
+    await database.patient_progress_rollups.insert_one({"_id": ObjectId(), "report_count": 1})
+
+    await backfill_rollups()
+    await backfill_rollups()
+
+    assert len(rebuilds) == 1
+    marker = await database.migrations.find_one({"_id": BACKFILL_MIGRATION})
+    assert marker["completed_at"] is not None
+    assert marker["rollups"] == 7
+
+async def test_failed_backfill_releases_lease_and_is_retried(database, rebuilds, monkeypatch):
+    await database.progress_reports.insert_one({"patient_id": ObjectId()})
+
+    async def failing_rebuild():
+        raise RuntimeError("interrupted")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(progress_rollups, "rebuild_rollups", failing_rebuild)
+        with pytest.raises(RuntimeError, match="interrupted"):
+            await backfill_rollups()
+
+    await backfill_rollups()
+    assert len(rebuilds) == 1
+
+async def test_only_one_worker_holds_the_lease(database, rebuilds):
+    await database.progress_reports.insert_one({"patient_id": ObjectId()})
+
+    results = await asyncio.gather(backfill_rollups(), backfill_rollups(), return_exceptions=True)
+
+    assert len(rebuilds) == 1
+    assert [type(result) for result in results].count(RuntimeError) == 1
+    # The worker that lost the lease succeeds on its next attempt
+    await backfill_rollups()
+    assert len(rebuilds) == 1
@@ -0,0 +1,62 @@
+"""Query plans of the covered endpoints, checked against a real MongoDB.
+
+mongomock cannot explain, so this is skipped when MONGODB_URL does not
+answer. The load-test dataset is seeded into a scratch database that is
+dropped afterwards.
+"""
+import httpx
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+import main
+from app.core.config import settings
+from app.core.database import db
+from app.core.indexes import ensure_indexes
+from app.core.instrumentation import command_instrumentation
+from benchmarks.loadtest.dataset import seed
+from benchmarks.loadtest.plans import CommandCapture, capture_commands, explain_commands
+from benchmarks.loadtest.runner import build_users
+
+PLANS_DATABASE = "nutritionist_plans_test"
+
+def mongodb_reachable() -> bool:
+    client = MongoClient(settings.MONGODB_URL, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+pytestmark = pytest.mark.skipif(not mongodb_reachable(), reason="MONGODB_URL is not reachable")
+
+@pytest.fixture
+async def capture(monkeypatch):
+    """The app pointed at a scratch database, with its read commands captured."""
+    capture = CommandCapture()
+    client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[command_instrumentation, capture])
+    monkeypatch.setattr(db, "client", client)
+    monkeypatch.setattr(db, "db", client[PLANS_DATABASE])
+    try:
+        yield capture
+    finally:
+        await client.drop_database(PLANS_DATABASE)
+        client.close()
+
+async def test_covered_queries_use_indexes(capture):
+    await ensure_indexes(db.db)
+    dataset = await seed(db.db)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        failed_calls = await capture_commands(client, build_users(dataset, token_hours=1))
+    results = await explain_commands(db.client, capture.commands, max_ratio=10, min_examined=50)
+
+    assert not failed_calls
+    assert results
+    failing = [
+        f"{result['call']}: {result['command']} {result['collection']} ({result['plan']}): {', '.join(result['problems'])}"
+        for result in results if result["problems"]
+    ]
+    assert not failing, "\n".join(failing)
@@ -0,0 +1,64 @@
+from datetime import date, datetime
+import orjson
+import pytest
+from bson import ObjectId
+from app.api.responses import DocumentSerializer
+from app.models.meal_plan import MealPlanResponse
+from app.models.user import UserResponse
+
+def meal_plan_document(**fields) -> dict:
+    now = datetime(2026, 3, 2, 9, 30)
+    return {
+        "_id": ObjectId(),
+        "patient_id": ObjectId(),
+        "nutritionist_id": ObjectId(),
+        "week_start": datetime(2026, 3, 2),
+        "status": "published",
+        "days": [{
+            "day_of_week": 0,
+            "totals": {"calories": 500},
+            "meals": [{"meal_type": "lunch", "title": "Dal", "calories": 500, "protein_g": 20, "carbs_g": 60, "fat_g": 12}],
+        }],
+        "weekly_totals": {"calories": 500},
+        "created_at": now,
+        "updated_at": now,
+        **fields,
+    }
+
+def test_matches_response_model_validation():
+    document = meal_plan_document()
+    serialized = DocumentSerializer(MealPlanResponse).to_dict(document)
+
+    validated = MealPlanResponse(
+        **{**document, "id": str(document["_id"]), "patient_id": str(document["patient_id"]),
+           "nutritionist_id": str(document["nutritionist_id"]), "week_start": date(2026, 3, 2),
+           "created_at": document["created_at"].isoformat(), "updated_at": document["updated_at"].isoformat()}
+    )
+    assert orjson.loads(orjson.dumps(serialized)) == validated.model_dump(mode="json")
+
+def test_nested_models_are_converted():
+    day = DocumentSerializer(MealPlanResponse).to_dict(meal_plan_document())["days"][0]
+
+    # Stored extras such as day totals are not part of DayPlan
+    assert set(day) == {"day_of_week", "meals"}
+    assert day["meals"][0]["protein_g"] == 20.0
+    assert isinstance(day["meals"][0]["protein_g"], float)
+    assert day["meals"][0]["notes"] is None
+
+def test_missing_required_field_fails():
+    document = meal_plan_document()
+    del document["days"][0]["meals"][0]["title"]
+
+    with pytest.raises(ValueError, match="Meal.title"):
+        DocumentSerializer(MealPlanResponse).to_dict(document)
+
+def test_only_model_fields_are_emitted():
+    user = {
+        "_id": ObjectId(), "email": "a@example.com", "phone": "5550000000", "role": "patient",
+        "status": "active", "password_hash": "secret", "created_at": datetime(2026, 1, 1), "updated_at": datetime(2026, 1, 1),
+    }
+    serialized = DocumentSerializer(UserResponse).to_dict(user)
+
+    assert "password_hash" not in serialized
+    assert serialized["id"] == str(user["_id"])
+    assert serialized["role"] == "patient"
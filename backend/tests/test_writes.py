@@ -0,0 +1,93 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import PyMongoError
+from app.api.writes import insert_unique
+from app.core import indexes
+from app.core.database import create_indexes
+from app.core.metrics import registry, render
+from tests.conftest import auth_headers, create_user
+from app.core.hashing import password_hasher
+
+SIGNUP = {"email": "repeat@example.com", "phone": "5550000000", "password": "secret123", "role": "patient"}
+
+@pytest.fixture
+def unconfirmed(monkeypatch):
+    """No unique index has been seen in place, as when the build failed or is still running."""
+    monkeypatch.setattr(indexes, "confirmed_unique", set())
+    monkeypatch.setattr("app.api.writes.confirmed_unique", indexes.confirmed_unique)
+    return indexes.confirmed_unique
+
+async def test_duplicate_signup_rejected_before_hashing(client, database, unconfirmed, monkeypatch):
+    hashed = []
+    original = password_hasher.hash
+
+    async def counting_hash(password):
+        hashed.append(password)
+        return await original(password)
+
+    monkeypatch.setattr(password_hasher, "hash", counting_hash)
+
+    first = await client.post("/api/v1/auth/signup", json=SIGNUP)
+    second = await client.post("/api/v1/auth/signup", json=SIGNUP)
+
+    assert first.status_code == 200, first.text
+    assert second.status_code == 400
+    assert second.json()["detail"] == "Email already registered"
+    assert len(hashed) == 1
+    assert await database.users.count_documents({"email": SIGNUP["email"]}) == 1
+
+async def test_precheck_respects_partial_filter(database, unconfirmed):
+    user_id = ObjectId()
+    await insert_unique(database.subscriptions, {"user_id": user_id, "status": "cancelled"}, "duplicate")
+    await insert_unique(database.subscriptions, {"user_id": user_id, "status": "active"}, "duplicate")
+
+    with pytest.raises(HTTPException) as exc:
+        await insert_unique(database.subscriptions, {"user_id": user_id, "status": "active"}, "duplicate")
+    assert exc.value.status_code == 400
+
+async def test_ensure_indexes_confirms_unique_indexes(database, unconfirmed):
+    await indexes.ensure_indexes(database, create=False)
+    assert not unconfirmed
+
+    await indexes.ensure_indexes(database)
+    assert unconfirmed == {name for name, specs in indexes.INDEXES.items() if any(spec.get("unique") for spec in specs)}
+
+async def test_failed_unique_build_is_reported_not_raised(database, unconfirmed, monkeypatch):
+    monkeypatch.setattr(indexes, "failed_indexes", {})
+    user_id = ObjectId()
+    await database.patient_profiles.insert_many([{"user_id": user_id}, {"user_id": user_id}])
+
+    await create_indexes()
+
+    assert "patient_profiles" not in unconfirmed
+    assert list(indexes.failed_indexes) == ["patient_profiles.user_id_1"]
+    assert "index_builds_failed 1" in render(registry.collect())
+
+async def test_failed_plain_build_fails_startup_step(database, unconfirmed, monkeypatch):
+    monkeypatch.setattr(indexes, "failed_indexes", {})
+    original = type(database.users).create_index
+
+    async def create_index(self, keys, **kwargs):
+        if not kwargs.get("unique"):
+            raise PyMongoError("not primary")
+        return await original(self, keys, **kwargs)
+
+    monkeypatch.setattr(type(database.users), "create_index", create_index)
+
+    with pytest.raises(RuntimeError, match="Index builds failed"):
+        await create_indexes()
+
+async def test_any_subscription_refused_while_one_is_active(client, database):
+    patient = await create_user(database, "patient")
+    subscription = {
+        "user_id": str(patient["_id"]), "plan": "monthly", "price_inr": 999,
+        "current_period_start": "2026-01-01T00:00:00", "current_period_end": "2026-02-01T00:00:00"
+    }
+    active = await client.post("/api/v1/subscriptions/", json={**subscription, "status": "active"}, headers=auth_headers(patient))
+    pending = await client.post("/api/v1/subscriptions/", json=subscription, headers=auth_headers(patient))
+
+    assert active.status_code == 200, active.text
+    assert pending.status_code == 400
+    assert pending.json()["detail"] == "User already has an active subscription"
+    assert await database.subscriptions.count_documents({"user_id": patient["_id"]}) == 1